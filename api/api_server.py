@@ -1,12 +1,22 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
-import yfinance as yf
 import pandas as pd
-from feature_engineering import add_features
+from batch_inference import predict_universe
 from ml_model import load_model
+from market_data import get_many_bars
 
 app = FastAPI()
 
+
+@app.on_event("startup")
+def preload_models():
+    # La deserialización ocurre al arrancar, no durante las peticiones
+    try:
+        load_model()
+    except FileNotFoundError as e:
+        print(e)
+
+
 class Recommendation(BaseModel):
     symbol: str
     source: str
@@ -34,15 +44,23 @@ def get_recommendations(capital: float = 10000):
     ]
 
     recos = []
+    universe = get_many_bars([s for s, _ in symbols], period="6mo", interval="1d")
+    # Todas las probabilidades con una llamada a predict_proba por modelo;
+    # los errores se manejan por símbolo dentro de predict_universe
+    try:
+        ml_probs = predict_universe(universe)
+    except Exception as e:
+        print("Error en la inferencia por lotes:", e)
+        ml_probs = {}
 
     for symbol, source in symbols:
-        df = yf.download(symbol, period="6mo", interval="1d")
-        df = add_features(df)
-        df.dropna(inplace=True)
+        df = universe[symbol]
 
         try:
-            model, features = load_model("AAPL")  # usar modelo base
-            prob_up = float(model.predict_proba(df[features].iloc[-1:].values)[0][1])
+            if symbol not in ml_probs:
+                print("Error con", symbol, "sin datos suficientes para la IA")
+                continue
+            prob_up = float(ml_probs[symbol])
             price = float(df["Close"].iloc[-1])
 
             action = (
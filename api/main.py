@@ -3,7 +3,7 @@ from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 
 from .schemas import RecommendationsResponse, Signal
-from .trading_service import get_recommendations, ASSETS
+from .trading_service import get_recommendations, ASSETS, preload_models
 
 app = FastAPI(title="Trading-Algorithmic-IA API")
 
@@ -17,6 +17,12 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def startup():
+    # La deserialización de modelos ocurre al arrancar, no durante las peticiones
+    preload_models()
+
+
 @app.get("/api/assets")
 def list_assets():
     return {"assets": ASSETS}
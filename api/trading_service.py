@@ -1,34 +1,35 @@
 # api/trading_service.py
-import yfinance as yf
 import numpy as np
 import pandas as pd
 
-from feature_engineering import add_features
+from batch_inference import predict_universe
+from market_data import get_bars, get_many_bars
 from ml_model import load_model
 
 ASSETS = ["AAPL", "MSFT", "AMZN"]  # puedes cambiar esta lista
 
 
-def get_symbol_signal(symbol: str):
-    df = yf.download(symbol, period="6mo", interval="1d")
-    df = add_features(df)
-    df = df.dropna()
-
-    if df.empty:
-        return None
+def preload_models():
+    """Deja en el registro en memoria los modelos de todos los activos."""
+    for symbol in ASSETS:
+        try:
+            load_model(symbol)
+        except FileNotFoundError as e:
+            print(e)
 
-    # Cargamos modelo (usando tu función existente)
-    model, feature_cols = load_model(symbol)
 
-    last_row = df.iloc[-1]
-    X = last_row[feature_cols].values.reshape(1, -1)
+def get_symbol_signal(symbol: str, df: pd.DataFrame = None, prob_up: float = None):
+    if df is None:
+        df = get_bars(symbol, period="6mo", interval="1d")
 
-    prob_up = model.predict_proba(X)[0][1]  
-    pred = model.predict(X)[0]  
+    # Sin probabilidad precalculada (llamada suelta): lote de un solo símbolo
+    if prob_up is None:
+        prob_up = predict_universe({symbol: df}).get(symbol)
+        if prob_up is None:
+            return None
 
-    # Señal SMA simple
-    df["SMA20"] = df["Close"].rolling(20).mean()
-    df["SMA50"] = df["Close"].rolling(50).mean()
+    # Señal SMA simple (sin escribir en el DataFrame compartido del caché)
+    df = df.assign(SMA20=df["Close"].rolling(20).mean(), SMA50=df["Close"].rolling(50).mean())
     last = df.iloc[-1]
 
     sma_signal = "HOLD"
@@ -43,7 +44,7 @@ def get_symbol_signal(symbol: str):
         "symbol": symbol,
         "price": price,
         "ml_prob_up": float(prob_up),
-        "ml_signal": "BUY" if pred == 1 else "FLAT",
+        "ml_signal": "BUY" if prob_up > 0.5 else "FLAT",
         "sma_signal": sma_signal,
     }
 
@@ -69,8 +70,15 @@ def get_recommendations(capital: float):
     """
     signals = []
 
+    # Una sola descarga por lotes para todo el universo
+    universe = get_many_bars(ASSETS, period="6mo", interval="1d")
+    # Y una sola llamada a predict_proba por modelo para todos los activos
+    ml_probs = predict_universe(universe)
+
     for symbol in ASSETS:
-        info = get_symbol_signal(symbol)
+        if symbol not in ml_probs:
+            continue
+        info = get_symbol_signal(symbol, universe[symbol], ml_probs[symbol])
         if not info:
             continue
 
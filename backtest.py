@@ -1,6 +1,7 @@
-import yfinance as yf
 import pandas as pd
 
+from market_data import get_bars, use_provider
+
 # ==========================
 # CONFIGURACIÓN DEL BACKTEST
 # ==========================
@@ -15,9 +16,9 @@ INITIAL_CAPITAL = 10000  # Capital inicial (USD, simulación)
 
 
 def get_data(symbol: str, period: str, interval: str) -> pd.DataFrame:
-    """Descarga datos históricos desde Yahoo Finance."""
-    print(f"Descargando datos de {symbol} ({period}, {interval})...")
-    df = yf.download(symbol, period=period, interval=interval)
+    """Obtiene datos históricos (caché local + Yahoo Finance)."""
+    print(f"Cargando datos de {symbol} ({period}, {interval})...")
+    df = get_bars(symbol, period=period, interval=interval)
     if df is None or df.empty:
         raise ValueError("No se pudieron descargar datos.")
     return df
@@ -88,7 +89,8 @@ def run_backtest(df: pd.DataFrame):
     print(df[["Close", "equity_curve", "buy_and_hold"]].tail())
 
 
-def main():
+def main(provider=None):
+    use_provider(provider)
     df = get_data(SYMBOL, PERIOD, INTERVAL)
     df = prepare_data(df)
     run_backtest(df)
@@ -1,20 +1,49 @@
-import yfinance as yf
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
 
-from feature_engineering import add_features
-from ml_model import load_model
+from feature_engineering import add_target_direction, warmup_bars
+from feature_store import get_feature_store
+from ml_model import MODEL_FEATURES, load_best_params, load_model
+from market_data import OHLCVCache, get_cache
 from backtesting.metrics import max_drawdown, sharpe_ratio  # ← usamos tu metrics.py
 
+# Walk-forward: se re-entrena con las últimas TRAIN_WINDOW velas y se predice el
+# siguiente bloque de TEST_SIZE velas que el modelo nunca vio
+WF_TRAIN_WINDOW = 504  # ~2 años de velas diarias
+WF_TEST_SIZE = 63      # ~1 trimestre
+PREDICTION_CACHE_DIR = "data/predictions"
+
 
 class BacktestEngine:
 
-    def __init__(self, symbol, start, end, initial_capital=10000):
+    def __init__(self, symbol, start, end, initial_capital=10000, panel=None, provider=None,
+                 walk_forward=False, train_window=WF_TRAIN_WINDOW, test_size=WF_TEST_SIZE,
+                 threshold=0.5, max_workers=None, cache_dir=PREDICTION_CACHE_DIR):
         self.symbol = symbol
         self.start = start
         self.end = end
         self.initial_capital = initial_capital
+        self.panel = panel  # PanelStore opcional: lee vistas del memmap en lugar del caché
+
+        # Modo walk-forward (predicciones fuera de muestra, cacheadas por modelo y ventana)
+        self.walk_forward = walk_forward
+        self.train_window = train_window
+        self.test_size = test_size
+        self.threshold = threshold  # regla de trading: comprado si P(subida) > threshold
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+
+        # Proveedor opcional (p. ej. ReplayProvider) para backtests reproducibles offline
+        self.cache = OHLCVCache(provider=provider) if provider is not None else get_cache()
 
         self.df = None
         self.model = None
@@ -26,17 +55,35 @@ class BacktestEngine:
     def load_data(self):
         print(f"\n📥 Descargando datos de {self.symbol} desde {self.start} hasta {self.end}...\n")
 
-        df = yf.download(self.symbol, start=self.start, end=self.end, interval="1d")
-        df = add_features(df)
-        df.dropna(inplace=True)
+        # En walk-forward también hace falta la historia de entrenamiento previa a `start`,
+        # más las velas de calentamiento de las features (esas filas se descartan).
+        # Margen de ~5% para los feriados, que no cuentan como días hábiles con vela.
+        feature_cols = self.feature_cols or MODEL_FEATURES
+        start = self.start
+        if self.walk_forward:
+            bars = self.train_window + warmup_bars(feature_cols)
+            start = pd.Timestamp(self.start) - pd.tseries.offsets.BDay(bars + bars // 20 + 10)
 
-        self.df = df
+        if self.panel is not None:
+            df = self.panel.frame(self.symbol, start, self.end)
+        else:
+            df = self.cache.get(self.symbol, start=start, end=self.end, interval="1d")
+
+        # Solo las features del modelo, reutilizando las ya calculadas
+        features = get_feature_store().get(self.symbol, df, feature_cols, interval="1d")
+        self.df = df.join(features, how="inner")
 
     # ==========================
     # 2. Cargar modelo
     # ==========================
     def load_trading_model(self):
-        model, feature_cols = load_model(self.symbol)
+        try:
+            model, feature_cols = load_model(self.symbol)
+        except FileNotFoundError:
+            if not self.walk_forward:
+                raise
+            # Walk-forward no necesita un modelo entrenado: solo sus hiperparámetros
+            model, feature_cols = RandomForestClassifier(random_state=42, **load_best_params()), MODEL_FEATURES
         self.model = model
         self.feature_cols = feature_cols
 
@@ -46,7 +93,12 @@ class BacktestEngine:
     def run_model_predictions(self):
         print("🤖 Generando señales con el modelo ML...")
 
-        self.df["signal"] = self.model.predict(self.df[self.feature_cols])
+        if self.walk_forward:
+            self.df["prob_up"] = self.walk_forward_predictions()
+            self.df = self.df[self.df.index >= _as_ts(self.start, self.df.index)].copy()
+            self.df["signal"] = (self.df["prob_up"] > self.threshold).astype(int)
+        else:
+            self.df["signal"] = self.model.predict(self.df[self.feature_cols])
 
         # 1 = LONG, 0 = fuera del mercado
         self.df["market_return"] = self.df["Close"].pct_change()
@@ -54,6 +106,75 @@ class BacktestEngine:
         # Shift para evitar lookahead bias
         self.df["strategy_return"] = self.df["signal"].shift(1) * self.df["market_return"]
 
+    # ==========================
+    # 3b. Walk-forward fuera de muestra
+    # ==========================
+    def walk_forward_windows(self):
+        """(train, test) como slices de filas: el primer test empieza en `start`."""
+        first = int(self.df.index.searchsorted(_as_ts(self.start, self.df.index)))
+        if first == 0:
+            raise ValueError("❌ No hay historia antes de start para entrenar el primer bloque.")
+        if first < self.train_window:
+            print(f"⚠️ El primer bloque se entrena con {first} velas (train_window={self.train_window}): "
+                  "no hay más historia antes de start.")
+        return [
+            (slice(max(0, test_start - self.train_window), test_start),
+             slice(test_start, min(test_start + self.test_size, len(self.df))))
+            for test_start in range(first, len(self.df), self.test_size)
+        ]
+
+    def walk_forward_predictions(self) -> pd.Series:
+        """
+        P(subida) fuera de muestra para cada fila desde `start` (NaN antes).
+        Cada bloque se predice con un modelo entrenado solo con las filas anteriores;
+        las predicciones se guardan por (hash del modelo, ventana) y las ventanas
+        ya calculadas no se vuelven a entrenar ni predecir.
+        """
+        df = add_target_direction(self.df)
+        X = df[self.feature_cols].to_numpy(dtype=np.float32)
+        y = df["target_up"].to_numpy()
+        estimator = clone(self.model)
+        if "n_jobs" in estimator.get_params():
+            estimator.set_params(n_jobs=1)  # el paralelismo va por ventanas
+        model_hash = _model_hash(estimator, self.feature_cols)
+
+        prob_up = np.full(len(df), np.nan)
+        windows = self.walk_forward_windows()
+        pending = []
+        for train, test in windows:
+            path = self._prediction_path(model_hash, df, X, y, train, test)
+            if os.path.exists(path):
+                prob_up[test] = np.load(path)
+            else:
+                pending.append((train, test, path))
+
+        print(f"🔁 Walk-forward: {len(pending)} ventanas por entrenar, "
+              f"{len(windows) - len(pending)} desde caché ({model_hash})")
+        if pending:
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_window_worker,
+                                     initargs=(X, y, estimator)) as pool:
+                results = pool.map(_fit_predict_window, [(train, test) for train, test, _ in pending])
+                for (train, test, path), proba in zip(pending, results):
+                    prob_up[test] = proba
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path + ".tmp", "wb") as f:
+                        np.save(f, proba)
+                    os.replace(path + ".tmp", path)
+            print(f"⏱️ {len(pending)} ventanas en {time.perf_counter() - start:.1f}s")
+
+        return pd.Series(prob_up, index=df.index)
+
+    def _prediction_path(self, model_hash, df, X, y, train, test) -> str:
+        # La ventana se identifica por sus fechas y por el contenido de sus datos:
+        # si cambian las velas o las features, la predicción se recalcula
+        h = hashlib.sha1()
+        h.update(f"{df.index[train.start]}|{df.index[train.stop - 1]}|{df.index[test.start]}|{df.index[test.stop - 1]}".encode())
+        h.update(X[train.start:test.stop].tobytes())
+        h.update(y[train].tobytes())
+        name = f"{self.symbol}_{df.index[test.start]:%Y%m%d}_{h.hexdigest()[:12]}.npy"
+        return os.path.join(self.cache_dir, model_hash, name)
+
     # ==========================
     # 4. Calcular curva de capital
     # ==========================
@@ -96,18 +217,56 @@ class BacktestEngine:
     def run(self):
         print("\n🚀 Ejecutando Backtest...\n")
 
-        self.load_data()
         self.load_trading_model()
+        self.load_data()
         self.run_model_predictions()
         self.compute_equity_curve()
 
         return self.compute_metrics()
 
 
+def _as_ts(ts, index: pd.DatetimeIndex) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    if index.tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(index.tz)
+    return ts
+
+
+def _model_hash(estimator, feature_cols) -> str:
+    """Hash de la clase, los hiperparámetros y las features del modelo (no de sus pesos)."""
+    spec = {
+        "class": type(estimator).__name__,
+        "params": estimator.get_params(),
+        "features": list(feature_cols),
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+# Datos del símbolo: se envían una vez a cada proceso, no en cada ventana
+_window_data = None
+
+
+def _init_window_worker(X, y, estimator):
+    global _window_data
+    _window_data = (X, y, estimator)
+
+
+def _fit_predict_window(task):
+    train, test = task
+    X, y, estimator = _window_data
+    model = clone(estimator).fit(X[train], y[train])
+    if 1 not in model.classes_:
+        return np.zeros(test.stop - test.start)  # la ventana de entrenamiento nunca subió
+    return model.predict_proba(X[test])[:, list(model.classes_).index(1)]
+
+
 if __name__ == "__main__":
+    import sys
+
     bt = BacktestEngine(
         symbol="AAPL",
         start="2020-01-01",
-        end="2024-12-31"
+        end="2024-12-31",
+        walk_forward=len(sys.argv) > 1 and sys.argv[1] == "walk-forward",
     )
     results = bt.run()
@@ -0,0 +1,173 @@
+# backtesting/event_engine.py
+"""
+Backtest por eventos con ejecución realista.
+
+Las velas se recorren una a una y las órdenes se llenan con las mismas reglas
+que broker_client.SimulatedBroker (execute_buy / execute_sell): slippage,
+comisiones, acciones enteras y rechazo si no alcanza el efectivo. Así el P&L
+del backtest coincide con el del broker en vivo.
+
+El estado (efectivo, acciones, precio medio) vive en arreglos de NumPy con una
+columna por cuenta independiente ("carril"): un símbolo, o una combinación de
+parámetros sobre el mismo símbolo. Cada paso procesa todos los carriles a la
+vez y solo toca los que tienen una orden, así se simulan millones de
+velas x carril por segundo.
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backtesting.metrics import max_drawdown, sharpe_ratio
+from broker_client import NO_COSTS, CostModel, average_price, execute_buy, execute_sell
+
+DEFAULT_COSTS = CostModel(commission_per_share=0.005, min_commission=1.0, slippage_bps=5, integer_shares=True)
+
+
+@dataclass
+class EventBacktestResult:
+    equity: np.ndarray       # (tiempo, carriles) valor de cada cuenta al cierre
+    position: np.ndarray     # (tiempo, carriles) acciones en cartera al cierre
+    cash: np.ndarray         # (carriles,) efectivo final
+    trades: np.ndarray       # (carriles,) órdenes ejecutadas
+    rejected: np.ndarray     # (carriles,) compras rechazadas por efectivo
+    commissions: np.ndarray  # (carriles,) comisiones pagadas
+    bars_per_second: float
+
+    def metrics(self, labels=None) -> pd.DataFrame:
+        """Retorno total, Sharpe y drawdown por carril (con backtesting/metrics)."""
+        rows = []
+        for i in range(self.equity.shape[1]):
+            curve = self.equity[:, i]
+            rows.append({
+                "total_return": curve[-1] / curve[0] - 1,
+                "sharpe": sharpe_ratio(np.diff(curve) / curve[:-1]),
+                "max_drawdown": max_drawdown(curve),
+                "trades": int(self.trades[i]),
+                "rejected": int(self.rejected[i]),
+                "commissions": float(self.commissions[i]),
+            })
+        return pd.DataFrame(rows, index=labels)
+
+
+class EventBacktester:
+    """
+    Estrategia long/flat: target 1 = estar comprado, 0 = fuera del mercado.
+    La decisión tomada al cierre de la vela t se ejecuta `delay` velas después
+    al precio `fill_prices` (por defecto, la apertura de la vela siguiente).
+    """
+
+    def __init__(self, costs: CostModel = DEFAULT_COSTS, initial_cash: float = 10_000.0,
+                 allocation: float = 1.0, delay: int = 1):
+        self.costs = costs
+        self.initial_cash = initial_cash
+        self.allocation = allocation  # fracción del efectivo que se invierte en cada entrada
+        self.delay = delay
+
+    def run(self, close, targets, fill_prices=None) -> EventBacktestResult:
+        """
+        close, targets y fill_prices: arreglos (tiempo,) o (tiempo, carriles).
+        NaN en el precio = sin vela para ese carril (no se opera; se valora al último cierre).
+        """
+        close = _as_lanes(close)
+        targets = np.broadcast_to(_as_lanes(targets), close.shape)
+        fills = close if fill_prices is None else _as_lanes(fill_prices)
+        n_bars, n_lanes = close.shape
+
+        # Decisión en t → orden que se ejecuta en t + delay
+        desired = np.zeros(close.shape, dtype=bool)
+        desired[self.delay:] = np.nan_to_num(targets[:n_bars - self.delay]) > 0
+        marks = pd.DataFrame(close).ffill().to_numpy()
+
+        cash = np.full(n_lanes, float(self.initial_cash))
+        qty = np.zeros(n_lanes)
+        avg = np.zeros(n_lanes)
+        trades = np.zeros(n_lanes, dtype=np.int64)
+        rejected = np.zeros(n_lanes, dtype=np.int64)
+        commissions = np.zeros(n_lanes)
+        equity = np.empty(close.shape)
+        position = np.empty(close.shape)
+
+        start = time.perf_counter()
+        for t in range(n_bars):
+            want = desired[t]
+            tradable = ~np.isnan(fills[t])
+            holding = qty > 0
+
+            # Entradas: carriles que quieren estar comprados y están fuera
+            lanes = np.flatnonzero(want & ~holding & tradable)
+            if lanes.size:
+                price = fills[t, lanes]
+                order = self.costs.affordable_qty(cash[lanes] * self.allocation, price)
+                filled, fill, cash_delta = execute_buy(cash[lanes], order, price, self.costs)
+                done = filled > 0
+                commissions[lanes] += np.where(done, -cash_delta - filled * fill, 0.0)
+                avg[lanes] = np.where(done, average_price(qty[lanes], avg[lanes], filled, fill), avg[lanes])
+                qty[lanes] += filled
+                cash[lanes] += cash_delta
+                trades[lanes] += done
+                rejected[lanes] += ~done
+
+            # Salidas: carriles comprados que quieren estar fuera
+            lanes = np.flatnonzero(~want & holding & tradable)
+            if lanes.size:
+                price = fills[t, lanes]
+                filled, fill, cash_delta = execute_sell(qty[lanes], qty[lanes], price, self.costs)
+                commissions[lanes] += filled * fill - cash_delta
+                qty[lanes] -= filled
+                cash[lanes] += cash_delta
+                trades[lanes] += filled > 0
+
+            position[t] = qty
+            equity[t] = cash + qty * np.nan_to_num(marks[t])
+        elapsed = time.perf_counter() - start
+
+        return EventBacktestResult(
+            equity=equity, position=position, cash=cash, trades=trades, rejected=rejected,
+            commissions=commissions, bars_per_second=n_bars * n_lanes / max(elapsed, 1e-9),
+        )
+
+    def run_frame(self, df: pd.DataFrame, targets: pd.Series, fill_field: str = "Open") -> pd.DataFrame:
+        """Un símbolo: velas OHLCV + target por vela → DataFrame con equity y posición."""
+        fill_prices = df[fill_field] if self.delay > 0 else df["Close"]
+        result = self.run(df["Close"].to_numpy(), targets.reindex(df.index).to_numpy(dtype=float),
+                          fill_prices.to_numpy())
+        return pd.DataFrame({"equity": result.equity[:, 0], "position": result.position[:, 0]}, index=df.index)
+
+
+def _as_lanes(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, np.newaxis] if values.ndim == 1 else values
+
+
+# ================================
+# ESTRATEGIA DE MEDIAS MÓVILES
+# ================================
+
+def sma_targets(close: np.ndarray, short_window: int, long_window: int) -> np.ndarray:
+    """Target 1 cuando SMA corta > SMA larga (misma regla que backtest.py)."""
+    close = pd.DataFrame(_as_lanes(close))
+    return (close.rolling(short_window).mean() > close.rolling(long_window).mean()).to_numpy(dtype=float)
+
+
+def main(symbols=("AAPL", "MSFT", "GOOGL", "AMZN"), short_window: int = 20, long_window: int = 50,
+         period: str = "5y", provider=None):
+    from market_data import get_many_bars, to_panel, use_provider
+
+    use_provider(provider)
+    frames = get_many_bars(list(symbols), period=period, interval="1d")
+    close = to_panel(frames, "Close")
+    opens = to_panel(frames, "Open").reindex_like(close)
+    targets = sma_targets(close.to_numpy(), short_window, long_window)
+
+    print(f"\n=== SMA {short_window}/{long_window}: sin costos vs ejecución realista ===")
+    for name, costs in (("sin costos", NO_COSTS), ("realista", DEFAULT_COSTS)):
+        result = EventBacktester(costs=costs).run(close.to_numpy(), targets, opens.to_numpy())
+        print(f"\n--- {name} ({result.bars_per_second:,.0f} velas/s) ---")
+        print(result.metrics(labels=close.columns).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# batch_inference.py
+"""
+Inferencia por lotes para todo el universo.
+
+En lugar de llamar model.predict_proba con una fila por símbolo (donde domina
+el costo fijo de cada llamada a sklearn), se toma la última fila de features
+de cada símbolo, se apilan en una matriz contigua y se obtienen todas las
+probabilidades con UNA llamada por modelo.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from feature_store import get_feature_store
+from ml_model import load_model
+
+
+def latest_feature_matrix(frames: dict, feature_cols, interval: str = "1d", engines: dict = None):
+    """
+    Matriz (símbolos x features) con la última fila de cada símbolo.
+    Devuelve (símbolos, X) solo con los símbolos que tienen todas las features definidas.
+
+    Con `engines` ({símbolo: StreamingFeatures}) se usan los motores incrementales;
+    si no, el feature store.
+    """
+    feature_cols = list(feature_cols)
+    symbols, rows = [], []
+
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+
+        try:
+            if engines is not None:
+                engine = engines[symbol]
+                engine.sync(df)
+                row = [engine.features.get(c, math.nan) for c in feature_cols]
+            else:
+                features = get_feature_store().get(symbol, df, feature_cols, interval=interval, dropna=False)
+                row = features.iloc[-1].tolist()
+        except Exception as e:
+            # Un símbolo con datos o features inválidos no tumba al resto del lote
+            print(f"❌ Error con {symbol} al calcular features: {e}")
+            continue
+
+        if any(math.isnan(v) for v in row):
+            continue
+        symbols.append(symbol)
+        rows.append(row)
+
+    X = np.array(rows, dtype=np.float64).reshape(len(rows), len(feature_cols))
+    return symbols, X
+
+
+def predict_universe(frames: dict, model=None, feature_cols=None, interval: str = "1d",
+                     engines: dict = None) -> dict:
+    """
+    Probabilidad de subida {símbolo: prob} para todo el universo.
+
+    Con `model` se usa ese modelo para todos; si no, cada símbolo usa el de
+    ml_model.load_model(símbolo) y se hace una llamada por cada modelo distinto.
+    Los símbolos sin datos, sin historia suficiente, sin modelo o con errores
+    no aparecen en el resultado (se informan y se sigue con el resto).
+    """
+    if model is not None:
+        groups = {id(model): (model, list(feature_cols), list(frames))}
+    else:
+        groups = {}
+        for symbol in frames:
+            try:
+                m, cols = load_model(symbol)
+            except FileNotFoundError as e:
+                print(f"❌ Error con {symbol}: {e}")
+                continue
+            groups.setdefault(id(m), (m, cols, []))[2].append(symbol)
+
+    probs = {}
+    for m, cols, symbols in groups.values():
+        names, X = latest_feature_matrix({s: frames[s] for s in symbols}, cols, interval, engines)
+        if not names:
+            continue
+        try:
+            # Con nombres de columna, como se entrenó (si no, sklearn avisa en cada llamada)
+            proba_up = m.predict_proba(pd.DataFrame(X, columns=cols))[:, 1]
+        except Exception as e:
+            print(f"❌ Error al predecir {', '.join(names)}: {e}")
+            continue
+        probs.update(zip(names, proba_up.tolist()))
+    return probs
@@ -1,9 +1,11 @@
 import time
-import joblib
-import yfinance as yf
 import numpy as np
 from datetime import datetime
 
+from market_data import get_bars, use_provider
+from model_registry import get_registry
+from streaming_features import StreamingFeatures
+
 # ==========================
 # Configuración del Bot
 # ==========================
@@ -34,7 +36,7 @@ def log(msg):
 
 def load_model(model_path):
     """Carga el modelo entrenado."""
-    model, feature_cols = joblib.load(model_path)
+    model, feature_cols = get_registry().get(model_path)
     return model, feature_cols
 
 
@@ -122,22 +124,31 @@ def show_portfolio(price):
 # MAIN LOOP DEL BOT
 # ==========================
 
-def main():
+def main(provider=None):
+    use_provider(provider)
     print("🤖 Iniciando Bot Cuantitativo Híbrido (SMA + IA)...")
 
-    model, feature_cols = load_model(MODEL_PATH)
+    engine = StreamingFeatures()
 
     while True:
+        # El registro solo relee el disco si se publicó un modelo nuevo
+        model, feature_cols = load_model(MODEL_PATH)
         log(f"Revisando {SYMBOL}...")
 
-        df = yf.download(SYMBOL, period=PERIOD, interval=INTERVAL)
+        df = get_bars(SYMBOL, period=PERIOD, interval=INTERVAL)
 
         sma_signal, price, sma20, sma50 = compute_sma_signal(df)
         print(f"📊 SMA Signal → {sma_signal}")
         print(f"   Close: {price:.2f} | SMA 20: {sma20:.2f} | SMA 50: {sma50:.2f}")
 
-        df_feat = compute_features(df)
-        last_row = df_feat.iloc[-1][feature_cols].values.reshape(1, -1)
+        # Features incrementales: solo se procesan las velas nuevas
+        engine.sync(df)
+        if not engine.ready_for(feature_cols):
+            # Calentamiento o hueco en los datos: no se decide con NaN
+            print("⚠️ Features incompletas (calentamiento o datos faltantes), se omite esta vela.")
+            time.sleep(INTERVAL_SECONDS)
+            continue
+        last_row = engine.latest(feature_cols).values
 
         ml_prob = model.predict_proba(last_row)[0][1]
         print(f"🤖 IA - Probabilidad de subida: {ml_prob*100:.2f}%")
@@ -10,12 +10,13 @@ Bot cuantitativo híbrido multi-activos:
 import time
 from datetime import datetime
 
-import yfinance as yf
 import pandas as pd
-import joblib
 
+from batch_inference import predict_universe
 from broker_client import SimulatedBroker
-from feature_engineering import add_basic_features
+from market_data import get_bars, get_many_bars, use_provider
+from model_registry import get_registry
+from streaming_features import StreamingFeatures
 
 # =========================
 # CONFIGURACIÓN DEL BOT
@@ -34,22 +35,18 @@ MODEL_PATH = "models/random_forest_aapl.pkl"
 
 def load_model():
     """Carga el modelo entrenado y las columnas de features."""
-    model, feature_cols = joblib.load(MODEL_PATH)
+    model, feature_cols = get_registry().get(MODEL_PATH)
     return model, feature_cols
 
 
 def download_data_symbol(symbol: str, period: str, interval: str) -> pd.DataFrame:
-    """Descarga datos de UN símbolo y normaliza columnas."""
-    df = yf.download(symbol, period=period, interval=interval)
-    df = df.dropna()
+    """Obtiene datos de UN símbolo desde el caché local (solo descarga la cola que falta)."""
+    return get_bars(symbol, period=period, interval=interval)
 
-    # Normalizar columnas si vienen como MultiIndex
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
-    else:
-        df.columns = [str(c) for c in df.columns]
 
-    return df
+def download_data_universe(symbols, period: str, interval: str) -> dict:
+    """Obtiene datos de TODOS los símbolos en una sola descarga por lotes."""
+    return get_many_bars(symbols, period=period, interval=interval)
 
 
 def compute_sma_signal(df: pd.DataFrame) -> tuple[str, float, float, float]:
@@ -90,41 +87,28 @@ def compute_sma_signal(df: pd.DataFrame) -> tuple[str, float, float, float]:
     return signal, price, sma_short, sma_long
 
 
-def compute_ml_signal(df: pd.DataFrame, model, feature_cols):
-    """
-    Aplica feature engineering y devuelve:
-    - probabilidad de subida (float entre 0 y 1)
-    """
-    df_feat = add_basic_features(df)
-    df_feat = df_feat.dropna()
-    if df_feat.empty:
-        return None
-
-    last_row = df_feat.iloc[-1]
-
-    # Construimos X con las mismas columnas que usó el modelo
-    X = last_row[feature_cols].to_frame().T
-    X.columns = feature_cols
-
-    proba_up = model.predict_proba(X)[0][1]
-    return proba_up
-
-
-def main():
+def main(provider=None):
+    use_provider(provider)
     print("🚀 Iniciando Bot Cuantitativo Híbrido Multi-Activos (SMA + IA)...")
 
-    model, feature_cols = load_model()
     broker = SimulatedBroker(cash=10_000.0)
+    engines = {symbol: StreamingFeatures() for symbol in TICKERS}
 
     while True:
+        # El registro solo relee el disco si se publicó un modelo nuevo
+        model, feature_cols = load_model()
         print(f"\n🕒 {datetime.now()} - Revisando portafolio: {', '.join(TICKERS)}")
 
         prices_for_portfolio = {}
+        universe = download_data_universe(TICKERS, PERIOD, INTERVAL)
+
+        # IA para todo el universo: una sola llamada a predict_proba
+        ml_probs = predict_universe(universe, model, feature_cols, INTERVAL, engines)
 
         for symbol in TICKERS:
             print(f"\n=== Analizando {symbol} ===")
 
-            df = download_data_symbol(symbol, PERIOD, INTERVAL)
+            df = universe[symbol]
             if df.empty:
                 print(f"❌ No se pudieron obtener datos para {symbol}.")
                 continue
@@ -136,8 +120,8 @@ def main():
             print(f"📊 SMA Signal ({symbol}) → {sma_signal}")
             print(f"   Close: {price:.2f} | SMA {SHORT_WINDOW}: {sma_short:.2f} | SMA {LONG_WINDOW}: {sma_long:.2f}")
 
-            # 2. IA por símbolo (usando mismo modelo entrenado)
-            proba_up = compute_ml_signal(df, model, feature_cols)
+            # 2. IA por símbolo (calculada por lotes arriba con el mismo modelo)
+            proba_up = ml_probs.get(symbol)
             if proba_up is None:
                 print(f"❌ No se pudo calcular la señal de IA para {symbol}.")
                 continue
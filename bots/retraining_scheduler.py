@@ -1,17 +1,34 @@
 import schedule
+import threading
 import time
-import subprocess
 from datetime import datetime
 
+from retraining import IncrementalRetrainer
+
+retrainer = IncrementalRetrainer()
+_running = threading.Lock()
+
+
+def _run_retrain():
+    try:
+        mode = retrainer.retrain()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"✅ {timestamp} : Entrenamiento completado ({mode}).")
+    except Exception as e:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"❌ {timestamp} : Error entrenando modelos: {e}")
+    finally:
+        _running.release()
+
+
 def retrain():
-    print("\n🔄 Ejecutando re-entrenamiento automátido...")
-    result = subprocess.run(["python", "ml_model.py"])
-
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    if result.returncode == 0:
-        print(f"✅ {timestamp} : Entrenamiento completado.")
-    else:
-        print(f"❌ {timestamp} : Error entrenando modelos.")
+    print("\n🔄 Ejecutando re-entrenamiento automático...")
+
+    # En un hilo aparte: el planificador no se bloquea y nunca corren dos a la vez
+    if not _running.acquire(blocking=False):
+        print("⏳ Ya hay un re-entrenamiento en curso, se omite.")
+        return
+    threading.Thread(target=_run_retrain, daemon=True).start()
 
 def main():
     print("📅 Re-entrenamiento diario activado.")
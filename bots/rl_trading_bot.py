@@ -1,25 +1,33 @@
 import time
-import yfinance as yf
-from stable_baselines3 import PPO
 
-model = PPO.load("models/reinforcement_agent.pkl")
+from market_data import use_provider
+from rl_inference import get_rl_service
 
-def run_rl_bot(symbol="AAPL"):
-    print("🤖 Ejecutando RL Trading Bot...")
+SYMBOLS = ["AAPL", "MSFT", "AMZN"]
 
-    df = yf.download(symbol, period="5d", interval="1h")
-    obs = df.iloc[-1].values
+def run_rl_bot(symbols=SYMBOLS):
+    print("🤖 Ejecutando RL Trading Bot...")
 
-    action, _ = model.predict(obs, deterministic=True)
+    # Política cargada una vez; observaciones como en el entrenamiento, todo el universo en lote
+    actions = get_rl_service().predict_symbols(symbols)
 
-    if action == 1:
-        print("🟢 RL → BUY")
-    elif action == 2:
-        print("🔴 RL → SELL")
-    else:
-        print("🟡 RL → HOLD")
+    for symbol in symbols:
+        action = actions.get(symbol)
+        if action == "BUY":
+            print(f"🟢 RL ({symbol}) → BUY")
+        elif action == "SELL":
+            print(f"🔴 RL ({symbol}) → SELL")
+        elif action == "HOLD":
+            print(f"🟡 RL ({symbol}) → HOLD")
+        else:
+            print(f"❌ RL ({symbol}) → sin datos")
 
-if __name__ == "__main__":
+def main(provider=None):
+    use_provider(provider)
     while True:
         run_rl_bot()
         time.sleep(60)
+
+
+if __name__ == "__main__":
+    main()
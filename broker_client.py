@@ -2,11 +2,82 @@
 """
 Broker simulado para pruebas.
 No se conecta a ningún broker real, solo mantiene un portafolio en memoria.
+
+Las reglas de ejecución (precio con slippage, comisiones, acciones enteras,
+límite de efectivo) están en execute_buy / execute_sell. Funcionan igual con
+escalares y con arreglos de NumPy: el broker las usa orden a orden y
+backtesting/event_engine.py las usa para miles de cuentas a la vez, así el
+backtest llena las órdenes exactamente como en vivo.
 """
 
 from dataclasses import dataclass, field
 from typing import Dict
 
+import numpy as np
+
+
+# ================================
+# MODELO DE COSTOS Y REGLAS DE EJECUCIÓN
+# ================================
+
+@dataclass(frozen=True)
+class CostModel:
+    commission_per_share: float = 0.0  # USD por acción
+    commission_pct: float = 0.0        # fracción del nocional (0.001 = 0.1%)
+    min_commission: float = 0.0        # USD mínimos por orden ejecutada
+    slippage_bps: float = 0.0          # puntos básicos en contra de la orden
+    integer_shares: bool = False       # redondear cantidades hacia abajo a acciones enteras
+
+    def fill_price(self, price, side: int):
+        """Precio de ejecución: side=+1 compra (paga más), side=-1 venta (recibe menos)."""
+        return price * (1 + side * self.slippage_bps / 10_000)
+
+    def commission(self, qty, fill_price):
+        fee = qty * (self.commission_per_share + fill_price * self.commission_pct)
+        return np.where(qty > 0, np.maximum(fee, self.min_commission), 0.0)
+
+    def affordable_qty(self, budget, price):
+        """Cantidad máxima que se puede comprar con `budget` incluyendo slippage y comisiones."""
+        fill = self.fill_price(price, 1)
+        qty = np.maximum(budget - self.min_commission, 0.0) / (fill * (1 + self.commission_pct) + self.commission_per_share)
+        qty = qty * (1 - 1e-12)  # margen de redondeo: qty * precio no debe pasarse del presupuesto
+        return np.floor(qty) if self.integer_shares else qty
+
+
+NO_COSTS = CostModel()
+
+
+def execute_buy(cash, qty, price, costs: CostModel = NO_COSTS):
+    """
+    Compra a mercado. Devuelve (cantidad ejecutada, precio de ejecución, variación de efectivo).
+    Si el costo total supera el efectivo la orden se rechaza entera (cantidad 0).
+    """
+    if costs.integer_shares:
+        qty = np.floor(qty)
+    fill = costs.fill_price(price, 1)
+    total = qty * fill + costs.commission(qty, fill)
+    ok = (qty > 0) & (total <= cash)
+    return np.where(ok, qty, 0.0), fill, np.where(ok, -total, 0.0)
+
+
+def execute_sell(held, qty, price, costs: CostModel = NO_COSTS):
+    """
+    Venta a mercado de hasta `held` acciones.
+    Devuelve (cantidad ejecutada, precio de ejecución, variación de efectivo).
+    """
+    qty = np.minimum(qty, held)
+    if costs.integer_shares:
+        qty = np.floor(qty)
+    qty = np.maximum(qty, 0.0)
+    fill = costs.fill_price(price, -1)
+    return qty, fill, qty * fill - costs.commission(qty, fill)
+
+
+def average_price(qty, avg_price, filled, fill_price):
+    """Precio medio de la posición después de comprar `filled` a `fill_price`."""
+    total = qty + filled
+    return np.where(total > 0, (avg_price * qty + filled * fill_price) / np.where(total > 0, total, 1), 0.0)
+
 
 @dataclass
 class Position:
@@ -19,6 +90,7 @@ class Position:
 class SimulatedBroker:
     cash: float = 10_000.0  # capital inicial en USD (simulado)
     positions: Dict[str, Position] = field(default_factory=dict)
+    costs: CostModel = NO_COSTS
 
     def get_portfolio_value(self, prices: Dict[str, float]) -> float:
         """Calcula el valor total del portafolio: efectivo + valor de posiciones."""
@@ -28,25 +100,39 @@ class SimulatedBroker:
             value += pos.qty * price
         return value
 
+    def _invalid_qty(self, side: str, symbol: str, qty: float) -> bool:
+        """Informa y devuelve True si `qty` no da ninguna acción ejecutable."""
+        if qty <= 0:
+            print(f"❌ Cantidad inválida para {side} {symbol}: {qty:g}")
+            return True
+        if self.costs.integer_shares and np.floor(qty) <= 0:
+            print(f"❌ {qty:g} de {symbol} es menos de una acción entera; no se puede {side}.")
+            return True
+        return False
+
     def buy(self, symbol: str, qty: float, price: float):
         """Compra simulada a mercado."""
-        cost = qty * price
-        if cost > self.cash:
-            print(f"❌ No hay suficiente efectivo para comprar {qty} de {symbol} a {price}")
+        if self._invalid_qty("comprar", symbol, qty):
+            return
+        filled, fill, cash_delta = (float(x) for x in execute_buy(self.cash, qty, price, self.costs))
+        if filled <= 0:
+            shares = np.floor(qty) if self.costs.integer_shares else qty
+            fill = float(self.costs.fill_price(price, 1))
+            total = shares * fill + float(self.costs.commission(shares, fill))
+            print(f"❌ No hay suficiente efectivo para comprar {shares:g} de {symbol} @ {fill:.2f}: "
+                  f"costo {total:.2f} (con comisiones), efectivo {self.cash:.2f}")
             return
 
-        self.cash -= cost
+        self.cash += cash_delta
 
         if symbol in self.positions:
             pos = self.positions[symbol]
-            total_qty = pos.qty + qty
-            new_avg = (pos.avg_price * pos.qty + cost) / total_qty
-            pos.qty = total_qty
-            pos.avg_price = new_avg
+            pos.avg_price = float(average_price(pos.qty, pos.avg_price, filled, fill))
+            pos.qty += filled
         else:
-            self.positions[symbol] = Position(symbol=symbol, qty=qty, avg_price=price)
+            self.positions[symbol] = Position(symbol=symbol, qty=filled, avg_price=fill)
 
-        print(f"✅ COMPRA simulada: {qty} x {symbol} @ {price:.2f} | Cash restante: {self.cash:.2f}")
+        print(f"✅ COMPRA simulada: {filled:g} x {symbol} @ {fill:.2f} | Cash restante: {self.cash:.2f}")
 
     def sell(self, symbol: str, qty: float, price: float):
         """Venta simulada a mercado."""
@@ -54,18 +140,22 @@ class SimulatedBroker:
             print(f"❌ No hay posición en {symbol} para vender.")
             return
 
+        if self._invalid_qty("vender", symbol, qty):
+            return
         pos = self.positions[symbol]
-        if qty > pos.qty:
-            qty = pos.qty
+        filled, fill, cash_delta = (float(x) for x in execute_sell(pos.qty, qty, price, self.costs))
+        if filled <= 0:
+            print(f"❌ La posición en {symbol} ({pos.qty:g}) no alcanza una acción entera para vender.")
+            return
 
-        ingreso = qty * price
-        self.cash += ingreso
-        pos.qty -= qty
+        self.cash += cash_delta
+        pos.qty -= filled
 
         if pos.qty <= 0:
             del self.positions[symbol]
 
-        print(f"✅ VENTA simulada: {qty} x {symbol} @ {price:.2f} | Cash ahora: {self.cash:.2f}")
+        capped = f" (de {qty:g} pedidas)" if filled < qty else ""
+        print(f"✅ VENTA simulada: {filled:g} x {symbol}{capped} @ {fill:.2f} | Cash ahora: {self.cash:.2f}")
 
     def print_status(self, prices: Dict[str, float]):
         """Muestra estado general del portafolio."""
@@ -0,0 +1,202 @@
+# compact_forest.py
+"""
+RandomForest compacto respaldado por arreglos NumPy.
+
+Exporta un RandomForestClassifier entrenado a unos pocos arreglos planos con
+todos los nodos de todos los árboles (feature, umbral, hijos y valores de hoja)
+y los evalúa de forma vectorizada: todas las filas bajan por todos los árboles
+a la vez, un nivel por iteración. Las probabilidades son idénticas a las de
+sklearn, con mucha menos latencia por llamada y un archivo más pequeño.
+
+Está pensado para pocas filas por llamada (bots, API, predict_universe); en
+lotes de cientos de filas el recorrido en Cython de sklearn sigue siendo más rápido.
+
+Uso:
+    forest = CompactForest.from_sklearn(model, feature_cols)
+    forest.save("models/random_forest_aapl.npz")
+    forest = CompactForest.load("models/random_forest_aapl.npz")
+    prob_up = forest.predict_proba(X)[:, 1]
+"""
+
+import os
+import time
+
+import numpy as np
+
+from feature_store import get_feature_store
+from market_data import get_bars
+from ml_model import INTERVAL, MODEL_PATH, PERIOD, SYMBOL, load_model
+
+COMPACT_MODEL_PATH = "models/random_forest_aapl.npz"
+
+
+class CompactForest:
+    """
+    Nodos de todos los árboles concatenados:
+    - feature   → int32, feature que evalúa cada nodo (0 en las hojas)
+    - threshold → float64, umbral (x <= umbral va a la izquierda)
+    - left/right → int32, índice global de los hijos; las hojas apuntan a sí mismas
+    - value     → float64 (nodos, clases), probabilidad de cada clase en la hoja
+    - roots     → int32, nodo raíz de cada árbol
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes, feature_cols):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.feature_cols = list(feature_cols)
+
+    # ================================
+    # EXPORTACIÓN
+    # ================================
+
+    @classmethod
+    def from_sklearn(cls, model, feature_cols) -> "CompactForest":
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            nodes = np.arange(n, dtype=np.int32) + offset
+            leaf = tree.children_left == -1
+
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(leaf, nodes, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, nodes, tree.children_right + offset).astype(np.int32))
+
+            # Misma normalización que DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds),
+            np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(values), np.array(roots, dtype=np.int32),
+            max_depth, np.asarray(model.classes_), feature_cols,
+        )
+
+    # ================================
+    # EVALUACIÓN
+    # ================================
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilidades (filas, clases), iguales a RandomForestClassifier.predict_proba."""
+        # sklearn evalúa los árboles en float32
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        x_flat = X.ravel()
+
+        # Nodo actual de cada (árbol, fila), aplanado; solo se siguen los que no llegaron a hoja
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows) * n_features, len(self.roots))
+        active = np.arange(len(node))
+
+        for _ in range(self.max_depth):
+            current = node[active]
+            x = x_flat.take(row_offset[active] + self.feature.take(current))
+            nxt = np.where(x <= self.threshold.take(current), self.left.take(current), self.right.take(current))
+            node[active] = nxt
+            # Las hojas apuntan a sí mismas: si no se movió, ese camino terminó
+            moving = nxt != current
+            if not moving.all():
+                active = active[moving]
+                if len(active) == 0:
+                    break
+
+        # Suma árbol por árbol (mismo orden que sklearn) y promedio
+        leaves = self.value[node].reshape(len(self.roots), n_rows, -1)
+        return leaves.sum(axis=0) / len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    # ================================
+    # DISCO
+    # ================================
+
+    def save(self, path: str = COMPACT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            value=self.value, roots=self.roots, max_depth=self.max_depth, classes=self.classes_,
+            feature_cols=np.array(self.feature_cols),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = COMPACT_MODEL_PATH) -> "CompactForest":
+        with np.load(path) as data:
+            return cls(
+                data["feature"], data["threshold"], data["left"], data["right"], data["value"],
+                data["roots"], data["max_depth"], data["classes"], data["feature_cols"].tolist(),
+            )
+
+
+# ================================
+# BENCHMARK CONTRA SKLEARN
+# ================================
+
+def _latency(func, X, repeats: int) -> np.ndarray:
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        times[i] = time.perf_counter() - start
+    return times * 1e6  # microsegundos
+
+
+def benchmark(model, forest: CompactForest, X, repeats: int = 200) -> dict:
+    """Compara latencia (fila única y lote) y exactitud del bosque compacto contra sklearn."""
+    X = np.asarray(X, dtype=np.float64)
+    row = X[-1:]
+
+    diff = float(np.abs(model.predict_proba(X) - forest.predict_proba(X)).max())
+    sk_row = _latency(model.predict_proba, row, repeats)
+    cf_row = _latency(forest.predict_proba, row, repeats)
+    sk_batch = _latency(model.predict_proba, X, max(repeats // 10, 5))
+    cf_batch = _latency(forest.predict_proba, X, max(repeats // 10, 5))
+
+    return {
+        "max_abs_diff": diff,
+        "sklearn_row_us_p50": float(np.median(sk_row)),
+        "compact_row_us_p50": float(np.median(cf_row)),
+        "sklearn_batch_us_p50": float(np.median(sk_batch)),
+        "compact_batch_us_p50": float(np.median(cf_batch)),
+        "batch_rows": len(X),
+    }
+
+
+def main():
+    model, feature_cols = load_model(SYMBOL)
+    forest = CompactForest.from_sklearn(model, feature_cols)
+    forest.save(COMPACT_MODEL_PATH)
+
+    df = get_bars(SYMBOL, period=PERIOD, interval=INTERVAL)
+    X = get_feature_store().get(SYMBOL, df, feature_cols, interval=INTERVAL).values
+
+    result = benchmark(model, forest, X)
+    print("\n=== Bosque compacto vs sklearn ===")
+    print(f"Diferencia máxima de probabilidad: {result['max_abs_diff']:.2e}")
+    print(f"1 fila   → sklearn {result['sklearn_row_us_p50']:.0f} µs | compacto {result['compact_row_us_p50']:.0f} µs")
+    print(f"{result['batch_rows']} filas → sklearn {result['sklearn_batch_us_p50']:.0f} µs | "
+          f"compacto {result['compact_batch_us_p50']:.0f} µs")
+    print(f"Disco    → pickle {os.path.getsize(MODEL_PATH) / 1e6:.1f} MB | "
+          f"compacto {os.path.getsize(COMPACT_MODEL_PATH) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,15 @@
 """
 Feature Engineering para el bot cuantitativo:
 Incluye indicadores técnicos: RSI, MACD, EMA, Bollinger Bands, ATR, Momentum, OBV, ROC
+
+Además del cálculo completo (add_basic_features) hay un registro de features
+con sus dependencias y su calentamiento, para calcular solo lo que pide un
+modelo (compute_features).
 """
 
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
 import pandas as pd
 import numpy as np
 
@@ -11,61 +18,48 @@ import numpy as np
 # ================================
 # CÁLCULO DE INDICADORES TÉCNICOS
 # ================================
+# Las fórmulas viven solo en el registro (FEATURES, más abajo); estas funciones
+# agregan las columnas a df usando esas mismas fórmulas.
 
-def add_rsi(df, period=14):
-    delta = df["Close"].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-    rs = gain / loss
-    df["RSI"] = 100 - (100 / (1 + rs))
+def _add(df, names, **params):
+    """Agrega a df las features `names` (en orden de dependencias) con las fórmulas del registro."""
+    for name in names:
+        df[name] = FEATURES[name].func(df, **params)
     return df
 
 
+def add_rsi(df, period=14):
+    return _add(df, ["RSI"], period=period)
+
+
 def add_macd(df):
-    df["EMA12"] = df["Close"].ewm(span=12, adjust=False).mean()
-    df["EMA26"] = df["Close"].ewm(span=26, adjust=False).mean()
-    df["MACD"] = df["EMA12"] - df["EMA26"]
-    df["MACD_signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-    df["MACD_hist"] = df["MACD"] - df["MACD_signal"]
-    return df
+    return _add(df, ["EMA12", "EMA26", "MACD", "MACD_signal", "MACD_hist"])
 
 
 def add_ema(df):
-    df["EMA20"] = df["Close"].ewm(span=20, adjust=False).mean()
-    df["EMA50"] = df["Close"].ewm(span=50, adjust=False).mean()
-    return df
+    return _add(df, ["EMA20", "EMA50"])
 
 
 def add_bollinger(df, window=20):
-    df["BB_middle"] = df["Close"].rolling(window).mean()
-    df["BB_std"] = df["Close"].rolling(window).std()
-    df["BB_upper"] = df["BB_middle"] + 2 * df["BB_std"]
-    df["BB_lower"] = df["BB_middle"] - 2 * df["BB_std"]
-    return df
+    _add(df, ["BB_middle", "BB_std"], window=window)
+    return _add(df, ["BB_upper", "BB_lower"])
 
 
 def add_atr(df, period=14):
-    df["H-L"] = df["High"] - df["Low"]
-    df["H-C"] = abs(df["High"] - df["Close"].shift())
-    df["L-C"] = abs(df["Low"] - df["Close"].shift())
-    df["TR"] = df[["H-L", "H-C", "L-C"]].max(axis=1)
-    df["ATR"] = df["TR"].rolling(period).mean()
-    return df
+    _add(df, ["H-L", "H-C", "L-C", "TR"])
+    return _add(df, ["ATR"], period=period)
 
 
 def add_momentum(df, period=10):
-    df["Momentum"] = df["Close"] - df["Close"].shift(period)
-    return df
+    return _add(df, ["Momentum"], period=period)
 
 
 def add_roc(df, period=10):
-    df["ROC"] = df["Close"].pct_change(period)
-    return df
+    return _add(df, ["ROC"], period=period)
 
 
 def add_obv(df):
-    df["OBV"] = (np.sign(df["Close"].diff()) * df["Volume"]).fillna(0).cumsum()
-    return df
+    return _add(df, ["OBV"])
 
 
 def add_basic_features(df):
@@ -74,9 +68,7 @@ def add_basic_features(df):
     df = df.copy()
 
     # Cambios de precio
-    df["return_1d"] = df["Close"].pct_change()
-    df["volatility_5"] = df["Close"].pct_change().rolling(5).std()
-    df["lag_return_1"] = df["return_1d"].shift(1)
+    df = _add(df, ["return_1d", "volatility_5", "lag_return_1"])
 
     # Indicadores técnicos avanzados
     df = add_rsi(df)
@@ -92,9 +84,268 @@ def add_basic_features(df):
     return df
 
 
+def labeled_rows(df):
+    """
+    Filas con target real: en la última vela todavía no se conoce el cierre
+    siguiente y add_target_direction le pone 0, así que no sirve para entrenar ni evaluar.
+    """
+    return df[df["Close"].shift(-1).notna()]
+
+
 def add_target_direction(df):
     """Target binario: 1 si mañana sube, 0 si baja."""
     df = df.copy()
     df["target_up"] = (df["Close"].shift(-1) > df["Close"]).astype(int)
     df = df.dropna()
     return df
+
+
+def labeled_rows(df):
+    """
+    Filas con target real: en la última vela todavía no se conoce el cierre
+    siguiente y add_target_direction le pone 0, así que no sirve para entrenar ni evaluar.
+    """
+    return df[df["Close"].shift(-1).notna()]
+
+
+# ================================
+# REGISTRO DE FEATURES CON DEPENDENCIAS
+# ================================
+
+RAW_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    name: str
+    inputs: Tuple[str, ...]
+    warmup: int          # filas iniciales sin valor que añade esta feature sobre sus entradas
+    func: Callable
+    stateful: bool = False  # depende de toda la historia (EMA/OBV), no solo de una ventana
+
+
+FEATURES: Dict[str, FeatureSpec] = {}
+
+
+def feature(name, inputs, warmup=0, stateful=False):
+    """Decorador: registra una feature con sus entradas y su calentamiento."""
+    def decorator(func):
+        FEATURES[name] = FeatureSpec(name, tuple(inputs), warmup, func, stateful)
+        return func
+    return decorator
+
+
+@feature("return_1d", ["Close"], warmup=1)
+def _return_1d(c):
+    return c["Close"].pct_change()
+
+
+@feature("volatility_5", ["return_1d"], warmup=4)
+def _volatility_5(c):
+    return c["return_1d"].rolling(5).std()
+
+
+@feature("lag_return_1", ["return_1d"], warmup=1)
+def _lag_return_1(c):
+    return c["return_1d"].shift(1)
+
+
+@feature("RSI", ["Close"], warmup=13)
+def _rsi(c, period=14):
+    delta = c["Close"].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+@feature("EMA12", ["Close"], stateful=True)
+def _ema12(c):
+    return c["Close"].ewm(span=12, adjust=False).mean()
+
+
+@feature("EMA26", ["Close"], stateful=True)
+def _ema26(c):
+    return c["Close"].ewm(span=26, adjust=False).mean()
+
+
+@feature("MACD", ["EMA12", "EMA26"])
+def _macd(c):
+    return c["EMA12"] - c["EMA26"]
+
+
+@feature("MACD_signal", ["MACD"], stateful=True)
+def _macd_signal(c):
+    return c["MACD"].ewm(span=9, adjust=False).mean()
+
+
+@feature("MACD_hist", ["MACD", "MACD_signal"])
+def _macd_hist(c):
+    return c["MACD"] - c["MACD_signal"]
+
+
+@feature("EMA20", ["Close"], stateful=True)
+def _ema20(c):
+    return c["Close"].ewm(span=20, adjust=False).mean()
+
+
+@feature("EMA50", ["Close"], stateful=True)
+def _ema50(c):
+    return c["Close"].ewm(span=50, adjust=False).mean()
+
+
+@feature("BB_middle", ["Close"], warmup=19)
+def _bb_middle(c, window=20):
+    return c["Close"].rolling(window).mean()
+
+
+@feature("BB_std", ["Close"], warmup=19)
+def _bb_std(c, window=20):
+    return c["Close"].rolling(window).std()
+
+
+@feature("BB_upper", ["BB_middle", "BB_std"])
+def _bb_upper(c):
+    return c["BB_middle"] + 2 * c["BB_std"]
+
+
+@feature("BB_lower", ["BB_middle", "BB_std"])
+def _bb_lower(c):
+    return c["BB_middle"] - 2 * c["BB_std"]
+
+
+@feature("H-L", ["High", "Low"])
+def _high_low(c):
+    return c["High"] - c["Low"]
+
+
+@feature("H-C", ["High", "Close"], warmup=1)
+def _high_close(c):
+    return abs(c["High"] - c["Close"].shift())
+
+
+@feature("L-C", ["Low", "Close"], warmup=1)
+def _low_close(c):
+    return abs(c["Low"] - c["Close"].shift())
+
+
+@feature("TR", ["High", "Low", "Close"])
+def _true_range(c):
+    prev_close = c["Close"].shift()
+    ranges = [c["High"] - c["Low"], abs(c["High"] - prev_close), abs(c["Low"] - prev_close)]
+    return pd.concat(ranges, axis=1).max(axis=1)
+
+
+@feature("ATR", ["TR"], warmup=13)
+def _atr(c, period=14):
+    return c["TR"].rolling(period).mean()
+
+
+@feature("Momentum", ["Close"], warmup=10)
+def _momentum(c, period=10):
+    return c["Close"] - c["Close"].shift(period)
+
+
+@feature("ROC", ["Close"], warmup=10)
+def _roc(c, period=10):
+    return c["Close"].pct_change(period)
+
+
+@feature("OBV", ["Close", "Volume"], stateful=True)
+def _obv(c):
+    return (np.sign(c["Close"].diff()) * c["Volume"]).fillna(0).cumsum()
+
+
+def resolve_features(feature_cols) -> list:
+    """Orden de cálculo (dependencias primero) de las features pedidas."""
+    order = []
+
+    def visit(name):
+        if name in RAW_COLUMNS or name in order:
+            return
+        if name not in FEATURES:
+            raise ValueError(f"❌ Feature desconocida: {name}")
+        for dep in FEATURES[name].inputs:
+            visit(dep)
+        order.append(name)
+
+    for name in feature_cols:
+        visit(name)
+    return order
+
+
+def warmup_bars(feature_cols) -> int:
+    """Filas iniciales sin valor que necesitan las features pedidas (incluidas sus dependencias)."""
+    total = {c: 0 for c in RAW_COLUMNS}
+    for name in resolve_features(feature_cols):
+        spec = FEATURES[name]
+        total[name] = spec.warmup + max(total[i] for i in spec.inputs)
+    return max((total[c] for c in feature_cols), default=0)
+
+
+def is_stateful(feature_cols) -> bool:
+    """True si alguna feature pedida (o sus dependencias) depende de toda la historia."""
+    return any(FEATURES[name].stateful for name in resolve_features(feature_cols))
+
+
+def compute_features(df, feature_cols, dtype=None, dropna=True):
+    """
+    Calcula SOLO las features pedidas (p. ej. las feature_cols guardadas con
+    el modelo) y sus dependencias. Devuelve únicamente esas columnas y, con
+    dropna=True, descarta solo las filas donde alguna de ellas no tiene valor.
+    dtype=np.float32 reduce a la mitad la memoria del resultado.
+    """
+    cols = {c: df[c] for c in RAW_COLUMNS if c in df.columns}
+    for name in resolve_features(feature_cols):
+        cols[name] = FEATURES[name].func(cols)
+
+    out = pd.DataFrame({c: cols[c] for c in feature_cols}, index=df.index)
+    if dtype is not None:
+        out = out.astype(dtype)
+    if dropna:
+        out = out.dropna()
+    return out
+
+
+# ================================
+# MÚLTIPLES TEMPORALIDADES
+# ================================
+
+# Regla de pandas y duración nominal de cada temporalidad (velas etiquetadas por su inicio)
+TIMEFRAMES = {
+    "1h": ("1h", pd.Timedelta(hours=1)),
+    "4h": ("4h", pd.Timedelta(hours=4)),
+    "1d": ("1D", pd.Timedelta(days=1)),
+    "1wk": ("W-MON", pd.Timedelta(weeks=1)),
+}
+
+
+def resample_ohlcv(df, timeframe):
+    """Agrega velas finas en velas de `timeframe` ("4h", "1d", "1wk"), etiquetadas por su inicio."""
+    rule, _ = TIMEFRAMES[timeframe]
+    out = df[list(RAW_COLUMNS)].resample(rule, label="left", closed="left").agg({
+        "Open": "first",
+        "High": "max",
+        "Low": "min",
+        "Close": "last",
+        "Volume": "sum",
+    })
+    return out.dropna(subset=["Close"])
+
+
+def join_timeframe(fine, coarse, fine_interval, coarse_timeframe, suffix=None):
+    """
+    Une features de una temporalidad mayor a las filas de la menor SIN lookahead:
+    una vela gruesa solo se usa cuando su intervalo nominal ya terminó
+    (inicio + duración <= fin de la vela fina). La vela gruesa en curso nunca se usa.
+    """
+    suffix = suffix or coarse_timeframe
+    _, fine_span = TIMEFRAMES[fine_interval]
+    _, coarse_span = TIMEFRAMES[coarse_timeframe]
+
+    left = pd.DataFrame({"_ready": fine.index + fine_span}, index=fine.index)
+    right = coarse.add_suffix(f"_{suffix}")
+    right["_ready"] = coarse.index + coarse_span
+
+    merged = pd.merge_asof(left, right, on="_ready", direction="backward")
+    merged.index = fine.index
+    return fine.join(merged.drop(columns="_ready"))
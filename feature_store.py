@@ -0,0 +1,213 @@
+# feature_store.py
+"""
+Almacén de features calculadas, compartido por entrenamiento, backtests, API y bots.
+
+- Clave: símbolo, intervalo, rango de velas (primera y última) y un hash de las
+  definiciones de las features (si cambia el código de una feature, cambia el hash).
+- Memoria: LRU con las matrices más usadas.
+- Disco: un Parquet por (símbolo, intervalo, versión) con toda la historia calculada.
+- Cuando llegan velas nuevas solo se calculan las filas nuevas (más el
+  calentamiento que necesiten). Las features que dependen de toda la historia
+  (EMA, OBV) se recalculan completas para que el resultado sea exacto.
+- Junto a las features se guarda el cierre de cada vela (SOURCE_COLUMN): las
+  filas guardadas solo se reutilizan si las velas pedidas son exactamente las
+  mismas, así otra fuente (replay, sintéticas, panel float32, historia
+  re-ajustada) nunca recibe features ajenas. Las velas float32 usan otro archivo.
+- En disco una ventana corta de la misma fuente nunca reemplaza una historia
+  larga; si las velas del tramo común cambiaron (historia re-ajustada), la
+  historia guardada queda obsoleta y se reemplaza por el recálculo.
+"""
+
+import hashlib
+import inspect
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import FEATURES, compute_features, is_stateful, resolve_features, warmup_bars
+
+FEATURE_STORE_DIR = "data/features"
+SOURCE_COLUMN = "_source_close"
+
+
+def feature_version(feature_cols) -> str:
+    """Hash de las definiciones (código, entradas y calentamiento) de las features pedidas."""
+    return _feature_version(tuple(feature_cols))
+
+
+@lru_cache(maxsize=None)
+def _feature_version(feature_cols: tuple) -> str:
+    h = hashlib.sha1()
+    h.update(",".join(feature_cols).encode())
+    for name in resolve_features(feature_cols):
+        spec = FEATURES[name]
+        h.update(f"{name}|{spec.inputs}|{spec.warmup}|{spec.stateful}".encode())
+        h.update(inspect.getsource(spec.func).encode())
+    return h.hexdigest()[:12]
+
+
+class FeatureStore:
+
+    def __init__(self, root: str = FEATURE_STORE_DIR, max_items: int = 64):
+        self.root = root
+        self.max_items = max_items
+        self._memory = OrderedDict()
+
+    # ================================
+    # DISCO
+    # ================================
+
+    def path(self, symbol: str, interval: str, version: str) -> str:
+        return os.path.join(self.root, interval, f"{symbol}_{version}.parquet")
+
+    def _load(self, symbol: str, interval: str, version: str):
+        # La historia completa también vive en el LRU para no releer el Parquet
+        key = ("history", symbol, interval, version)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        path = self.path(symbol, interval, version)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_parquet(path)
+        self._remember(key, df)
+        return df
+
+    def _save(self, symbol: str, interval: str, version: str, df: pd.DataFrame):
+        self._remember(("history", symbol, interval, version), df)
+        path = self.path(symbol, interval, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    # ================================
+    # MEMORIA (LRU)
+    # ================================
+
+    def _remember(self, key, df: pd.DataFrame):
+        self._memory[key] = df
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    # ================================
+    # CONSULTA
+    # ================================
+
+    def get(self, symbol: str, bars: pd.DataFrame, feature_cols, interval: str = "1d",
+            dtype=None, dropna: bool = True) -> pd.DataFrame:
+        """
+        Features de symbol para las velas `bars` (mismo resultado que
+        compute_features(bars, feature_cols)), reutilizando lo ya calculado.
+        """
+        feature_cols = list(feature_cols)
+        if bars.empty:
+            return pd.DataFrame(columns=feature_cols, dtype=dtype)
+
+        version = feature_version(feature_cols)
+        if bars["Close"].dtype == np.float32:
+            version += "_f32"
+        last = bars.iloc[-1]
+        # La última vela puede seguir abierta: su cierre y volumen forman parte de la clave
+        key = (symbol, interval, bars.index[0], bars.index[-1],
+               float(last["Close"]), float(last["Volume"]), version)
+
+        features = self._memory.get(key)
+        if features is None:
+            features = self._compute(symbol, interval, version, bars, feature_cols)
+            features = features.drop(columns=SOURCE_COLUMN)
+            self._remember(key, features)
+        else:
+            self._memory.move_to_end(key)
+
+        if dtype is not None:
+            features = features.astype(dtype)
+        if dropna:
+            features = features.dropna()
+        return features
+
+    def _compute(self, symbol: str, interval: str, version: str, bars: pd.DataFrame, feature_cols) -> pd.DataFrame:
+        stored = self._load(symbol, interval, version)
+
+        if stored is not None and len(stored) > 1 and not is_stateful(feature_cols) \
+                and stored.index[0] <= bars.index[0]:
+            # Rango ya calculado por completo (p. ej. un backtest histórico)
+            if bars.index[-1] < stored.index[-1]:
+                if _same_bars(stored, bars, bars.index[-1]):
+                    return stored[(stored.index >= bars.index[0]) & (stored.index <= bars.index[-1])]
+
+            else:
+                # La última fila guardada pudo venir de una vela abierta: se recalcula
+                keep = stored.iloc[:-1]
+                known = keep.index[-1]
+                new_pos = bars.index.searchsorted(known, side="right")
+                # +1: las features basadas en diff() necesitan también la vela anterior
+                lookback = warmup_bars(feature_cols) + 1
+
+                if bars.index[0] <= known and new_pos >= lookback and _same_bars(stored, bars, known):
+                    window = bars.iloc[new_pos - lookback:]
+                    tail = _with_source(compute_features(window, feature_cols, dropna=False), window).iloc[lookback:]
+                    features = pd.concat([keep, tail])
+                    if len(features) > len(stored):
+                        self._save(symbol, interval, version, features)
+                    else:
+                        # Solo cambió la vela abierta: basta con la copia en memoria
+                        self._remember(("history", symbol, interval, version), features)
+                    return features[features.index >= bars.index[0]]
+
+        features = _with_source(compute_features(bars, feature_cols, dropna=False), bars)
+        # Una ventana corta de la misma fuente no pisa una historia larga; si las velas
+        # cambiaron (historia re-ajustada) lo guardado ya no sirve y se reemplaza
+        if stored is None or _source_changed(stored, bars) \
+                or (features.index[0] <= stored.index[0] and features.index[-1] >= stored.index[-1]):
+            self._save(symbol, interval, version, features)
+        return features
+
+
+def _with_source(features: pd.DataFrame, bars: pd.DataFrame) -> pd.DataFrame:
+    return features.assign(**{SOURCE_COLUMN: bars["Close"].to_numpy(dtype=np.float64)})
+
+
+def _same_bars(stored: pd.DataFrame, bars: pd.DataFrame, upto) -> bool:
+    """True si las velas de `bars` hasta `upto` son exactamente las que generaron las filas guardadas."""
+    if SOURCE_COLUMN not in stored.columns:
+        return False
+    mine = stored.loc[bars.index[0]:upto, SOURCE_COLUMN]
+    theirs = bars.loc[:upto, "Close"]
+    return mine.index.equals(theirs.index) and np.array_equal(mine.to_numpy(), theirs.to_numpy(dtype=np.float64))
+
+
+def _source_changed(stored: pd.DataFrame, bars: pd.DataFrame) -> bool:
+    """True si, en el tramo común, las velas pedidas no son las que generaron las filas guardadas."""
+    if SOURCE_COLUMN not in stored.columns:
+        return True
+    start, end = max(stored.index[0], bars.index[0]), min(stored.index[-1], bars.index[-1])
+    if start > end:
+        return False
+    # La última fila guardada pudo venir de una vela abierta: no cuenta como cambio de fuente
+    end = min(end, stored.index[-2]) if len(stored) > 1 else end
+    mine = stored.loc[start:end, SOURCE_COLUMN]
+    theirs = bars.loc[start:end, "Close"]
+    return not (mine.index.equals(theirs.index) and np.array_equal(mine.to_numpy(), theirs.to_numpy(dtype=np.float64)))
+
+
+# ================================
+# ALMACÉN POR DEFECTO DEL PROYECTO
+# ================================
+
+_default_store = None
+
+
+def get_feature_store() -> FeatureStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = FeatureStore()
+    return _default_store
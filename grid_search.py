@@ -0,0 +1,229 @@
+# grid_search.py
+"""
+Búsqueda universo x parámetros de la estrategia de medias móviles.
+
+- Los cierres de todo el universo (símbolos x tiempo) se copian UNA vez a un
+  bloque de memoria compartida (multiprocessing.shared_memory).
+- Cada proceso del pool se engancha a ese bloque al arrancar; las tareas son
+  solo índices de símbolo, así que no se serializa ningún DataFrame.
+- Cada símbolo se evalúa con optimizer.sweep_sma (toda la grilla vectorizada)
+  y su tabla se escribe a disco apenas termina: GRID_RESULTS_DIR/<símbolo>.parquet.
+  Si la búsqueda se corta, al relanzarla se saltan los símbolos ya escritos
+  cuyos cierres (fechas y valores) no cambiaron desde entonces.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # viene con scikit-learn; sin él cada proceso usa los hilos de BLAS por defecto
+    threadpool_limits = None
+
+from market_data import get_cache, use_provider
+from optimizer import sweep_sma
+from panel_store import open_panel
+
+GRID_RESULTS_DIR = "data/grid_search"
+GRID_PERIOD = "5y"
+GRID_INTERVAL = "1d"
+SHORT_WINDOWS = range(2, 102)
+LONG_WINDOWS = range(51, 251, 2)
+
+
+# ================================
+# WORKERS (PRECIOS EN MEMORIA COMPARTIDA)
+# ================================
+
+_shm = None
+_closes = None
+_task = {}
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Engancha un bloque existente sin registrarlo en el resource_tracker: lo libera
+    (unlink) solo el proceso que lo creó. Si el worker lo registrara, su tracker
+    podría borrarlo al terminar el worker o avisar de una "fuga" que no es tal.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _init_grid_worker(shm_name, shape, symbols, grid, results_dir):
+    global _shm, _closes, _task
+    _shm = _attach_shared_memory(shm_name)
+    _closes = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _task = {"symbols": symbols, "grid": grid, "results_dir": results_dir}
+    # Un hilo de BLAS por proceso: el paralelismo lo pone el pool
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+
+
+def _result_path(results_dir: str, symbol: str) -> str:
+    return os.path.join(results_dir, f"{symbol.replace('/', '_')}.parquet")
+
+
+def _sweep_symbol(i: int):
+    symbol = _task["symbols"][i]
+    close = _closes[i]
+    close = close[~np.isnan(close)]  # huecos de calendario del panel
+    short_windows, long_windows = _task["grid"]
+    if len(close) <= min(long_windows):
+        return symbol, None
+
+    results = sweep_sma(close, short_windows, long_windows)
+    path = _result_path(_task["results_dir"], symbol)
+    results.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return symbol, results.iloc[0].to_dict()
+
+
+# ================================
+# BÚSQUEDA
+# ================================
+
+def _prepare_results_dir(results_dir: str, grid: dict) -> None:
+    """Crea el directorio; si la grilla guardada es otra, descarta los resultados viejos."""
+    os.makedirs(results_dir, exist_ok=True)
+    grid_path = os.path.join(results_dir, "grid.json")
+    if os.path.exists(grid_path):
+        with open(grid_path) as f:
+            if json.load(f) == grid:
+                return
+        for name in os.listdir(results_dir):
+            if name.endswith(".parquet") or name == "inputs.json":
+                os.remove(os.path.join(results_dir, name))
+    with open(grid_path, "w") as f:
+        json.dump(grid, f)
+
+
+def _close_digest(close: pd.Series) -> str:
+    """Huella de los cierres que evalúa el sweep de un símbolo (fechas + valores)."""
+    close = close.dropna()
+    digest = hashlib.sha1(close.index.asi8.tobytes())
+    digest.update(close.to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _load_inputs(results_dir: str) -> dict:
+    """Huella de los cierres con los que se escribió cada resultado."""
+    path = os.path.join(results_dir, "inputs.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_inputs(results_dir: str, inputs: dict) -> None:
+    path = os.path.join(results_dir, "inputs.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(inputs, f)
+    os.replace(path + ".tmp", path)
+
+
+def grid_search(symbols, short_windows=SHORT_WINDOWS, long_windows=LONG_WINDOWS,
+                period: str = GRID_PERIOD, interval: str = GRID_INTERVAL,
+                max_workers: int = None, results_dir: str = GRID_RESULTS_DIR,
+                provider=None) -> pd.DataFrame:
+    """
+    Evalúa la grilla (corta < larga) en cada símbolo del universo.
+    Devuelve la mejor combinación por símbolo (también en results_dir/summary.csv);
+    las tablas completas quedan en results_dir/<símbolo>.parquet.
+    """
+    use_provider(provider)
+    symbols = list(symbols)
+    grid = {"short": sorted(short_windows), "long": sorted(long_windows), "period": period, "interval": interval}
+    _prepare_results_dir(results_dir, grid)
+
+    # Un resultado guardado solo se reutiliza si se calculó con los mismos cierres:
+    # si el panel avanzó (u otro rango de fechas, o precios re-ajustados), se recalcula
+    panel = open_panel(symbols, period=period, interval=interval)
+    closes = panel.field_frame("Close", symbols, start=get_cache().period_start(period))
+    digests = {s: _close_digest(closes[s]) for s in symbols}
+    inputs = _load_inputs(results_dir)
+
+    pending = []
+    for i, symbol in enumerate(symbols):
+        path = _result_path(results_dir, symbol)
+        if os.path.exists(path) and inputs.get(symbol) == digests[symbol]:
+            continue
+        if os.path.exists(path):
+            os.remove(path)
+        inputs.pop(symbol, None)
+        pending.append(i)
+    if len(pending) < len(symbols):
+        print(f"⏭️ {len(symbols) - len(pending)} símbolos ya evaluados, se reanuda con {len(pending)}.")
+
+    best = {}
+    if pending:
+        closes = closes.to_numpy(dtype=np.float64).T
+
+        shm = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+        shared = None
+        try:
+            shared = np.ndarray(closes.shape, dtype=np.float64, buffer=shm.buf)
+            shared[:] = closes
+            del closes
+
+            n_pairs = sum(1 for s in grid["short"] for l in grid["long"] if s < l)
+            print(f"🔎 {len(pending)} símbolos x {n_pairs} combinaciones "
+                  f"({shared.nbytes / 1e6:.1f} MB en memoria compartida)")
+
+            start = time.perf_counter()
+            initargs = (shm.name, shared.shape, symbols, (grid["short"], grid["long"]), results_dir)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_grid_worker,
+                                     initargs=initargs) as pool:
+                futures = [pool.submit(_sweep_symbol, i) for i in pending]
+                for done, future in enumerate(as_completed(futures), 1):
+                    symbol, row = future.result()
+                    if row is None:
+                        print(f"⚠️ Sin datos suficientes para {symbol}, se omite.")
+                    else:
+                        best[symbol] = row
+                        inputs[symbol] = digests[symbol]
+                        _save_inputs(results_dir, inputs)
+                    if done % 50 == 0 or done == len(futures):
+                        elapsed = time.perf_counter() - start
+                        print(f"   {done}/{len(futures)} símbolos ({done * n_pairs / elapsed:,.0f} combinaciones/s)")
+        finally:
+            shared = None  # soltar la vista antes de cerrar el bloque
+            shm.close()
+            shm.unlink()
+
+    # Símbolos de corridas anteriores: la mejor fila es la primera de su tabla
+    for symbol in symbols:
+        path = _result_path(results_dir, symbol)
+        if symbol not in best and os.path.exists(path):
+            best[symbol] = pd.read_parquet(path).iloc[0].to_dict()
+
+    if not best:
+        raise ValueError("❌ Ningún símbolo tiene datos suficientes para la grilla.")
+    summary = pd.DataFrame.from_dict(best, orient="index").rename_axis("symbol")
+    summary = summary.sort_values("total_return", ascending=False)
+    summary[["short", "long"]] = summary[["short", "long"]].astype(int)
+    summary.to_csv(os.path.join(results_dir, "summary.csv"))
+
+    print("\n=== Mejores parámetros por símbolo ===")
+    print(summary.head(10).round(3).to_string())
+    return summary
+
+
+if __name__ == "__main__":
+    from pooled_dataset import POOLED_UNIVERSE
+
+    grid_search(sys.argv[1:] or list(POOLED_UNIVERSE))
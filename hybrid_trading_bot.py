@@ -9,12 +9,13 @@ usando un broker simulado.
 import time
 from datetime import datetime
 
-import yfinance as yf
 import pandas as pd
-import joblib
 
 from broker_client import SimulatedBroker
-from feature_engineering import add_basic_features
+from feature_engineering import compute_features
+from market_data import get_bars, use_provider
+from model_registry import get_registry
+from streaming_features import StreamingFeatures
 
 # =========================
 # CONFIGURACIÓN DEL BOT
@@ -33,22 +34,13 @@ MODEL_PATH = "models/random_forest_aapl.pkl"
 
 def load_model():
     """Carga el modelo entrenado y las columnas de features."""
-    model, feature_cols = joblib.load(MODEL_PATH)
+    model, feature_cols = get_registry().get(MODEL_PATH)
     return model, feature_cols
 
 
 def download_data(symbol: str, period: str, interval: str) -> pd.DataFrame:
-    """Descarga datos del símbolo y normaliza columnas."""
-    df = yf.download(symbol, period=period, interval=interval)
-    df = df.dropna()
-
-    # Normalizar columnas si vienen como MultiIndex
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
-    else:
-        df.columns = [str(c) for c in df.columns]
-
-    return df
+    """Obtiene datos del símbolo desde el caché local (solo descarga la cola que falta)."""
+    return get_bars(symbol, period=period, interval=interval)
 
 
 def compute_sma_signal(df: pd.DataFrame) -> tuple[str, float, float, float]:
@@ -94,33 +86,39 @@ def compute_sma_signal(df: pd.DataFrame) -> tuple[str, float, float, float]:
     return signal, price, sma_short, sma_long
 
 
-def compute_ml_signal(df: pd.DataFrame, model, feature_cols):
+def compute_ml_signal(df: pd.DataFrame, model, feature_cols, engine: StreamingFeatures = None):
     """
     Aplica feature engineering y devuelve:
     - probabilidad de subida (float entre 0 y 1)
+
+    Si se pasa un motor incremental, solo se procesan las velas nuevas de df.
     """
-    df_feat = add_basic_features(df)
-    df_feat = df_feat.dropna()
-    if df_feat.empty:
+    if engine is not None:
+        engine.sync(df)
+        X = engine.latest(feature_cols)
+        if X.isna().any(axis=None):
+            return None
+        return model.predict_proba(X)[0][1]
+
+    # Solo las features que usó el modelo (y sus dependencias)
+    X = compute_features(df, feature_cols).iloc[-1:]
+    if X.empty:
         return None
 
-    last_row = df_feat.iloc[-1]
-
-    # Construimos X con las mismas columnas que usó el modelo
-    X = last_row[feature_cols].to_frame().T
-    X.columns = feature_cols  # aseguramos orden/nombres
-
     proba_up = model.predict_proba(X)[0][1]  # probabilidad de que suba
     return proba_up
 
 
-def main():
+def main(provider=None):
+    use_provider(provider)
     print("🚀 Iniciando Bot Cuantitativo Híbrido (SMA + IA)...")
 
-    model, feature_cols = load_model()
     broker = SimulatedBroker(cash=5_000.0)
+    engine = StreamingFeatures()
 
     while True:
+        # El registro solo relee el disco si se publicó un modelo nuevo
+        model, feature_cols = load_model()
         print(f"\n🕒 {datetime.now()} - Revisando {SYMBOL}...")
 
         # 1. Descargamos datos recientes
@@ -136,7 +134,7 @@ def main():
         print(f"   Close: {price:.2f} | SMA {SHORT_WINDOW}: {sma_short:.2f} | SMA {LONG_WINDOW}: {sma_long:.2f}")
 
         # 3. Señal por IA
-        proba_up = compute_ml_signal(df, model, feature_cols)
+        proba_up = compute_ml_signal(df, model, feature_cols, engine)
         if proba_up is None:
             print("❌ No se pudo calcular la señal de IA (datos insuficientes).")
             time.sleep(INTERVAL_SECONDS)
@@ -0,0 +1,168 @@
+# hyperparameter_search.py
+"""
+Búsqueda de hiperparámetros del RandomForest con successive halving.
+
+- Se prueban muchas configuraciones al azar con pocos árboles sobre folds
+  walk-forward (cronológicos) de uno o varios símbolos.
+- En cada ronda sobrevive solo la mejor fracción (1/ETA) y el presupuesto de
+  árboles se multiplica por ETA: las configuraciones malas se descartan pronto
+  y el tiempo se gasta en las prometedoras.
+- Los (símbolo, fold) se evalúan en un pool de procesos que vive toda la
+  búsqueda; cada proceso guarda en caché las matrices de cada fold, que se
+  arman una sola vez y se reutilizan en todos los trials.
+
+La mejor configuración se guarda en BEST_PARAMS_PATH y ml_model.train_model la usa.
+"""
+
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+from feature_engineering import labeled_rows
+from market_data import use_provider
+from ml_model import BEST_PARAMS_PATH, MODEL_FEATURES, SYMBOL, load_data, walk_forward_splits
+
+SEARCH_SPACE = {
+    "max_depth": [3, 5, 8, 12, None],
+    "min_samples_leaf": [1, 5, 20, 50, 100],
+    "max_features": ["sqrt", 0.5, 1.0],
+    "class_weight": [None, "balanced"],
+    "max_samples": [None, 0.5, 0.8],
+}
+N_CONFIGS = 243
+MIN_TREES = 10
+MAX_TREES = 270
+ETA = 3
+SEARCH_FOLDS = 3
+SEARCH_RESULTS = "models/hyperparameter_search.csv"
+
+
+def sample_configs(n_configs: int, seed: int = 42) -> list:
+    """Configuraciones distintas elegidas al azar del espacio de búsqueda."""
+    grid = [dict(zip(SEARCH_SPACE, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(grid), size=min(n_configs, len(grid)), replace=False)
+    return [grid[i] for i in picks]
+
+
+# ================================
+# WORKERS (CACHÉ DE MATRICES POR FOLD)
+# ================================
+
+_series = {}
+_fold_cache = {}
+
+
+def _init_search_worker(series):
+    global _series
+    _series = series
+
+
+def _fold_matrices(symbol, fold):
+    """(X_train, y_train, X_test, y_test) contiguos del fold, armados una vez por proceso."""
+    key = (symbol, fold)
+    if key not in _fold_cache:
+        X, y, splits = _series[symbol]
+        train, test = splits[fold]
+        _fold_cache[key] = (np.ascontiguousarray(X[train]), y[train], np.ascontiguousarray(X[test]), y[test])
+    return _fold_cache[key]
+
+
+def _run_trial(task):
+    config_id, params, n_estimators, symbol, fold = task
+    X_train, y_train, X_test, y_test = _fold_matrices(symbol, fold)
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=1, **params)
+    model.fit(X_train, y_train)
+    score = accuracy_score(y_test, model.predict(X_test))
+    return config_id, score, time.perf_counter() - start
+
+
+# ================================
+# SUCCESSIVE HALVING
+# ================================
+
+def successive_halving(symbols=None, n_configs: int = N_CONFIGS, min_trees: int = MIN_TREES,
+                       max_trees: int = MAX_TREES, eta: int = ETA, n_folds: int = SEARCH_FOLDS,
+                       max_workers: int = None, provider=None, results_path: str = SEARCH_RESULTS):
+    """
+    Devuelve (mejores parámetros, DataFrame con todos los trials).
+    El puntaje de una configuración es el accuracy medio sobre todos los (símbolo, fold).
+    """
+    use_provider(provider)
+    symbols = symbols or [SYMBOL]
+
+    series = {}
+    for symbol in symbols:
+        df = labeled_rows(load_data(symbol))
+        splits = walk_forward_splits(len(df), n_folds)
+        if splits:
+            series[symbol] = (df[MODEL_FEATURES].to_numpy(dtype=np.float32), df["target_up"].to_numpy(), splits)
+    if not series:
+        raise ValueError("❌ No hay suficientes datos para armar folds.")
+
+    folds = [(symbol, fold) for symbol, (_, _, splits) in series.items() for fold in range(len(splits))]
+    configs = sample_configs(n_configs)
+    alive = list(range(len(configs)))
+    n_estimators = min_trees
+    rows = []
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_search_worker, initargs=(series,)) as pool:
+        rung = 0
+        while True:
+            tasks = [(cid, configs[cid], n_estimators, symbol, fold) for cid in alive for symbol, fold in folds]
+            scores, seconds = {}, {}
+            for cid, score, elapsed in pool.map(_run_trial, tasks, chunksize=max(1, len(tasks) // 64)):
+                scores.setdefault(cid, []).append(score)
+                seconds[cid] = seconds.get(cid, 0.0) + elapsed
+
+            for cid in alive:
+                rows.append({"config_id": cid, "rung": rung, "n_estimators": n_estimators,
+                             "score": float(np.mean(scores[cid])), "fit_seconds": seconds[cid], **configs[cid]})
+            print(f"🔎 Ronda {rung}: {len(alive)} configuraciones con {n_estimators} árboles "
+                  f"({time.perf_counter() - start:.1f}s)")
+
+            if len(alive) == 1 or n_estimators >= max_trees:
+                break
+            alive.sort(key=lambda cid: np.mean(scores[cid]), reverse=True)
+            alive = alive[:max(1, math.ceil(len(alive) / eta))]
+            n_estimators = min(n_estimators * eta, max_trees)
+            rung += 1
+
+    results = pd.DataFrame(rows)
+    last = results[results["rung"] == results["rung"].max()]
+    best = last.loc[last["score"].idxmax()]
+    best_params = {**configs[int(best["config_id"])], "n_estimators": int(best["n_estimators"])}
+
+    print(f"\n🏆 Mejor configuración (accuracy {best['score']:.4f}): {best_params}")
+    print(f"⏱️ {len(results)} evaluaciones en {time.perf_counter() - start:.1f}s")
+
+    if results_path:
+        os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+        results.to_csv(results_path, index=False)
+    save_best_params(best_params)
+    return best_params, results
+
+
+def save_best_params(params: dict, path: str = BEST_PARAMS_PATH):
+    """Escritura atómica: los entrenamientos que leen el archivo nunca ven uno a medias."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(params, f, indent=2)
+    os.replace(tmp, path)
+    print(f"✅ Parámetros guardados en: {path}")
+
+
+if __name__ == "__main__":
+    successive_halving()
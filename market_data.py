@@ -0,0 +1,576 @@
+# market_data.py
+"""
+Capa compartida de datos de mercado:
+- Caché local en formato columnar (Parquet) de velas OHLCV por (símbolo, intervalo).
+- Refresco incremental: solo se descarga la cola de velas que falta.
+- Proveedores intercambiables (yfinance, archivos locales o replay determinista)
+  para poder trabajar y medir rendimiento offline.
+"""
+
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+CACHE_DIR = "data/cache"
+
+# Frecuencia de pandas de cada intervalo de yfinance (velas sintéticas, antigüedad de paneles)
+INTERVAL_FREQ = {
+    "1m": "1min", "2m": "2min", "5m": "5min", "15m": "15min", "30m": "30min",
+    "60m": "60min", "90m": "90min", "1h": "1h",
+    "1d": "B", "5d": "5B", "1wk": "W-MON", "1mo": "MS", "3mo": "QS",
+}
+
+
+# ================================
+# NORMALIZACIÓN
+# ================================
+
+def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplana columnas MultiIndex de yfinance, ordena el índice y elimina duplicados."""
+    if df is None:
+        return pd.DataFrame()
+
+    df = df.copy()
+
+    # Normalizar columnas si vienen en MultiIndex, como ('Close', 'AAPL')
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [c[0] for c in df.columns]
+    else:
+        df.columns = [str(c) for c in df.columns]
+
+    df = df.dropna()
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+def split_by_symbol(df: pd.DataFrame, symbols) -> dict:
+    """
+    Separa una descarga multi-símbolo de yfinance (columnas MultiIndex con el
+    ticker en algún nivel) en un DataFrame normalizado por símbolo.
+    """
+    symbols = list(symbols)
+    if df is None or df.empty:
+        return {s: pd.DataFrame() for s in symbols}
+
+    if not isinstance(df.columns, pd.MultiIndex):
+        # Con un único símbolo yfinance puede devolver columnas planas
+        return {symbols[0]: normalize_ohlcv(df)} if len(symbols) == 1 else {s: pd.DataFrame() for s in symbols}
+
+    level = 0 if set(symbols) & set(df.columns.get_level_values(0)) else 1
+    tickers = set(df.columns.get_level_values(level))
+
+    frames = {}
+    for symbol in symbols:
+        if symbol in tickers:
+            frames[symbol] = normalize_ohlcv(df.xs(symbol, axis=1, level=level))
+        else:
+            frames[symbol] = pd.DataFrame()
+    return frames
+
+
+def period_to_start(period, now=None):
+    """
+    Convierte un período estilo yfinance ("5d", "6mo", "1y", "ytd", "max")
+    en la fecha de inicio equivalente. Devuelve None para "max".
+    """
+    if period is None or period == "max":
+        return None
+
+    now = pd.Timestamp.now().normalize() if now is None else pd.Timestamp(now)
+
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+
+    units = {
+        "mo": lambda n: pd.DateOffset(months=n),
+        "wk": lambda n: pd.DateOffset(weeks=n),
+        "y": lambda n: pd.DateOffset(years=n),
+        "d": lambda n: pd.DateOffset(days=n),
+    }
+    for suffix, offset in units.items():
+        if period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            return now - offset(int(period[: -len(suffix)]))
+
+    raise ValueError(f"Período no soportado: {period}")
+
+
+def _align_tz(ts, index: pd.Index):
+    """Ajusta la zona horaria de ts a la del índice (yfinance intradía viene con tz)."""
+    if ts is None:
+        return None
+    ts = pd.Timestamp(ts)
+    tz = getattr(index, "tz", None)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    if tz is None and ts.tzinfo is not None:
+        return ts.tz_convert(None)
+    return ts
+
+
+def slice_bars(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Recorta las velas a [start, end) respetando la zona horaria del índice."""
+    if df.empty:
+        return df
+    start = _align_tz(start, df.index)
+    end = _align_tz(end, df.index)
+    if start is not None:
+        df = df[df.index >= start]
+    if end is not None:
+        df = df[df.index < end]
+    return df
+
+
+# ================================
+# PROVEEDORES DE DATOS
+# ================================
+
+class MarketDataProvider(ABC):
+    """
+    Interfaz común de proveedores de velas.
+
+    - fetch / fetch_many devuelven DataFrames normalizados (ver normalize_ohlcv).
+    - now() es el reloj del proveedor: los períodos ("6mo", "1y") se resuelven
+      respecto a él, lo que permite reproducir datos históricos como si fueran en vivo.
+    - persistent indica si sus velas pueden guardarse en el caché compartido.
+    """
+
+    persistent = True
+
+    @abstractmethod
+    def fetch(self, symbol: str, interval: str = "1d", start=None, end=None) -> pd.DataFrame:
+        ...
+
+    def fetch_many(self, symbols, interval: str = "1d", start=None, end=None) -> dict:
+        return {s: self.fetch(s, interval, start=start, end=end) for s in symbols}
+
+    def now(self) -> pd.Timestamp:
+        return pd.Timestamp.now()
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Descarga velas desde Yahoo Finance."""
+
+    def fetch(self, symbol: str, interval: str = "1d", start=None, end=None) -> pd.DataFrame:
+        # Import diferido: el caché y el proveedor local deben funcionar sin red ni yfinance
+        import yfinance as yf
+
+        if start is None:
+            df = yf.download(symbol, period="max", interval=interval, end=end, progress=False)
+        else:
+            df = yf.download(symbol, start=start, end=end, interval=interval, progress=False)
+        return normalize_ohlcv(df)
+
+    def fetch_many(self, symbols, interval: str = "1d", start=None, end=None) -> dict:
+        """Descarga todo el universo en una sola llamada y lo separa por símbolo."""
+        import yfinance as yf
+
+        symbols = list(symbols)
+        if start is None:
+            df = yf.download(symbols, period="max", interval=interval, end=end,
+                             group_by="ticker", progress=False)
+        else:
+            df = yf.download(symbols, start=start, end=end, interval=interval,
+                             group_by="ticker", progress=False)
+        return split_by_symbol(df, symbols)
+
+
+class LocalFileProvider(MarketDataProvider):
+    """
+    Lee velas desde archivos locales: <root>/<SYMBOL>_<interval>.parquet o .csv
+    (por ejemplo data/historical/AAPL_1d.csv). Útil para pruebas offline.
+    """
+
+    def __init__(self, root: str = "data/historical"):
+        self.root = root
+
+    def path(self, symbol: str, interval: str):
+        for ext in (".parquet", ".csv"):
+            path = os.path.join(self.root, f"{symbol}_{interval}{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def fetch(self, symbol: str, interval: str = "1d", start=None, end=None) -> pd.DataFrame:
+        path = self.path(symbol, interval)
+        if path is None:
+            return pd.DataFrame()
+
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+
+        return slice_bars(normalize_ohlcv(df), start, end)
+
+
+class ReplayProvider(LocalFileProvider):
+    """
+    Sirve velas grabadas o sintéticas (mismos archivos que LocalFileProvider)
+    como si fueran llegando en vivo, sin red y de forma reproducible.
+
+    - warmup: velas visibles al arrancar (historia disponible para indicadores).
+    - speed: velas que se revelan por segundo de reloj real. Con speed=None la
+      reproducción solo avanza con advance(), de forma totalmente determinista.
+    - interval: intervalo que se reproduce; el reloj (now) sale solo de sus archivos.
+    """
+
+    persistent = False
+
+    def __init__(self, root: str = "data/historical", warmup: int = 252, speed: float = None,
+                 interval: str = "1d"):
+        super().__init__(root)
+        self.interval = interval
+        self.warmup = warmup
+        self.speed = speed
+        self.cursor = warmup
+        self._frames = {}
+        self._indexes = {}
+        self._started = time.monotonic()
+
+    def _frame(self, symbol: str, interval: str) -> pd.DataFrame:
+        # Cada archivo se lee una sola vez; después solo se recorta
+        key = (symbol, interval)
+        if key not in self._frames:
+            self._frames[key] = super().fetch(symbol, interval)
+        return self._frames[key]
+
+    def visible_bars(self) -> int:
+        if self.speed is None:
+            return self.cursor
+        return self.cursor + int((time.monotonic() - self._started) * self.speed)
+
+    def advance(self, n: int = 1):
+        """Revela n velas más."""
+        self.cursor += n
+
+    def reset(self):
+        self.cursor = self.warmup
+        self._started = time.monotonic()
+
+    def fetch(self, symbol: str, interval: str = "1d", start=None, end=None) -> pd.DataFrame:
+        df = self._frame(symbol, interval).iloc[: self.visible_bars()]
+        return slice_bars(df, start, end)
+
+    def _index(self, path: str) -> pd.DatetimeIndex:
+        # Solo el índice de fechas (sin columnas OHLCV), leído una vez por archivo
+        if path not in self._indexes:
+            if path.endswith(".parquet"):
+                index = pd.read_parquet(path, columns=[]).index
+            else:
+                index = pd.read_csv(path, usecols=[0], index_col=0, parse_dates=True).index
+            self._indexes[path] = index[~index.duplicated(keep="last")].sort_values()
+        return self._indexes[path]
+
+    def now(self) -> pd.Timestamp:
+        """
+        Fecha de la última vela revelada (el 'presente' de la reproducción).
+        Sin velas visibles, el instante anterior a la primera vela: nunca una fecha futura.
+        """
+        indexes = [df.index for (_, interval), df in self._frames.items() if interval == self.interval]
+        if not indexes:
+            # Antes de la primera descarga: el reloj sale de las fechas de los archivos grabados
+            suffixes = (f"_{self.interval}.parquet", f"_{self.interval}.csv")
+            indexes = [self._index(os.path.join(self.root, name)) for name in sorted(os.listdir(self.root))
+                       if name.endswith(suffixes)]
+        indexes = [index for index in indexes if len(index)]
+        if not indexes:
+            return pd.Timestamp.now()
+
+        n = self.visible_bars()
+        if n <= 0:
+            first = min(_naive_utc(index[0]) for index in indexes)
+            return first - to_offset(INTERVAL_FREQ.get(self.interval, "B"))
+        return max(_naive_utc(index[min(n, len(index)) - 1]) for index in indexes)
+
+
+def _naive_utc(ts: pd.Timestamp) -> pd.Timestamp:
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+
+def generate_synthetic_bars(symbols, n_bars: int = 1260, interval: str = "1d",
+                            root: str = "data/historical", end=None, seed: int = 42) -> dict:
+    """
+    Genera velas OHLCV sintéticas (paseo aleatorio geométrico) y las guarda como
+    <root>/<SYMBOL>_<interval>.parquet para usarlas con LocalFileProvider / ReplayProvider.
+    """
+    os.makedirs(root, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    if interval not in INTERVAL_FREQ:
+        raise ValueError(f"Intervalo no soportado: {interval}")
+    end = pd.Timestamp.now().normalize() if end is None else pd.Timestamp(end)
+    index = pd.date_range(end=end, periods=n_bars, freq=INTERVAL_FREQ[interval])
+
+    frames = {}
+    for symbol in symbols:
+        returns = rng.normal(0.0003, 0.015, n_bars)
+        close = 100 * np.exp(np.cumsum(returns))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        spread = np.abs(rng.normal(0, 0.005, n_bars))
+        df = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread),
+            "Low": np.minimum(open_, close) * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 10_000_000, n_bars).astype(float),
+        }, index=index)
+        df.to_parquet(os.path.join(root, f"{symbol}_{interval}.parquet"))
+        frames[symbol] = df
+
+    return frames
+
+
+def provider_from_env() -> MarketDataProvider:
+    """
+    Elige el proveedor con la variable MARKET_DATA_PROVIDER:
+    "yfinance" (por defecto), "local:<carpeta>" o "replay:<carpeta>".
+    MARKET_DATA_REPLAY_SPEED fija las velas por segundo del replay y
+    MARKET_DATA_REPLAY_INTERVAL el intervalo que marca su reloj (por defecto 1d).
+    """
+    kind, _, root = os.environ.get("MARKET_DATA_PROVIDER", "yfinance").partition(":")
+    root = root or "data/historical"
+
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind == "local":
+        return LocalFileProvider(root)
+    if kind == "replay":
+        speed = os.environ.get("MARKET_DATA_REPLAY_SPEED")
+        interval = os.environ.get("MARKET_DATA_REPLAY_INTERVAL", "1d")
+        return ReplayProvider(root, speed=float(speed) if speed else None, interval=interval)
+
+    raise ValueError(f"Proveedor de datos desconocido: {kind}")
+
+
+# ================================
+# CACHÉ LOCAL CON REFRESCO INCREMENTAL
+# ================================
+
+class OHLCVCache:
+    """
+    Caché en disco de velas OHLCV por (símbolo, intervalo).
+
+    - La primera petición descarga el período completo y lo guarda en Parquet.
+    - Las siguientes leen del disco y solo piden al proveedor la cola que falta
+      (desde la penúltima vela guardada: la última se re-descarga por si estaba
+      incompleta y la penúltima sirve para comparar con lo guardado).
+    - Si las velas que se solapan no coinciden (yfinance re-ajustó la historia por
+      un split o dividendo) se re-descarga el rango completo en lugar de pegar la cola.
+    - max_age: segundos durante los que el caché se considera fresco y no se
+      consulta al proveedor (0 = refrescar la cola en cada llamada).
+    """
+
+    def __init__(self, provider: MarketDataProvider = None, cache_dir: str = None, max_age: float = 0):
+        self.provider = provider if provider is not None else YFinanceProvider()
+        if cache_dir is None:
+            # Un proveedor no persistente (replay) usa un caché propio y desechable
+            if self.provider.persistent:
+                cache_dir = CACHE_DIR
+            else:
+                cache_dir = tempfile.mkdtemp(prefix="replay_cache_")
+                atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.cache_dir, interval, f"{symbol}.parquet")
+
+    def _meta_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.cache_dir, interval, f"{symbol}.json")
+
+    def period_start(self, period: str):
+        """Inicio de un período ("6mo", "1y"...) según el reloj del proveedor."""
+        return period_to_start(period, now=self.provider.now().normalize())
+
+    def load(self, symbol: str, interval: str = "1d"):
+        """Lee las velas guardadas (sin tocar la red). None si no hay caché."""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def _load_meta(self, symbol: str, interval: str) -> dict:
+        path = self._meta_path(symbol, interval)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save(self, symbol: str, interval: str, df: pd.DataFrame, meta: dict):
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Escritura atómica: otro proceso nunca ve un archivo a medio escribir
+        tmp = path + ".tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+        meta_path = self._meta_path(symbol, interval)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def get(self, symbol: str, period: str = None, interval: str = "1d",
+            start=None, end=None, refresh: bool = True) -> pd.DataFrame:
+        """
+        Devuelve las velas de symbol en [start, end) (o el período indicado),
+        descargando solo lo que falta en el caché.
+        """
+        return self.get_many([symbol], period=period, interval=interval,
+                             start=start, end=end, refresh=refresh)[symbol]
+
+    def get_many(self, symbols, period: str = None, interval: str = "1d",
+                 start=None, end=None, refresh: bool = True) -> dict:
+        """
+        Versión por lotes de get(): devuelve {símbolo: DataFrame normalizado}.
+
+        Los símbolos que necesitan la misma descarga (sin caché, cabeza o cola)
+        se piden al proveedor en UNA sola llamada fetch_many. Para la cola se usa
+        la última vela más antigua del grupo, así que un símbolo muy desfasado
+        hace que se re-descargue algo más de lo necesario para el resto.
+        """
+        symbols = list(symbols)
+        if start is None:
+            start = self.period_start(period)
+        requested_from = "max" if start is None else pd.Timestamp(start).isoformat()
+
+        parts, metas, stored = {}, {}, {}
+        missing, heads, tails = [], [], []
+
+        for symbol in symbols:
+            cached = self.load(symbol, interval)
+            meta = self._load_meta(symbol, interval)
+
+            if cached is None or cached.empty:
+                parts[symbol] = []
+                metas[symbol] = {"covered_from": requested_from}
+                missing.append(symbol)
+                continue
+
+            parts[symbol] = [cached]
+            metas[symbol] = meta
+            stored[symbol] = cached
+
+            # Cabeza: el caché empieza después de lo que se pide
+            covered_from = meta.get("covered_from", "max")
+            if covered_from != "max" and (start is None or pd.Timestamp(start) < pd.Timestamp(covered_from)):
+                heads.append(symbol)
+
+            # Cola: solo lo que falta desde la última vela guardada
+            needs_tail = end is None or _align_tz(end, cached.index) > cached.index[-1]
+            fresh = time.time() - meta.get("refreshed_at", 0) < self.max_age
+            if refresh and needs_tail and not fresh:
+                tails.append(symbol)
+
+        if missing:
+            for symbol, df in self.provider.fetch_many(missing, interval, start=start, end=None).items():
+                parts[symbol].append(df)
+
+        if heads:
+            head_end = max(parts[s][0].index[0] for s in heads)
+            for symbol, df in self.provider.fetch_many(heads, interval, start=start, end=head_end).items():
+                parts[symbol].insert(0, df)
+                metas[symbol]["covered_from"] = requested_from
+
+        if tails:
+            tail_start = min(stored[s].index[max(len(stored[s]) - 2, 0)] for s in tails)
+            for symbol, df in self.provider.fetch_many(tails, interval, start=tail_start, end=None).items():
+                parts[symbol].append(df)
+
+            # Historia re-ajustada por el proveedor: se reemplaza entera, no se pega la cola
+            readjusted = [s for s in tails if not _overlap_matches(stored[s], parts[s][-1])]
+            if readjusted:
+                print(f"♻️ Historia re-ajustada por el proveedor, se re-descarga: {', '.join(readjusted)}")
+                full_start = {s: metas[s].get("covered_from", "max") for s in readjusted}
+                for covered_from in set(full_start.values()):
+                    group = [s for s in readjusted if full_start[s] == covered_from]
+                    since = None if covered_from == "max" else pd.Timestamp(covered_from)
+                    for symbol, df in self.provider.fetch_many(group, interval, start=since, end=None).items():
+                        parts[symbol] = [df]
+
+        now = time.time()
+        changed = set(missing) | set(heads) | set(tails)
+        result = {}
+
+        for symbol in symbols:
+            frames = [p for p in parts[symbol] if not p.empty]
+            if not frames:
+                result[symbol] = pd.DataFrame()
+                continue
+
+            df = frames[0]
+            if symbol in changed:
+                if len(frames) > 1:
+                    df = pd.concat(frames)
+                    df = df[~df.index.duplicated(keep="last")].sort_index()
+                meta = metas[symbol]
+                if symbol in missing or symbol in tails:
+                    meta["refreshed_at"] = now
+                self._save(symbol, interval, df, meta)
+
+            result[symbol] = slice_bars(df, start, end)
+
+        return result
+
+
+def _overlap_matches(cached: pd.DataFrame, tail: pd.DataFrame) -> bool:
+    """
+    True si las velas completas que comparten el caché y la cola nueva tienen el
+    mismo cierre. La última vela guardada no cuenta: pudo quedar a medio formar.
+    """
+    if tail.empty:
+        return True
+    overlap = cached.index[:-1].intersection(tail.index)
+    if overlap.empty:
+        return True
+    return bool(np.allclose(cached.loc[overlap, "Close"], tail.loc[overlap, "Close"], rtol=1e-6))
+
+
+def to_panel(frames: dict, field: str = "Close") -> pd.DataFrame:
+    """Une un campo de varios símbolos en un panel (fechas x símbolos)."""
+    return pd.DataFrame({s: df[field] for s, df in frames.items() if not df.empty})
+
+
+# ================================
+# CACHÉ POR DEFECTO DEL PROYECTO
+# ================================
+
+_default_cache = None
+
+
+def configure(provider: MarketDataProvider = None, cache_dir: str = None, max_age: float = 0) -> OHLCVCache:
+    """Configura el caché compartido (por ejemplo con un LocalFileProvider para trabajar offline)."""
+    global _default_cache
+    _default_cache = OHLCVCache(provider=provider, cache_dir=cache_dir, max_age=max_age)
+    return _default_cache
+
+
+def use_provider(provider: MarketDataProvider = None):
+    """Punto de entrada de bots y scripts: cambia el proveedor del caché compartido si se indica uno."""
+    if provider is not None:
+        configure(provider=provider)
+
+
+def get_cache() -> OHLCVCache:
+    """Devuelve el caché compartido, creándolo según MARKET_DATA_PROVIDER si no se configuró."""
+    if _default_cache is None:
+        configure(provider=provider_from_env())
+    return _default_cache
+
+
+def get_bars(symbol: str, period: str = None, interval: str = "1d", start=None, end=None) -> pd.DataFrame:
+    """Atajo: velas normalizadas de symbol servidas desde el caché compartido."""
+    return get_cache().get(symbol, period=period, interval=interval, start=start, end=end)
+
+
+def get_many_bars(symbols, period: str = None, interval: str = "1d", start=None, end=None) -> dict:
+    """Atajo: {símbolo: velas} de todo el universo con descargas por lotes."""
+    return get_cache().get_many(symbols, period=period, interval=interval, start=start, end=end)
@@ -3,39 +3,65 @@
 Entrenamiento de un modelo ML simple para predecir si el precio subirá o bajará.
 """
 
+import json
 import os
-import yfinance as yf
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report
+from sklearn.metrics import accuracy_score, classification_report, f1_score, precision_score, recall_score
 from sklearn.model_selection import train_test_split
-import joblib
 
-from feature_engineering import add_basic_features, add_target_direction
+from feature_engineering import add_target_direction, labeled_rows
+from feature_store import get_feature_store
+from market_data import get_bars, use_provider
+from model_registry import get_registry, publish_model
+from timeframes import multi_timeframe_features
 
 SYMBOL = "AAPL"
 PERIOD = "5y"
 INTERVAL = "1d"
 MODEL_PATH = "models/random_forest_aapl.pkl"
+POOLED_MODEL_PATH = "models/random_forest_pooled.pkl"
+BEST_PARAMS_PATH = "models/best_params.json"  # lo escribe hyperparameter_search.py
 
+# Features que usa el modelo: solo se calculan estas (y sus dependencias)
+MODEL_FEATURES = ["return_1d", "volatility_5", "lag_return_1"]
+# Temporalidades mayores que walk-forward puede sumar a las features (columnas con sufijo, p. ej. return_1d_1wk)
+WALK_FORWARD_TIMEFRAMES = ("1wk",)
 
-def load_data():
-    print(f"Descargando datos de {SYMBOL} ({PERIOD}, {INTERVAL})...")
-    df = yf.download(SYMBOL, period=PERIOD, interval=INTERVAL)
-    df = df.dropna()
+# Validación walk-forward
+WALK_FORWARD_SYMBOLS = ["AAPL", "MSFT", "AMZN", "NVDA", "SPY"]
+WALK_FORWARD_FOLDS = 5
+WALK_FORWARD_MIN_TRAIN = 252  # ~1 año de velas diarias antes del primer fold
+WALK_FORWARD_RESULTS = "models/walk_forward_results.csv"
 
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
-    else:
-        df.columns = [str(c) for c in df.columns]
 
-    df = add_basic_features(df)
+def load_data(symbol=SYMBOL, period=PERIOD, interval=INTERVAL, timeframes=()):
+    """
+    Velas, features del modelo y target de `symbol`. Con `timeframes` se suman
+    las mismas features en esas temporalidades mayores, derivadas de estas velas
+    (ver timeframes.multi_timeframe_features).
+    """
+    print(f"Cargando datos de {symbol} ({period}, {interval})...")
+    df = get_bars(symbol, period=period, interval=interval)
+
+    if timeframes:
+        features = multi_timeframe_features(symbol, MODEL_FEATURES, base_interval=interval,
+                                            timeframes=timeframes, bars=df)
+    else:
+        features = get_feature_store().get(symbol, df, MODEL_FEATURES, interval=interval)
+    df = df.join(features, how="inner")
     df = add_target_direction(df)
     return df
 
 
-def train_model():
-    df = load_data()
+def train_model(provider=None):
+    use_provider(provider)
+    df = labeled_rows(load_data())
 
     feature_cols = []
     for c in df.columns:
@@ -51,19 +77,212 @@ def train_model():
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
 
-    print("Entrenando modelo RandomForest...")
-    model = RandomForestClassifier(n_estimators=200, random_state=42)
+    params = load_best_params()
+    print(f"Entrenando modelo RandomForest {params}...")
+    model = RandomForestClassifier(random_state=42, **params)
     model.fit(X_train, y_train)
 
     y_pred = model.predict(X_test)
     print("\n=== Reporte de clasificación ===")
     print(classification_report(y_test, y_pred))
 
-    os.makedirs("models", exist_ok=True)
-
-    joblib.dump((model, feature_cols), MODEL_PATH)
+    publish_model(model, feature_cols, MODEL_PATH)
+    save_training_cutoff(MODEL_PATH, X_train.index[-1])
     print(f"\n✅ Modelo guardado correctamente en: {MODEL_PATH}")
 
 
+def load_best_params() -> dict:
+    """Hiperparámetros de la última búsqueda, o los de siempre si no hay ninguna."""
+    if not os.path.exists(BEST_PARAMS_PATH):
+        return {"n_estimators": 200}
+    with open(BEST_PARAMS_PATH) as f:
+        return json.load(f)
+
+
+def timeframe_feature_cols(timeframes=()) -> list:
+    """MODEL_FEATURES más sus columnas en cada temporalidad mayor (mismos nombres que join_timeframe)."""
+    return MODEL_FEATURES + [f"{c}_{tf}" for tf in timeframes for c in MODEL_FEATURES]
+
+
+def model_path(symbol: str) -> str:
+    return f"models/random_forest_{symbol.lower()}.pkl"
+
+
+# ================================
+# FECHA DE CORTE DEL ENTRENAMIENTO
+# ================================
+
+def training_meta_path(path: str) -> str:
+    """JSON junto al modelo con el estado de su entrenamiento (ver retraining.py)."""
+    return os.path.splitext(path)[0] + "_training.json"
+
+
+def save_training_cutoff(path: str, train_end, train_start=None, train_end_by_symbol: dict = None) -> None:
+    """
+    Registra las velas con las que se entrenó el modelo en `path`: la última
+    (train_end), la primera si el entrenamiento dejó afuera la historia previa
+    (train_start) y, para un modelo conjunto, la última de cada símbolo.
+    """
+    meta_path = training_meta_path(path)
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    meta["train_end"] = pd.Timestamp(train_end).isoformat()
+    # No deben quedar los de un entrenamiento anterior
+    meta.pop("train_start", None)
+    meta.pop("train_end_by_symbol", None)
+    if train_start is not None:
+        meta["train_start"] = pd.Timestamp(train_start).isoformat()
+    if train_end_by_symbol is not None:
+        meta["train_end_by_symbol"] = {s: pd.Timestamp(ts).isoformat() for s, ts in train_end_by_symbol.items()}
+    os.makedirs(os.path.dirname(meta_path) or ".", exist_ok=True)
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def training_window(path: str, symbol: str = None):
+    """
+    (primera, última) vela del entrenamiento del modelo en `path` para `symbol`.
+    Cada una es None si no se registró; la primera solo se registra si el
+    entrenamiento dejó afuera la historia previa.
+    """
+    meta_path = training_meta_path(path)
+    if not os.path.exists(meta_path):
+        return None, None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    train_end = meta.get("train_end_by_symbol", {}).get(symbol) or meta.get("train_end")
+    train_start = meta.get("train_start")
+    return (pd.Timestamp(train_start) if train_start else None,
+            pd.Timestamp(train_end) if train_end else None)
+
+
+def load_model(symbol: str = SYMBOL):
+    """
+    (model, feature_cols) para `symbol` desde el registro en memoria:
+    el modelo propio del símbolo si existe, si no el conjunto (pooled) y si no el base.
+    """
+    for path in (model_path(symbol), POOLED_MODEL_PATH, MODEL_PATH):
+        if os.path.exists(path):
+            return get_registry().get(path)
+    raise FileNotFoundError(f"❌ No hay modelo entrenado para {symbol}. Ejecuta ml_model.py primero.")
+
+
+# ================================
+# VALIDACIÓN WALK-FORWARD EN PARALELO
+# ================================
+
+def walk_forward_splits(n_rows, n_folds=WALK_FORWARD_FOLDS, min_train=WALK_FORWARD_MIN_TRAIN, window=None):
+    """
+    Folds cronológicos (train, test) como slices de posiciones.
+    El test de cada fold va justo después de su train; con window=None el
+    train crece desde el inicio (expanding), si no es una ventana móvil de `window` filas.
+    """
+    test_size = (n_rows - min_train) // n_folds
+    if test_size < 1:
+        return []
+
+    splits = []
+    for k in range(n_folds):
+        test_start = min_train + k * test_size
+        test_stop = n_rows if k == n_folds - 1 else test_start + test_size
+        train_start = 0 if window is None else max(0, test_start - window)
+        splits.append((slice(train_start, test_start), slice(test_start, test_stop)))
+    return splits
+
+
+# Matrices (X, y) por símbolo: se envían una vez a cada proceso, no en cada tarea
+_fold_data = {}
+
+
+def _init_fold_worker(data):
+    global _fold_data
+    _fold_data = data
+
+
+def _run_fold(task):
+    symbol, fold, train, test, params = task
+    X, y = _fold_data[symbol]
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params)
+    model.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X[test])
+    predict_seconds = time.perf_counter() - start
+
+    y_test = y[test]
+    return {
+        "symbol": symbol,
+        "fold": fold,
+        "train_rows": train.stop - train.start,
+        "test_rows": test.stop - test.start,
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred, zero_division=0),
+        "recall": recall_score(y_test, y_pred, zero_division=0),
+        "f1": f1_score(y_test, y_pred, zero_division=0),
+        "up_rate": float(y_test.mean()),  # acierto de "siempre sube", como referencia
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+    }
+
+
+def walk_forward(symbols=None, n_folds=WALK_FORWARD_FOLDS, min_train=WALK_FORWARD_MIN_TRAIN,
+                 window=None, n_estimators=200, max_workers=None, provider=None,
+                 results_path=WALK_FORWARD_RESULTS, timeframes=()) -> pd.DataFrame:
+    """
+    Entrena y evalúa un RandomForest por (símbolo, fold) en un pool de procesos.
+    Las features salen del feature store (no se recalculan entre corridas) y
+    cada fila del resultado trae las métricas y los tiempos de su fold.
+    Con `timeframes` se evalúan también las features de temporalidades mayores.
+    """
+    use_provider(provider)
+    symbols = symbols or WALK_FORWARD_SYMBOLS
+
+    data, tasks = {}, []
+    params = {"n_estimators": n_estimators, "random_state": 42, "n_jobs": 1}
+    feature_cols = timeframe_feature_cols(timeframes)
+    for symbol in symbols:
+        # La última vela no tiene target real: no se evalúa en el último fold
+        df = labeled_rows(load_data(symbol, timeframes=timeframes))
+        if df.empty:
+            print(f"⚠️ Sin datos para {symbol}, se omite.")
+            continue
+        data[symbol] = (df[feature_cols].to_numpy(dtype=np.float32), df["target_up"].to_numpy())
+        for fold, (train, test) in enumerate(walk_forward_splits(len(df), n_folds, min_train, window)):
+            tasks.append((symbol, fold, train, test, params))
+
+    if not tasks:
+        raise ValueError("❌ No hay suficientes datos para ningún fold walk-forward.")
+
+    print(f"Entrenando {len(tasks)} folds ({len(data)} símbolos) en paralelo...")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_fold_worker, initargs=(data,)) as pool:
+        rows = list(pool.map(_run_fold, tasks))
+    elapsed = time.perf_counter() - start
+
+    results = pd.DataFrame(rows)
+    summary = results.groupby("symbol")[["accuracy", "f1", "up_rate", "fit_seconds"]].mean()
+    print("\n=== Walk-forward (promedio por símbolo) ===")
+    print(summary.round(4))
+    print(f"\n⏱️ {len(tasks)} folds en {elapsed:.1f}s "
+          f"(suma de entrenamientos: {results['fit_seconds'].sum():.1f}s)")
+
+    if results_path:
+        os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+        results.to_csv(results_path, index=False)
+        print(f"✅ Resultados por fold guardados en: {results_path}")
+    return results
+
+
 if __name__ == "__main__":
-    train_model()
+    if len(sys.argv) > 1 and sys.argv[1] == "walk-forward":
+        # walk-forward --timeframes: suma las features de WALK_FORWARD_TIMEFRAMES
+        walk_forward(timeframes=WALK_FORWARD_TIMEFRAMES if "--timeframes" in sys.argv else ())
+    else:
+        train_model()
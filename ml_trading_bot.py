@@ -4,14 +4,15 @@ Bot de trading que usa un modelo ML (RandomForest) para decidir buy/sell
 en un broker simulado.
 """
 
-import yfinance as yf
 import pandas as pd
-import joblib
 import time
 from datetime import datetime
 
 from broker_client import SimulatedBroker
-from feature_engineering import add_basic_features
+from feature_store import get_feature_store
+from market_data import get_bars, use_provider
+from model_registry import get_registry
+from streaming_features import StreamingFeatures
 
 SYMBOL = "AAPL"
 INTERVAL_SECONDS = 60
@@ -19,37 +20,43 @@ MODEL_PATH = "models/random_forest_aapl.pkl"
 
 
 def load_model():
-    model, feature_cols = joblib.load(MODEL_PATH)
+    model, feature_cols = get_registry().get(MODEL_PATH)
     return model, feature_cols
 
 
-def get_latest_features(symbol: str, period: str = "1y", interval: str = "1d", feature_cols=None):
-    df = yf.download(symbol, period=period, interval=interval)
-    df = df.dropna()
-    df = add_basic_features(df)
-    df = df.dropna()
+def get_latest_features(symbol: str, period: str = "1y", interval: str = "1d", feature_cols=None,
+                        engine: StreamingFeatures = None):
+    df = get_bars(symbol, period=period, interval=interval)
 
-    # Última fila
-    last_row = df.iloc[-1]
+    # Con motor incremental solo se procesan las velas nuevas
+    if engine is not None:
+        engine.sync(df)
+        if not engine.ready_for(feature_cols):
+            return None, engine.features.get("Close")
+        return engine.latest(feature_cols), engine.features["Close"]
 
-    # Convertir Close de manera segura
-    price = float(last_row["Close"].item()) if hasattr(last_row["Close"], "item") else float(last_row["Close"])
-
-    # Solo features que el modelo espera
-    X = last_row[feature_cols].to_frame().T
-    X.columns = feature_cols  # corregir nombres
+    # Solo las features que el modelo espera (y sus dependencias)
+    X = get_feature_store().get(symbol, df, feature_cols, interval=interval).iloc[-1:]
+    price = float(df["Close"].iloc[-1])
 
     return X, price
 
 
-def main():
-    model, feature_cols = load_model()
+def main(provider=None):
+    use_provider(provider)
     broker = SimulatedBroker(cash=5_000.0)
+    engine = StreamingFeatures()
 
     while True:
+        # El registro solo relee el disco si se publicó un modelo nuevo
+        model, feature_cols = load_model()
         print(f"\n🕒 {datetime.now()} - ML Bot revisando {SYMBOL}...")
 
-        X, price = get_latest_features(SYMBOL, feature_cols=feature_cols)
+        X, price = get_latest_features(SYMBOL, feature_cols=feature_cols, engine=engine)
+        if X is None or X.empty:
+            print("⚠️ Features incompletas (calentamiento o datos faltantes), se omite esta vela.")
+            time.sleep(INTERVAL_SECONDS)
+            continue
 
         # Probabilidad de que suba mañana
         proba_up = model.predict_proba(X)[0][1]
@@ -0,0 +1,204 @@
+# model_profiler.py
+"""
+Perfil de costo de un modelo: cuánto cuesta servirlo frente a cuánto acierta.
+
+Para un artefacto (model, feature_cols) como el que escribe ml_model.train_model
+reporta: tamaño en disco, tiempo de carga, memoria residente, latencia de
+predicción (una fila y lote, percentiles) y accuracy en el holdout. Hace lo
+mismo con variantes podadas (menos árboles, menor max_depth) para elegir el
+modelo que entra en el presupuesto de latencia por tick.
+
+Cada artefacto se mide en un proceso nuevo, así la carga y la memoria no se
+ven afectadas por lo que ya cargaron las mediciones anteriores.
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from feature_engineering import labeled_rows
+from ml_model import MODEL_PATH, SYMBOL, load_data, training_window
+
+TREE_COUNTS = [10, 25, 50, 100]
+MAX_DEPTHS = [4, 8, 12]
+PROFILE_RESULTS = "models/model_profile.csv"
+LATENCY_REPEATS = 200
+BATCH_ROWS = 100
+
+
+def _rss_bytes() -> int:
+    """Memoria residente actual del proceso (Linux); fuera de Linux, el pico (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _percentiles(seconds: list, prefix: str) -> dict:
+    us = np.asarray(seconds) * 1e6
+    return {f"{prefix}_p{p}_us": float(np.percentile(us, p)) for p in (50, 95, 99)}
+
+
+def _profile_in_process(path: str, X_holdout: np.ndarray, y_holdout: np.ndarray) -> dict:
+    # Se ejecuta en un proceso nuevo: la línea base de memoria no incluye ningún modelo
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    model, feature_cols = joblib.load(path)
+    load_seconds = time.perf_counter() - start
+    rss_after = _rss_bytes()
+
+    # Con nombres de columna, como lo llaman los bots y la API (sklearn avisa si faltan)
+    X_holdout = pd.DataFrame(X_holdout, columns=feature_cols)
+    row = X_holdout.iloc[-1:]
+    batch = X_holdout.iloc[-BATCH_ROWS:]
+    model.predict_proba(row)  # calentamiento
+
+    single, batched = [], []
+    for _ in range(LATENCY_REPEATS):
+        t = time.perf_counter()
+        model.predict_proba(row)
+        single.append(time.perf_counter() - t)
+    for _ in range(max(LATENCY_REPEATS // 10, 5)):
+        t = time.perf_counter()
+        model.predict_proba(batch)
+        batched.append(time.perf_counter() - t)
+
+    return {
+        "disk_mb": os.path.getsize(path) / 1e6,
+        "load_ms": load_seconds * 1e3,
+        "rss_mb": (rss_after - rss_before) / 1e6,
+        **_percentiles(single, "row"),
+        **_percentiles(batched, f"batch{len(batch)}"),
+        "accuracy": float((model.predict(X_holdout) == y_holdout).mean()),
+    }
+
+
+def profile_artifact(path: str, X_holdout, y_holdout) -> dict:
+    """Mide un artefacto guardado en un proceso recién creado."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_profile_in_process, path, np.asarray(X_holdout), np.asarray(y_holdout)).result()
+
+
+# ================================
+# VARIANTES PODADAS
+# ================================
+
+def _fewer_trees(model, n_trees: int):
+    """Mismo bosque con solo los primeros n_trees árboles (no re-entrena)."""
+    pruned = clone(model)
+    pruned.__dict__.update(model.__dict__)
+    pruned.estimators_ = model.estimators_[:n_trees]
+    pruned.n_estimators = n_trees
+    return pruned
+
+
+def _shallower(model, max_depth: int, X_train, y_train):
+    """Mismos hiperparámetros con max_depth menor (re-entrenado con el split de entrenamiento)."""
+    return clone(model).set_params(max_depth=max_depth).fit(X_train, y_train)
+
+
+def _holdout_split(df: pd.DataFrame, window, test_size: float):
+    """
+    (train, holdout) cronológicos, sin filas de entrenamiento en el holdout.
+    Con la ventana de entrenamiento registrada (primera, última vela), el
+    holdout son las velas posteriores; si no hay (un re-entrenamiento usa hasta
+    la última vela), las anteriores a la ventana, que el entrenamiento dejó
+    afuera. Sin fecha de corte registrada, el último `test_size`.
+    La última vela (sin cierre siguiente, target inventado) no entra en ninguno.
+    """
+    df = labeled_rows(df)
+    train_start, train_end = window
+    if train_end is None:
+        print("⚠️ El modelo no registra su fecha de corte: se usa el último "
+              f"{test_size:.0%} como holdout (puede solaparse con el entrenamiento).")
+        split = int(len(df) * (1 - test_size))
+        return df.iloc[:split], df.iloc[split:]
+
+    after = df.index > _like_index(train_end, df.index)
+    if after.any():
+        return df[~after], df[after]
+    if train_start is not None:
+        before = df.index < _like_index(train_start, df.index)
+        if before.any():
+            print(f"ℹ️ No hay velas posteriores al entrenamiento ({train_end}): se usan las "
+                  f"{before.sum()} anteriores a su ventana ({train_start}) como holdout.")
+            return df[~before], df[before]
+    raise ValueError(f"❌ No hay velas posteriores al entrenamiento ({train_end}) ni historia "
+                     "fuera de su ventana para medir accuracy.")
+
+
+def _like_index(ts: pd.Timestamp, index: pd.DatetimeIndex) -> pd.Timestamp:
+    """`ts` con la misma zona horaria (o sin zona) que `index`, para poder compararlos."""
+    if index.tz is not None and ts.tzinfo is None:
+        return ts.tz_localize("UTC")
+    if index.tz is None and ts.tzinfo is not None:
+        return ts.tz_convert("UTC").tz_localize(None)
+    return ts
+
+
+def profile_model(path: str = MODEL_PATH, symbol: str = SYMBOL, test_size: float = 0.2,
+                  tree_counts=TREE_COUNTS, max_depths=MAX_DEPTHS,
+                  results_path: str = PROFILE_RESULTS) -> pd.DataFrame:
+    """
+    Reporte (una fila por variante) del artefacto en `path` y sus versiones podadas.
+    Holdout: las velas de `symbol` fuera de la ventana de entrenamiento del
+    modelo (ml_model.training_window), así no se mide sobre filas de entrenamiento.
+    """
+    model, feature_cols = joblib.load(path)
+    df = load_data(symbol)
+    train, holdout = _holdout_split(df, training_window(path, symbol), test_size)
+    X_train, y_train = train[feature_cols], train["target_up"]
+    X_holdout, y_holdout = holdout[feature_cols].to_numpy(), holdout["target_up"].to_numpy()
+
+    n_trees = len(model.estimators_)
+    variants = [("original", None)]
+    variants += [(f"trees={k}", lambda k=k: _fewer_trees(model, k)) for k in tree_counts if k < n_trees]
+    variants += [(f"max_depth={d}", lambda d=d: _shallower(model, d, X_train, y_train)) for d in max_depths]
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="model_profile_") as tmp:
+        for name, build in variants:
+            variant_path = path
+            if build is not None:
+                variant_path = os.path.join(tmp, "variant.pkl")
+                joblib.dump((build(), feature_cols), variant_path)
+
+            print(f"📏 Midiendo {name}...")
+            rows.append({"variant": name, **profile_artifact(variant_path, X_holdout, y_holdout)})
+
+    report = pd.DataFrame(rows).set_index("variant")
+    print("\n=== Costo vs accuracy ===")
+    print(report.round(3).to_string())
+
+    if results_path:
+        os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+        report.to_csv(results_path)
+    return report
+
+
+def pick_variant(report: pd.DataFrame, latency_budget_us: float, percentile: int = 99) -> Optional[str]:
+    """
+    Variante más precisa cuya latencia de una fila (percentil dado) entra en el
+    presupuesto, o None si ninguna entra.
+    """
+    fits = report[report[f"row_p{percentile}_us"] <= latency_budget_us]
+    if fits.empty:
+        return None
+    return fits["accuracy"].idxmax()
+
+
+if __name__ == "__main__":
+    profile_model(sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH)
@@ -0,0 +1,142 @@
+# model_registry.py
+"""
+Registro de modelos en memoria compartido por la API, los bots y el backtest.
+
+- Cada artefacto (model, feature_cols) se deserializa UNA vez por proceso.
+- LRU con presupuesto de memoria: al pasarse se descartan los menos usados.
+  Los árboles de sklearn copian sus nodos a memoria privada al deserializarse
+  (Tree.__setstate__), así que cada proceso paga el tamaño completo del bosque:
+  ese tamaño (nodos + valores de cada árbol) es lo que se cuenta en el presupuesto.
+- Hot-swap: si el entrenamiento publica una versión nueva (publish_model o
+  un archivo con otra fecha de modificación), la siguiente consulta la usa.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import joblib
+
+MODEL_MEMORY_BUDGET = 2 * 1024 ** 3  # bytes
+CHECK_INTERVAL = 5.0  # segundos entre revisiones de versión en disco
+
+
+@dataclass
+class LoadedModel:
+    model: object
+    feature_cols: list
+    version: tuple  # (mtime_ns, tamaño) del archivo
+    size_bytes: int
+    checked_at: float
+
+
+class ModelRegistry:
+
+    def __init__(self, max_bytes: int = MODEL_MEMORY_BUDGET, mmap_mode: str = None,
+                 check_interval: float = CHECK_INTERVAL):
+        self.max_bytes = max_bytes
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+
+    # ================================
+    # CONSULTA
+    # ================================
+
+    def get(self, path: str):
+        """(model, feature_cols) del artefacto en `path`; solo lee el disco si cambió la versión."""
+        with self._lock:
+            entry = self._models.get(path)
+            now = time.monotonic()
+
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self._models.move_to_end(path)
+                return entry.model, entry.feature_cols
+
+            version = _file_version(path)
+            if entry is not None and entry.version == version:
+                entry.checked_at = now
+                self._models.move_to_end(path)
+                return entry.model, entry.feature_cols
+
+            entry = self._load(path, version)
+            return entry.model, entry.feature_cols
+
+    def preload(self, paths):
+        """Carga por adelantado (p. ej. al arrancar la API) para sacar la carga de la latencia."""
+        for path in paths:
+            if os.path.exists(path):
+                self.get(path)
+
+    # ================================
+    # CARGA Y PUBLICACIÓN
+    # ================================
+
+    def _load(self, path: str, version: tuple) -> LoadedModel:
+        model, feature_cols = joblib.load(path, mmap_mode=self.mmap_mode)
+        entry = LoadedModel(model, list(feature_cols), version, _model_nbytes(model, version[1]), time.monotonic())
+        self._models[path] = entry
+        self._models.move_to_end(path)
+        self._evict()
+        print(f"📦 Modelo cargado: {path} ({entry.size_bytes / 1e6:.1f} MB)")
+        return entry
+
+    def publish(self, model, feature_cols, path: str):
+        """
+        Guarda una versión nueva de forma atómica (los lectores nunca ven un
+        archivo a medias) y la activa de inmediato en este proceso.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        joblib.dump((model, list(feature_cols)), tmp)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._load(path, _file_version(path))
+
+    def _evict(self):
+        while len(self._models) > 1 and sum(e.size_bytes for e in self._models.values()) > self.max_bytes:
+            path, _ = self._models.popitem(last=False)
+            print(f"♻️ Modelo descartado de memoria: {path}")
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+def _model_nbytes(model, file_size: int) -> int:
+    """Memoria privada de un bosque (nodos + valores por árbol); si no es un bosque, el tamaño del archivo."""
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or not hasattr(estimators[0], "tree_"):
+        return file_size
+    total = 0
+    for est in estimators:
+        state = est.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def _file_version(path: str) -> tuple:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+# ================================
+# REGISTRO POR DEFECTO DEL PROYECTO
+# ================================
+
+_default_registry = None
+
+
+def get_registry() -> ModelRegistry:
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+    return _default_registry
+
+
+def publish_model(model, feature_cols, path: str):
+    get_registry().publish(model, feature_cols, path)
@@ -2,20 +2,30 @@
 """
 Prueba varias combinaciones de medias móviles para encontrar
 cuáles parámetros han funcionado mejor en el pasado.
+
+sweep_sma evalúa la grilla completa (por ejemplo todas las ventanas de 2 a 250)
+con NumPy: todas las medias salen de una sola suma acumulada y las señales,
+posiciones y equity de cada par (corta, larga) se calculan en bloque.
 """
 
-import yfinance as yf
+import numpy as np
 import pandas as pd
 
+from market_data import get_bars, get_cache, get_many_bars, use_provider
+
 SYMBOL = "AAPL"
 PERIOD = "5y"
 INTERVAL = "1d"
 INITIAL_CAPITAL = 10_000
+SWEEP_WINDOWS = range(2, 251)
+RISK_FREE = 0.01  # anual, igual que backtesting.metrics.sharpe_ratio
 
 
-def get_data():
-    df = yf.download(SYMBOL, period=PERIOD, interval=INTERVAL)
-    return df.dropna()
+def get_data(panel=None):
+    """Velas de SYMBOL; si se pasa un PanelStore se usa una vista del memmap."""
+    if panel is not None:
+        return panel.frame(SYMBOL, start=get_cache().period_start(PERIOD))
+    return get_bars(SYMBOL, period=PERIOD, interval=INTERVAL)
 
 
 def run_strategy(df: pd.DataFrame, short_window: int, long_window: int) -> float:
@@ -35,22 +45,98 @@ def run_strategy(df: pd.DataFrame, short_window: int, long_window: int) -> float
     return total_return
 
 
-def main():
+# ================================
+# BARRIDO VECTORIZADO DE PARÁMETROS
+# ================================
+
+def moving_averages(close: np.ndarray, windows) -> np.ndarray:
+    """Matriz (ventanas x tiempo) con todas las medias móviles, desde una sola suma acumulada."""
+    close = np.asarray(close, dtype=np.float64)
+    csum = np.concatenate([[0.0], np.cumsum(close)])
+    sma = np.full((len(windows), len(close)), np.nan)
+    for i, w in enumerate(windows):
+        if w <= len(close):
+            sma[i, w - 1:] = (csum[w:] - csum[:-w]) / w
+    return sma
+
+
+def sweep_sma(close, short_windows=SWEEP_WINDOWS, long_windows=SWEEP_WINDOWS) -> pd.DataFrame:
+    """
+    Evalúa todos los pares (corta < larga) con la misma lógica que run_strategy
+    (long si SMA corta > SMA larga, posición con un día de retraso) y devuelve
+    una tabla ordenada por retorno con retorno total (%), Sharpe y drawdown
+    calculados como en backtesting.metrics.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    windows = sorted(set(short_windows) | set(long_windows))
+    index = {w: i for i, w in enumerate(windows)}
+    sma = moving_averages(close, windows)
+
+    market = np.zeros(len(close))
+    market[1:] = close[1:] / close[:-1] - 1
+    log_market = np.log1p(market)
+    market_sq = market * market
+
+    longs = np.array(sorted(long_windows))
+    tables = []
+    for short in sorted(short_windows):
+        block = longs[longs > short]
+        if len(block) == 0:
+            continue
+
+        # Señales (largas x tiempo): NaN en la media larga compara como False → fuera del mercado
+        signal = sma[index[short]][np.newaxis, :] > sma[[index[w] for w in block]]
+        position = np.zeros(signal.shape)
+        position[:, 1:] = signal[:, :-1]
+
+        # Equity en log: la suma acumulada da toda la curva de cada par a la vez
+        log_equity = np.cumsum(position * log_market, axis=1)
+        drawdown = np.exp(log_equity - np.maximum.accumulate(log_equity, axis=1)).min(axis=1) - 1
+
+        # Sharpe sobre las filas que run_strategy conserva (desde que existe la media larga)
+        n = len(close) - block + 1
+        mean = position @ market / n
+        std = np.sqrt(np.maximum(position @ market_sq / n - mean * mean, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std > 0, np.sqrt(252) * (mean - RISK_FREE / 252) / std, 0.0)
+
+        tables.append(pd.DataFrame({
+            "short": short,
+            "long": block,
+            "total_return": (np.exp(log_equity[:, -1]) - 1) * 100,
+            "sharpe": sharpe,
+            "max_drawdown": drawdown,
+        }))
+
+    results = pd.concat(tables, ignore_index=True)
+    return results.sort_values("total_return", ascending=False, ignore_index=True)
+
+
+def sweep_universe(symbols, short_windows=SWEEP_WINDOWS, long_windows=SWEEP_WINDOWS,
+                   period: str = PERIOD, top_n: int = None) -> pd.DataFrame:
+    """sweep_sma para cada símbolo (una sola descarga por lotes); columnas extra: symbol."""
+    universe = get_many_bars(list(symbols), period=period, interval=INTERVAL)
+    tables = []
+    for symbol in symbols:
+        df = universe[symbol]
+        if df.empty:
+            continue
+        table = sweep_sma(df["Close"].to_numpy(), short_windows, long_windows)
+        tables.append(table.head(top_n).assign(symbol=symbol) if top_n else table.assign(symbol=symbol))
+    return pd.concat(tables, ignore_index=True)
+
+
+def main(provider=None):
+    use_provider(provider)
     df = get_data()
-    results = []
 
-    for short in [5, 10, 20]:
-        for long in [30, 50, 100, 200]:
-            if short >= long:
-                continue
-            r = run_strategy(df, short, long)
-            results.append((short, long, r))
-            print(f"SMA_SHORT={short}, SMA_LONG={long} → Retorno: {r:.2f}%")
+    results = sweep_sma(df["Close"].to_numpy())
+    print(f"Evaluadas {len(results)} combinaciones de medias móviles.")
 
     print("\n=== Mejores parámetros ===")
-    results.sort(key=lambda x: x[2], reverse=True)
-    for s, l, r in results[:5]:
-        print(f"{s}/{l} → {r:.2f}%")
+    for row in results.head(5).itertuples():
+        print(f"{row.short}/{row.long} → {row.total_return:.2f}% | Sharpe {row.sharpe:.2f} | "
+              f"Drawdown {row.max_drawdown:.2%}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+# panel_features.py
+"""
+Feature engineering vectorizado para un panel de símbolos.
+
+En lugar de llamar add_basic_features símbolo por símbolo, cada campo llega
+como un arreglo 2D (tiempo x símbolo) y todos los indicadores se calculan para
+todo el universo con operaciones NumPy sobre el eje del tiempo.
+
+El resultado es un arreglo compacto (tiempo x símbolo x feature) en float32 y
+la lista con el nombre de cada feature. Las definiciones son las mismas de
+feature_engineering.py (sin las columnas auxiliares H-L, TR, EMA12, ...).
+"""
+
+import numpy as np
+
+PANEL_FEATURES = [
+    "return_1d", "volatility_5", "lag_return_1",
+    "RSI", "MACD", "MACD_signal", "MACD_hist",
+    "EMA20", "EMA50",
+    "BB_middle", "BB_upper", "BB_lower",
+    "ATR", "Momentum", "ROC", "OBV",
+]
+
+
+# ================================
+# OPERACIONES SOBRE EL EJE DEL TIEMPO
+# ================================
+
+def _shift(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[n:] = x[:-n]
+    return out
+
+
+def _rolling(x: np.ndarray, window: int, func: str) -> np.ndarray:
+    """
+    Media o desviación (ddof=1) móvil con sumas acumuladas; NaN si la ventana
+    no tiene `window` valores válidos (como min_periods=window en pandas).
+    """
+    out = np.full_like(x, np.nan)
+    if len(x) < window:
+        return out
+
+    # Centrar cada columna evita perder precisión al restar sumas de cuadrados grandes
+    missing = np.isnan(x)
+    centered = np.where(missing, 0.0, x - np.nanmean(x, axis=0))
+
+    def window_sum(v):
+        c = np.cumsum(v, axis=0)
+        c[window:] = c[window:] - c[:-window]
+        return c[window - 1:]
+
+    gaps = window_sum(missing.astype(np.int64)) > 0
+    s1 = window_sum(centered)
+    if func == "mean":
+        result = s1 / window + np.nanmean(x, axis=0)
+    else:
+        var = (window_sum(centered * centered) - s1 * s1 / window) / (window - 1)
+        result = np.sqrt(np.maximum(var, 0.0))
+
+    out[window - 1:] = np.where(gaps, np.nan, result)
+    return out
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    ewm(span, adjust=False).mean() por columnas. Cada símbolo arranca en su
+    primer valor válido; un hueco intermedio (NaN) mantiene el último valor.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[1:], np.nan)
+    for t in range(len(x)):
+        cur = x[t]
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, (1 - alpha) * prev + alpha * cur))
+        out[t] = prev
+    return out
+
+
+# ================================
+# FEATURES DEL PANEL
+# ================================
+
+def compute_panel_features(open_, high, low, close, volume, dtype=np.float32):
+    """
+    Calcula todas las features para todos los símbolos en una pasada.
+
+    Entradas: arreglos (tiempo x símbolo), por ejemplo PanelStore.field("Close").T.
+    Los huecos iniciales (símbolos que empiezan más tarde) están soportados;
+    los huecos intermedios conviene rellenarlos (ffill) antes.
+
+    Devuelve (features, nombres): features tiene forma (tiempo, símbolo, feature)
+    y NaN donde el indicador aún no tiene historia suficiente.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prev_close = _shift(close, 1)
+        delta = close - prev_close
+
+        # Cambios de precio
+        ret = close / prev_close - 1
+        volatility = _rolling(ret, 5, "std")
+        lag_ret = _shift(ret, 1)
+
+        # RSI (NaN en delta cuenta como 0, igual que delta.where(...) en pandas)
+        listed = ~np.isnan(close)
+        gain = _rolling(np.where(listed, np.where(delta > 0, delta, 0.0), np.nan), 14, "mean")
+        loss = _rolling(np.where(listed, np.where(delta < 0, -delta, 0.0), np.nan), 14, "mean")
+        rsi = 100 - (100 / (1 + gain / loss))
+
+        # MACD y EMAs
+        macd = _ema(close, 12) - _ema(close, 26)
+        macd_signal = _ema(macd, 9)
+        ema20 = _ema(close, 20)
+        ema50 = _ema(close, 50)
+
+        # Bollinger
+        bb_middle = _rolling(close, 20, "mean")
+        bb_std = _rolling(close, 20, "std")
+
+        # ATR (fmax ignora NaN como max(axis=1) en pandas)
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        atr = _rolling(tr, 14, "mean")
+
+        # Momentum, ROC y OBV
+        close_10 = _shift(close, 10)
+        momentum = close - close_10
+        roc = close / close_10 - 1
+        obv = np.cumsum(np.nan_to_num(np.sign(delta) * volume), axis=0)
+
+    features = [
+        ret, volatility, lag_ret,
+        rsi, macd, macd_signal, macd - macd_signal,
+        ema20, ema50,
+        bb_middle, bb_middle + 2 * bb_std, bb_middle - 2 * bb_std,
+        atr, momentum, roc, obv,
+    ]
+    return np.stack(features, axis=-1).astype(dtype, copy=False), list(PANEL_FEATURES)
+
+
+def panel_features_from_store(store, start=None, end=None, dtype=np.float32):
+    """Features (tiempo x símbolo x feature) de todo un PanelStore, leyendo vistas del memmap."""
+    fields = [store.field(name, start, end).T for name in ("Open", "High", "Low", "Close", "Volume")]
+    features, names = compute_panel_features(*fields, dtype=dtype)
+    return features, names, store.dates[store.date_slice(start, end)], store.symbols
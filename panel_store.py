@@ -0,0 +1,278 @@
+# panel_store.py
+"""
+Almacén en disco de precios para universos grandes:
+un único arreglo float32 memory-mapped (símbolos x tiempo x campo)
+más un índice de símbolos y un índice de fechas.
+
+Abrir el almacén es casi instantáneo (no se lee nada hasta que se toca) y las
+consultas devuelven vistas del memmap sin copiar datos.
+
+Hay un almacén por intervalo (data/panel/<intervalo>). index.json guarda el
+rango pedido al construirlo y el reloj del proveedor en ese momento; open_panel
+lo reconstruye (uniendo los símbolos que ya tenía) cuando se pide algo fuera de
+ese rango o cuando quedó más de una vela atrás.
+
+Cada reconstrucción escribe arreglos nuevos (panel_<gen>.npy, dates_<gen>.npy)
+y publica index.json al final con os.replace: un lector concurrente ve siempre
+un índice y unos arreglos de la misma generación. Se conserva la generación
+anterior para los lectores que ya leyeron el índice viejo.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from market_data import INTERVAL_FREQ, get_cache, slice_bars
+
+PANEL_DIR = "data/panel"
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+PANEL_BATCH = 200  # símbolos por descarga (get_many) al construir desde el caché
+
+
+class PanelStore:
+    """
+    Estructura en disco (root/):
+    - panel_<gen>.npy → float32 (símbolos, tiempo, campos); NaN donde no hay vela
+    - dates_<gen>.npy → int64 (nanosegundos UTC) con el índice de fechas común
+    - index.json      → archivos de la generación vigente, símbolos, campos, zona
+      horaria, intervalo y rango cubierto (start / end pedidos, None = sin límite;
+      as_of = reloj del proveedor al construir)
+    """
+
+    def __init__(self, root: str = PANEL_DIR, mode: str = "r"):
+        self.root = root
+
+        with open(os.path.join(root, "index.json")) as f:
+            meta = json.load(f)
+
+        self.symbols = meta["symbols"]
+        self.fields = meta["fields"]
+        self.interval = meta.get("interval")
+        self.start = _meta_ts(meta.get("start"))
+        self.end = _meta_ts(meta.get("end"))
+        self.as_of = _meta_ts(meta.get("as_of"))
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.field_index = {f: i for i, f in enumerate(self.fields)}
+
+        files = meta.get("files", {"dates": "dates.npy", "panel": "panel.npy"})
+        dates = pd.DatetimeIndex(np.load(os.path.join(root, files["dates"])).view("datetime64[ns]"))
+        if meta.get("tz"):
+            dates = dates.tz_localize("UTC").tz_convert(meta["tz"])
+        self.dates = dates
+
+        self.data = np.load(os.path.join(root, files["panel"]), mmap_mode=mode)
+
+    # ================================
+    # CONSTRUCCIÓN
+    # ================================
+
+    @classmethod
+    def build(cls, root: str, frames: dict, fields=FIELDS, interval: str = None) -> "PanelStore":
+        """Crea el almacén a partir de {símbolo: DataFrame OHLCV} (sin rango ni reloj: open_panel no lo reutiliza)."""
+        dates = pd.DatetimeIndex([])
+        for df in frames.values():
+            if not df.empty:
+                dates = dates.union(df.index)
+        return cls._write(root, list(frames), dates, lambda s: frames[s], fields, {"interval": interval})
+
+    @classmethod
+    def from_cache(cls, root: str, symbols, interval: str = "1d", period: str = None,
+                   start=None, end=None, cache=None, fields=FIELDS) -> "PanelStore":
+        """
+        Crea el almacén leyendo las velas del caché local: el refresco se pide por
+        lotes de PANEL_BATCH símbolos (una descarga por lote con get_many) y el
+        memmap se llena símbolo a símbolo, sin tener nunca todo el universo en
+        memoria como DataFrames.
+        """
+        cache = cache if cache is not None else get_cache()
+        if start is None:
+            start = cache.period_start(period)
+        symbols = list(symbols)
+
+        # 1ª pasada: refrescar el caché por lotes y armar el índice de fechas común
+        dates = pd.DatetimeIndex([])
+        for i in range(0, len(symbols), PANEL_BATCH):
+            frames = cache.get_many(symbols[i:i + PANEL_BATCH], interval=interval, start=start, end=end)
+            for df in frames.values():
+                if not df.empty:
+                    dates = dates.union(df.index)
+
+        def reload(symbol):
+            # Ya refrescado en la 1ª pasada: basta con leer el Parquet
+            df = cache.load(symbol, interval)
+            return pd.DataFrame() if df is None else slice_bars(df, start, end)
+
+        coverage = {
+            "interval": interval,
+            "start": None if start is None else pd.Timestamp(start).isoformat(),
+            "end": None if end is None else pd.Timestamp(end).isoformat(),
+            "as_of": cache.provider.now().isoformat(),
+        }
+        return cls._write(root, symbols, dates, reload, fields, coverage)
+
+    @classmethod
+    def _write(cls, root: str, symbols: list, dates: pd.DatetimeIndex, reload, fields,
+               coverage: dict) -> "PanelStore":
+        os.makedirs(root, exist_ok=True)
+        tz = str(dates.tz) if dates.tz is not None else None
+        utc_dates = dates.tz_convert("UTC").tz_localize(None) if tz else dates
+
+        # Generación nueva: nombres propios, nunca se pisan los arreglos que se están leyendo
+        gen = f"{time.time_ns():x}"
+        files = {"dates": f"dates_{gen}.npy", "panel": f"panel_{gen}.npy"}
+
+        # 2ª pasada: escribir símbolo a símbolo directamente en el memmap
+        tmp_path = os.path.join(root, files["panel"] + ".tmp")
+        data = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(len(symbols), len(dates), len(fields))
+        )
+        data[:] = np.nan
+        for i, symbol in enumerate(symbols):
+            df = reload(symbol)
+            if df.empty:
+                continue
+            block = df.reindex(index=dates, columns=fields)
+            data[i] = block.to_numpy(dtype=np.float32)
+        data.flush()
+        del data
+
+        with open(os.path.join(root, files["dates"] + ".tmp"), "wb") as f:
+            np.save(f, utc_dates.asi8)
+        os.replace(os.path.join(root, files["dates"] + ".tmp"), os.path.join(root, files["dates"]))
+        os.replace(tmp_path, os.path.join(root, files["panel"]))
+
+        # index.json al final: es lo que publica la generación nueva
+        index_path = os.path.join(root, "index.json")
+        previous = _index_files(index_path)
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"files": files, "symbols": symbols, "fields": list(fields), "tz": tz, **coverage}, f)
+        os.replace(index_path + ".tmp", index_path)
+        _remove_old_generations(root, keep=set(files.values()) | previous)
+
+        return cls(root)
+
+    # ================================
+    # CONSULTAS (VISTAS SIN COPIA)
+    # ================================
+
+    def date_slice(self, start=None, end=None) -> slice:
+        """Convierte [start, end) en un slice de posiciones sobre el índice de fechas."""
+        i0 = 0 if start is None else self.dates.searchsorted(_as_ts(start, self.dates))
+        i1 = len(self.dates) if end is None else self.dates.searchsorted(_as_ts(end, self.dates))
+        return slice(i0, i1)
+
+    def symbol(self, symbol: str, start=None, end=None) -> np.ndarray:
+        """Vista (tiempo x campos) de un símbolo."""
+        return self.data[self.symbol_index[symbol], self.date_slice(start, end)]
+
+    def field(self, name: str, start=None, end=None) -> np.ndarray:
+        """Vista (símbolos x tiempo) de un campo para todo el universo."""
+        return self.data[:, self.date_slice(start, end), self.field_index[name]]
+
+    def frame(self, symbol: str, start=None, end=None, dropna: bool = True) -> pd.DataFrame:
+        """
+        DataFrame OHLCV de un símbolo respaldado por el memmap (solo lectura).
+        Con dropna=True se recortan las fechas sin vela (huecos de calendario);
+        solo en ese caso se copian las filas seleccionadas.
+        """
+        rows = self.date_slice(start, end)
+        values = self.symbol(symbol, start, end)
+        df = pd.DataFrame(values, index=self.dates[rows], columns=self.fields, copy=False)
+
+        if dropna:
+            missing = np.isnan(values).any(axis=1)
+            if missing.any():
+                df = df[~missing]
+        return df
+
+    def field_frame(self, name: str, symbols=None, start=None, end=None) -> pd.DataFrame:
+        """Panel (fechas x símbolos) de un campo, p. ej. todos los cierres."""
+        rows = self.date_slice(start, end)
+        df = pd.DataFrame(self.field(name, start, end).T, index=self.dates[rows],
+                          columns=self.symbols, copy=False)
+        return df if symbols is None else df[list(symbols)]
+
+    def covers(self, symbols) -> bool:
+        return all(s in self.symbol_index for s in symbols)
+
+    def serves(self, symbols, interval: str, start=None, end=None, now=None) -> bool:
+        """
+        True si el almacén tiene los símbolos, el intervalo y el rango [start, end).
+        Sin `end` (hasta hoy) además tiene que estar al día: construido hace menos
+        de una vela según el reloj `now` del proveedor.
+        """
+        if self.interval != interval or self.as_of is None or not self.covers(symbols):
+            return False
+        if self.start is not None and (start is None or _naive(start) < self.start):
+            return False
+        if end is not None:
+            return (self.end is not None and _naive(end) <= self.end) or \
+                   (self.end is None and _naive(end) <= self.as_of)
+        if self.end is not None:
+            return False
+        return now is None or _naive(now) < self.as_of + to_offset(INTERVAL_FREQ.get(interval, "B"))
+
+
+def _index_files(index_path: str) -> set:
+    """Arreglos de la generación publicada en index_path (vacío si no hay almacén)."""
+    if not os.path.exists(index_path):
+        return set()
+    with open(index_path) as f:
+        return set(json.load(f).get("files", {"dates": "dates.npy", "panel": "panel.npy"}).values())
+
+
+def _remove_old_generations(root: str, keep: set):
+    for name in os.listdir(root):
+        if name.endswith(".npy") and name.startswith(("panel", "dates")) and name not in keep:
+            os.remove(os.path.join(root, name))
+
+
+def _as_ts(ts, index: pd.DatetimeIndex) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    if index.tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(index.tz)
+    return ts
+
+
+def _naive(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+
+def _meta_ts(value):
+    return None if value is None else _naive(value)
+
+
+def panel_dir(interval: str, root: str = PANEL_DIR) -> str:
+    return os.path.join(root, interval)
+
+
+def open_panel(symbols, root: str = None, interval: str = "1d", period: str = None,
+               start=None, end=None, rebuild: bool = False) -> PanelStore:
+    """
+    Abre el almacén del intervalo si sirve para la petición (ver PanelStore.serves);
+    si no, lo reconstruye desde el caché con los símbolos pedidos más los que ya
+    tenía y el rango más amplio de los dos.
+    """
+    cache = get_cache()
+    root = root or panel_dir(interval)
+    if start is None:
+        start = cache.period_start(period)
+
+    symbols = list(symbols)
+    if os.path.exists(os.path.join(root, "index.json")):
+        store = PanelStore(root)
+        if not rebuild and store.serves(symbols, interval, start, end, now=cache.provider.now()):
+            return store
+        if store.interval == interval:
+            symbols = store.symbols + [s for s in symbols if s not in store.symbol_index]
+            if start is not None and (store.start is None or store.start < _naive(start)):
+                start = store.start
+            if end is not None and (store.end is None or store.end > _naive(end)):
+                end = store.end
+
+    return PanelStore.from_cache(root, symbols, interval=interval, start=start, end=end)
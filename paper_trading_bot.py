@@ -6,10 +6,10 @@ No usa broker real, sino SimulatedBroker.
 import time
 from datetime import datetime
 
-import yfinance as yf
 import pandas as pd
 
 from broker_client import SimulatedBroker
+from market_data import get_bars, use_provider
 
 SYMBOL = "AAPL"
 SHORT_WINDOW = 20
@@ -18,8 +18,7 @@ INTERVAL_SECONDS = 30
 
 
 def get_latest_data(symbol: str, period: str = "6mo", interval: str = "1d") -> pd.DataFrame:
-    df = yf.download(symbol, period=period, interval=interval)
-    return df.dropna()
+    return get_bars(symbol, period=period, interval=interval)
 
 
 def compute_signal(df: pd.DataFrame) -> str:
@@ -40,7 +39,8 @@ def compute_signal(df: pd.DataFrame) -> str:
         return "HOLD"
 
 
-def main():
+def main(provider=None):
+    use_provider(provider)
     broker = SimulatedBroker(cash=5_000.0)
 
     while True:
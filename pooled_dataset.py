@@ -0,0 +1,291 @@
+# pooled_dataset.py
+"""
+Dataset de entrenamiento conjunto (pooled) para todo un universo de símbolos.
+
+El modelo guardado se entrenó solo con AAPL pero se aplica a MSFT, BTC-USD,
+BND, ... Este módulo construye un dataset con las features y el objetivo de
+TODOS los símbolos, símbolo a símbolo y en bloques de tamaño fijo, sin armar
+nunca el DataFrame concatenado en memoria.
+
+Estructura en disco (root/):
+- chunk_00000_X.npy      → float32 (filas, features)
+- chunk_00000_y.npy      → int8    objetivo target_up
+- chunk_00000_symbol.npy → int16   índice del símbolo en index.json
+- chunk_00000_class.npy  → int8    índice de la clase de activo en index.json
+- chunk_00000_time.npy   → int64   fecha de la vela (nanosegundos UTC)
+- chunk_00000_train.npy  → bool    False en el último `holdout` de cada símbolo
+- index.json             → símbolos, clases, features, filas (y filas de
+                           entrenamiento) por bloque y última vela de
+                           entrenamiento de cada símbolo
+
+El modelo conjunto se entrena solo con las filas train=True: el tramo final de
+cada símbolo queda como holdout (model_profiler mide ahí, con la fecha de
+corte de ese símbolo y no la del universo).
+
+Cada etiqueta (símbolo, clase) es metadato para filtrar o evaluar por grupo;
+no entra en X, así el modelo sigue usando solo las features del feature store.
+
+Con use_panel=True las features salen de UNA pasada vectorizada sobre el panel
+memory-mapped (panel_features) en lugar de símbolo a símbolo. Solo se usa para
+los símbolos sin huecos intermedios en el calendario común del panel (p. ej. las
+acciones en un universo con cripto tienen NaN los fines de semana); el resto
+sigue por el feature store.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_engineering import add_target_direction, labeled_rows
+from feature_store import get_feature_store
+from market_data import get_bars, use_provider
+from ml_model import MODEL_FEATURES, POOLED_MODEL_PATH, load_best_params, save_training_cutoff
+from model_registry import publish_model
+from panel_features import PANEL_FEATURES, panel_features_from_store
+from panel_store import open_panel
+
+POOLED_DIR = "data/pooled"
+CHUNK_ROWS = 1_000_000
+POOLED_HOLDOUT = 0.2  # fracción final de cada símbolo que no entra al entrenamiento
+
+# Universo que usan la API y los bots, con su clase de activo
+POOLED_UNIVERSE = {
+    "AAPL": "equity",
+    "MSFT": "equity",
+    "AMZN": "equity",
+    "TSLA": "equity",
+    "COIN": "equity",
+    "VOO": "etf",
+    "QQQ": "etf",
+    "BND": "bond",
+    "BTC-USD": "crypto",
+    "ETH-USD": "crypto",
+}
+ASSET_CLASSES = ["equity", "etf", "bond", "crypto", "forex"]
+
+
+def asset_class(symbol: str) -> str:
+    """Clase de activo de un símbolo (tabla conocida o convención de tickers de Yahoo)."""
+    if symbol in POOLED_UNIVERSE:
+        return POOLED_UNIVERSE[symbol]
+    if symbol.endswith("-USD"):
+        return "crypto"
+    if symbol.endswith("=X"):
+        return "forex"
+    return "equity"
+
+
+# ================================
+# LECTURA EN BLOQUES
+# ================================
+
+class _PanelFeatures:
+    """Features de todo el universo calculadas de una vez sobre el panel del intervalo."""
+
+    def __init__(self, symbols, feature_cols, period, interval):
+        self.store = open_panel(symbols, period=period, interval=interval)
+        features, names, self.dates, _ = panel_features_from_store(self.store)
+        self.features = features[:, :, [names.index(c) for c in feature_cols]]
+        self.feature_cols = feature_cols
+
+    def frame(self, symbol: str):
+        """Close + features de `symbol`, o None si tiene huecos intermedios (va por el feature store)."""
+        j = self.store.symbol_index[symbol]
+        close = self.store.data[j, :, self.store.field_index["Close"]]
+        listed = np.flatnonzero(~np.isnan(close))
+        if len(listed) == 0 or len(listed) != listed[-1] - listed[0] + 1:
+            return None
+        rows = slice(listed[0], listed[-1] + 1)
+        df = pd.DataFrame(self.features[rows, j], index=self.dates[rows], columns=self.feature_cols)
+        df.insert(0, "Close", close[rows].astype(np.float64))
+        return df.dropna()
+
+
+def iter_chunks(symbols, feature_cols=MODEL_FEATURES, period="max", interval="1d",
+                chunk_rows=CHUNK_ROWS, use_panel: bool = False, holdout: float = POOLED_HOLDOUT):
+    """
+    Genera bloques de como máximo `chunk_rows` filas con X, y, las etiquetas y
+    la marca de entrenamiento (las últimas `holdout` filas de cada símbolo no).
+    En memoria solo vive un símbolo más el bloque en construcción (con
+    use_panel, además las features del panel en float32).
+    """
+    feature_cols = list(feature_cols)
+    store = get_feature_store()
+    panel = None
+    if use_panel and set(feature_cols) <= set(PANEL_FEATURES):
+        panel = _PanelFeatures(symbols, feature_cols, period, interval)
+    pending, pending_rows = [], 0
+
+    for symbol_id, symbol in enumerate(symbols):
+        df = panel.frame(symbol) if panel is not None else None
+        if df is None:
+            bars = get_bars(symbol, period=period, interval=interval)
+            if bars.empty:
+                print(f"⚠️ Sin datos para {symbol}, se omite.")
+                continue
+            features = store.get(symbol, bars, feature_cols, interval=interval)
+            df = bars[["Close"]].join(features, how="inner")
+
+        # La última vela no tiene cierre siguiente: su target sería inventado
+        df = labeled_rows(add_target_direction(df))
+        if df.empty:
+            continue
+
+        n = len(df)
+        n_train = n - int(n * holdout)
+        index = df.index.tz_convert("UTC").tz_localize(None) if df.index.tz is not None else df.index
+        pending.append({
+            "X": df[feature_cols].to_numpy(dtype=np.float32),
+            "y": df["target_up"].to_numpy(dtype=np.int8),
+            "symbol": np.full(n, symbol_id, dtype=np.int16),
+            "class": np.full(n, ASSET_CLASSES.index(asset_class(symbol)), dtype=np.int8),
+            "time": index.asi8,
+            "train": np.arange(n) < n_train,
+        })
+        pending_rows += n
+
+        while pending_rows >= chunk_rows:
+            chunk = _concat(pending)
+            yield {k: v[:chunk_rows] for k, v in chunk.items()}
+            pending = [{k: v[chunk_rows:] for k, v in chunk.items()}]
+            pending_rows -= chunk_rows
+
+    if pending_rows:
+        yield _concat(pending)
+
+
+def _concat(parts):
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+# ================================
+# DATASET EN DISCO
+# ================================
+
+class PooledDataset:
+
+    def __init__(self, root: str = POOLED_DIR):
+        self.root = root
+        with open(os.path.join(root, "index.json")) as f:
+            meta = json.load(f)
+        self.symbols = meta["symbols"]
+        self.asset_classes = meta["asset_classes"]
+        self.feature_cols = meta["feature_cols"]
+        self.chunk_sizes = meta["chunk_sizes"]
+        self.train_sizes = meta["train_sizes"]
+        self.train_end = {symbol: pd.Timestamp(t) for symbol, t in meta["train_end"].items()}
+        self.offsets = np.concatenate([[0], np.cumsum(self.chunk_sizes)]).astype(np.int64)
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @classmethod
+    def build(cls, root: str = POOLED_DIR, symbols=None, feature_cols=MODEL_FEATURES,
+              period: str = "max", interval: str = "1d", chunk_rows: int = CHUNK_ROWS,
+              use_panel: bool = False, holdout: float = POOLED_HOLDOUT) -> "PooledDataset":
+        """Escribe el dataset bloque a bloque a medida que se generan (ver iter_chunks)."""
+        symbols = list(symbols or POOLED_UNIVERSE)
+        os.makedirs(root, exist_ok=True)
+
+        sizes, train_sizes, train_end = [], [], {}
+        for i, chunk in enumerate(iter_chunks(symbols, feature_cols, period, interval, chunk_rows,
+                                              use_panel, holdout)):
+            for name, values in chunk.items():
+                np.save(os.path.join(root, f"chunk_{i:05d}_{name}.npy"), values)
+            sizes.append(len(chunk["y"]))
+            train_sizes.append(int(chunk["train"].sum()))
+            # Las filas de cada símbolo llegan en orden: un bloque posterior pisa a los anteriores
+            ids, times = chunk["symbol"][chunk["train"]], chunk["time"][chunk["train"]]
+            for symbol_id in np.unique(ids):
+                train_end[symbols[symbol_id]] = int(times[ids == symbol_id].max())
+            print(f"💾 Bloque {i}: {sizes[-1]} filas")
+
+        with open(os.path.join(root, "index.json"), "w") as f:
+            json.dump({
+                "symbols": symbols,
+                "asset_classes": ASSET_CLASSES,
+                "feature_cols": list(feature_cols),
+                "chunk_sizes": sizes,
+                "train_sizes": train_sizes,
+                "train_end": {symbol: pd.Timestamp(t).isoformat() for symbol, t in train_end.items()},
+            }, f)
+        return cls(root)
+
+    def chunk(self, i: int, name: str) -> np.ndarray:
+        """Arreglo memory-mapped de un bloque (no se lee hasta que se toca)."""
+        return np.load(os.path.join(self.root, f"chunk_{i:05d}_{name}.npy"), mmap_mode="r")
+
+    def iter_chunks(self, names=("X", "y")):
+        for i in range(len(self.chunk_sizes)):
+            yield tuple(self.chunk(i, name) for name in names)
+
+    def sample(self, n_rows: int, rng: np.random.Generator, train_only: bool = True):
+        """
+        Muestra aleatoria (X, y) de todo el universo leyendo solo las filas elegidas.
+        Con train_only solo sale de las filas de entrenamiento (sin el holdout).
+        """
+        sizes = self.train_sizes if train_only else self.chunk_sizes
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        rows = np.sort(rng.choice(offsets[-1], size=min(n_rows, offsets[-1]), replace=False))
+        chunk_of = np.searchsorted(offsets, rows, side="right") - 1
+
+        X_parts, y_parts = [], []
+        for i in np.unique(chunk_of):
+            local = rows[chunk_of == i] - offsets[i]
+            if train_only:
+                # i-ésima fila de entrenamiento del bloque → posición en el bloque
+                local = np.flatnonzero(self.chunk(i, "train"))[local]
+            X_parts.append(self.chunk(i, "X")[local])
+            y_parts.append(self.chunk(i, "y")[local])
+        return np.concatenate(X_parts), np.concatenate(y_parts)
+
+
+# ================================
+# ENTRENAMIENTO CONJUNTO
+# ================================
+
+def train_pooled_model(dataset: PooledDataset, n_rounds: int = 10, trees_per_round: int = 20,
+                       sample_rows: int = 2_000_000, min_samples_leaf: int = None, seed: int = 42):
+    """
+    RandomForest entrenado por rondas con warm_start: en cada ronda se agregan
+    `trees_per_round` árboles ajustados sobre una muestra de las filas de
+    entrenamiento de todo el universo (el holdout de cada símbolo queda afuera).
+    La memoria queda acotada por `sample_rows`, no por el tamaño del dataset.
+    Usa los hiperparámetros de hyperparameter_search.py (salvo la cantidad de
+    árboles, que la fijan las rondas); `min_samples_leaf` explícito los pisa.
+    """
+    rng = np.random.default_rng(seed)
+    params = {"min_samples_leaf": 50, **load_best_params()}
+    params.pop("n_estimators", None)
+    if min_samples_leaf is not None:
+        params["min_samples_leaf"] = min_samples_leaf
+    model = RandomForestClassifier(n_estimators=0, warm_start=True, n_jobs=-1, random_state=seed, **params)
+
+    for r in range(n_rounds):
+        X, y = dataset.sample(sample_rows, rng)
+        model.n_estimators += trees_per_round
+        model.fit(X, y)
+        print(f"🌲 Ronda {r + 1}/{n_rounds}: {model.n_estimators} árboles ({len(y)} filas)")
+
+    return model
+
+
+def main(provider=None):
+    use_provider(provider)
+    dataset = PooledDataset.build(use_panel=True)
+    print(f"Dataset conjunto: {len(dataset)} filas, {len(dataset.symbols)} símbolos")
+
+    model = train_pooled_model(dataset)
+
+    publish_model(model, dataset.feature_cols, POOLED_MODEL_PATH)
+    # Cada símbolo tiene su propia fecha de corte (no todos cotizan los mismos días)
+    save_training_cutoff(POOLED_MODEL_PATH, max(dataset.train_end.values()),
+                         train_end_by_symbol=dataset.train_end)
+    print(f"\n✅ Modelo conjunto guardado en: {POOLED_MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,11 @@
 Simula un portafolio con múltiples activos usando la estrategia de medias móviles.
 """
 
-import yfinance as yf
 import pandas as pd
 
+from market_data import get_cache, use_provider
+from panel_store import open_panel
+
 TICKERS = ["AAPL", "MSFT", "GOOGL", "AMZN"]
 PERIOD = "3y"
 INTERVAL = "1d"
@@ -15,7 +17,9 @@ INITIAL_CAPITAL = 10_000
 
 
 def download_data(tickers):
-    df = yf.download(tickers, period=PERIOD, interval=INTERVAL)["Close"]
+    """Cierres (fechas x símbolos) leídos del almacén memory-mapped float32."""
+    panel = open_panel(tickers, period=PERIOD, interval=INTERVAL)
+    df = panel.field_frame("Close", tickers, start=get_cache().period_start(PERIOD))
     return df.dropna()
 
 
@@ -56,7 +60,8 @@ def simulate_portfolio(df: pd.DataFrame):
     print(equity_total.tail())
 
 
-def main():
+def main(provider=None):
+    use_provider(provider)
     df = download_data(TICKERS)
     simulate_portfolio(df)
 
@@ -0,0 +1,146 @@
+# retraining.py
+"""
+Re-entrenamiento incremental dentro del proceso.
+
+En lugar de lanzar `python ml_model.py` (importar todo en frío, descargar
+5 años, recalcular features y re-entrenar desde cero):
+- las velas salen del caché (solo se descarga la cola nueva) y las features
+  del feature store (solo se calculan las filas nuevas);
+- en el día a día se agregan árboles entrenados con los datos recientes al
+  bosque publicado y se descartan los más viejos (ventana deslizante de árboles);
+- cada FULL_REFIT_DAYS se re-entrena completo sobre una ventana deslizante;
+- el resultado se publica de forma atómica en el registro de modelos, así los
+  bots y la API pasan a la versión nueva sin reiniciarse.
+"""
+
+import json
+import os
+import time
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_engineering import labeled_rows
+from market_data import get_cache
+from ml_model import (INTERVAL, MODEL_FEATURES, MODEL_PATH, PERIOD, SYMBOL, load_best_params, load_data,
+                      training_meta_path)
+from model_registry import get_registry, publish_model
+
+RETRAIN_WINDOW = 756        # filas del re-entrenamiento completo (~3 años diarios)
+RECENT_WINDOW = 252         # filas recientes con las que se entrenan los árboles nuevos
+FULL_REFIT_TREES = 200      # si la búsqueda de hiperparámetros no fijó n_estimators
+TREES_PER_UPDATE = 20
+MAX_TREES = 300             # al pasarse se descartan los árboles más viejos
+FULL_REFIT_DAYS = 7         # cada cuántos días se hace un re-entrenamiento completo
+RETRAIN_JOBS = max(1, (os.cpu_count() or 2) // 2)  # deja núcleos libres para los bots
+
+
+class IncrementalRetrainer:
+
+    def __init__(self, symbol: str = SYMBOL, model_path: str = MODEL_PATH, period: str = PERIOD,
+                 interval: str = INTERVAL, full_refit_days: float = FULL_REFIT_DAYS):
+        self.symbol = symbol
+        self.model_path = model_path
+        self.period = period
+        self.interval = interval
+        self.full_refit_days = full_refit_days
+
+    # ================================
+    # ESTADO DEL ENTRENAMIENTO
+    # ================================
+
+    @property
+    def meta_path(self) -> str:
+        return training_meta_path(self.model_path)
+
+    def _load_meta(self) -> dict:
+        if not os.path.exists(self.meta_path):
+            return {}
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _save_meta(self, meta: dict):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def _full_refit_due(self, meta: dict) -> bool:
+        if not meta or not os.path.exists(self.model_path):
+            return True
+        if meta.get("feature_cols") != MODEL_FEATURES:
+            return True
+        last_full = pd.Timestamp(meta["last_full_refit"])
+        return _now() - last_full >= pd.Timedelta(days=self.full_refit_days)
+
+    # ================================
+    # RE-ENTRENAMIENTO
+    # ================================
+
+    def retrain(self, full: bool = False) -> str:
+        """Re-entrena y publica; devuelve "full", "incremental" o "skipped"."""
+        start = time.perf_counter()
+        meta = self._load_meta()
+        df = load_data(self.symbol, self.period, self.interval)
+        if df.empty:
+            print(f"⚠️ Sin datos para re-entrenar {self.symbol}.")
+            return "skipped"
+
+        if full or self._full_refit_due(meta):
+            model, train_start = self._full_refit(df)
+            # train_start: la historia previa a la ventana queda como holdout (ver model_profiler)
+            meta = {"last_full_refit": _now().isoformat(), "updates": 0, "train_start": train_start.isoformat()}
+            mode = "full"
+        else:
+            new_rows = df[df.index > pd.Timestamp(meta["last_bar"])]
+            if new_rows.empty:
+                print("ℹ️ No hay velas nuevas: el modelo publicado sigue vigente.")
+                return "skipped"
+            meta["updates"] += 1
+            model = self._add_trees(df, seed=42 + meta["updates"])
+            mode = "incremental"
+
+        publish_model(model, MODEL_FEATURES, self.model_path)
+        meta.update({"last_bar": df.index[-1].isoformat(), "train_end": labeled_rows(df).index[-1].isoformat(),
+                     "feature_cols": MODEL_FEATURES, "n_trees": len(model.estimators_)})
+        self._save_meta(meta)
+
+        print(f"✅ Re-entrenamiento {mode} de {self.symbol}: {len(model.estimators_)} árboles "
+              f"en {time.perf_counter() - start:.1f}s")
+        return mode
+
+    def _full_refit(self, df: pd.DataFrame):
+        """(modelo, primera vela de su ventana de entrenamiento)."""
+        window = labeled_rows(df).iloc[-RETRAIN_WINDOW:]
+        params = {"n_estimators": FULL_REFIT_TREES, **load_best_params()}
+        model = RandomForestClassifier(random_state=42, n_jobs=RETRAIN_JOBS, **params)
+        model.fit(window[MODEL_FEATURES], window["target_up"])
+        return model, window.index[0]
+
+    def _add_trees(self, df: pd.DataFrame, seed: int) -> RandomForestClassifier:
+        """
+        Bosque nuevo = árboles publicados + TREES_PER_UPDATE árboles entrenados con
+        las filas recientes. No se modifica el modelo publicado (lo pueden estar
+        usando los bots): se comparte la lista de árboles, que no cambian tras el fit.
+        Los árboles nuevos usan los mismos hiperparámetros que el re-entrenamiento completo.
+        """
+        current, _ = get_registry().get(self.model_path)
+        window = labeled_rows(df).iloc[-RECENT_WINDOW:]
+
+        params = {k: v for k, v in load_best_params().items() if k != "n_estimators"}
+        model = RandomForestClassifier(n_estimators=len(current.estimators_) + TREES_PER_UPDATE,
+                                       warm_start=True, random_state=seed, n_jobs=RETRAIN_JOBS, **params)
+        model.estimators_ = list(current.estimators_)
+        model.fit(window[MODEL_FEATURES], window["target_up"])
+
+        # Ventana deslizante de árboles: fuera los más viejos
+        if len(model.estimators_) > MAX_TREES:
+            model.estimators_ = model.estimators_[-MAX_TREES:]
+            model.n_estimators = MAX_TREES
+        return model
+
+
+def _now() -> pd.Timestamp:
+    # Reloj del proveedor de datos (en modo replay, la hora simulada), sin zona horaria
+    now = pd.Timestamp(get_cache().provider.now())
+    return now.tz_localize(None) if now.tzinfo is not None else now
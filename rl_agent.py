@@ -1,13 +1,41 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
 import gymnasium as gym
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import SubprocVecEnv, VecEnv
+
+from market_data import get_bars, get_many_bars, use_provider
+
+RL_MODEL_PATH = "models/reinforcement_agent.pkl"
+RL_OBS_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+RL_INTERVAL = "1d"  # velas con las que se entrena (y con las que se debe inferir)
+
+# Entrenamiento multi-proceso
+RL_SYMBOLS = ["AAPL", "MSFT", "AMZN", "NVDA"]
+RL_PARALLEL_TIMESTEPS = 500_000
+RL_CHECKPOINT_DIR = "models/rl_checkpoints"
+RL_CHECKPOINT_EVERY = 50_000  # pasos entre checkpoints
 
 class TradingEnv(gym.Env):
+    """
+    Entorno de un símbolo. Las observaciones (una fila de df por paso) y los
+    precios se copian una sola vez a arreglos float32 contiguos: step y reset
+    solo indexan arreglos, sin pasar por pandas.
+    """
+
     def __init__(self, df):
         super().__init__()
         self.df = df
+        self.obs_matrix = np.ascontiguousarray(df.to_numpy(dtype=np.float32))
+        self.prices = np.ascontiguousarray(df["Close"].to_numpy(dtype=np.float32))
+        self.n_steps = len(df)
         self.current_step = 0
         self.cash = 10000
         self.shares = 0
@@ -20,7 +48,7 @@ class TradingEnv(gym.Env):
         )
 
     def step(self, action):
-        price = self.df["Close"].iloc[self.current_step]
+        price = float(self.prices[self.current_step])
 
         if action == 1 and self.cash >= price:
             self.shares += 1
@@ -30,32 +58,291 @@ class TradingEnv(gym.Env):
             self.cash += price
 
         self.current_step += 1
-        done = self.current_step >= len(self.df) - 1
+        done = self.current_step >= self.n_steps - 1
 
         portfolio_value = self.cash + self.shares * price
         reward = portfolio_value
 
-        obs = self.df.iloc[self.current_step].values
+        obs = self.obs_matrix[self.current_step]
 
         return obs, reward, done, False, {}
 
-    def reset(self, seed=None):
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
         self.current_step = 0
         self.cash = 10000
         self.shares = 0
-        return self.df.iloc[self.current_step].values, {}
+        return self.obs_matrix[self.current_step], {}
+
+
+class VecTradingEnv(VecEnv):
+    """
+    N episodios independientes (distintos símbolos o puntos de inicio) que
+    avanzan juntos con una sola operación NumPy por paso. Misma dinámica y
+    recompensa que TradingEnv, y compatible con stable-baselines3 (VecEnv).
+
+    - frames: lista de DataFrames con las mismas columnas, uno por entorno.
+    - window: si se indica, cada episodio es una ventana de `window` velas con
+      inicio al azar dentro de su DataFrame; si no, recorre el DataFrame completo.
+    Los episodios terminados se reinician solos (la última observación queda en
+    infos[i]["terminal_observation"], como en los VecEnv de stable-baselines3).
+
+    Cada entorno ("carril") tiene su propio generador aleatorio, así VecEnv.seed
+    y las semillas de reset se respetan por carril. Opción de reset por carril:
+    {"start": k} fija el inicio del episodio en la vela k de su DataFrame.
+    """
+
+    # Estado con una posición por carril (get_attr/set_attr/env_method por índice)
+    LANE_ATTRS = ("pos", "end", "cash", "shares", "actions", "offsets", "lengths")
+
+    def __init__(self, frames, window=None, initial_cash=10000, seed=None):
+        columns = list(frames[0].columns)
+        lengths = np.array([len(f) for f in frames], dtype=np.int64)
+        if window is not None and (lengths < window).any():
+            raise ValueError(f"❌ Todos los DataFrames deben tener al menos {window} velas.")
+
+        # Todos los símbolos en una sola matriz contigua; cada entorno apunta a su tramo
+        self.obs_matrix = np.ascontiguousarray(
+            np.concatenate([f[columns].to_numpy(dtype=np.float32) for f in frames]))
+        self.prices = np.ascontiguousarray(
+            np.concatenate([f["Close"].to_numpy(dtype=np.float32) for f in frames]))
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        self.lengths = lengths
+        self.window = window
+        self.initial_cash = initial_cash
+        self.rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(frames))]
+
+        observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(len(columns),), dtype=np.float32)
+        super().__init__(len(frames), observation_space, gym.spaces.Discrete(3))
+
+        n = self.num_envs
+        self.pos = np.zeros(n, dtype=np.int64)
+        self.end = np.zeros(n, dtype=np.int64)
+        self.cash = np.zeros(n, dtype=np.float64)
+        self.shares = np.zeros(n, dtype=np.int64)
+        self.actions = np.zeros(n, dtype=np.int64)
+
+    def _reset_envs(self, lanes):
+        if self.window is None:
+            start = self.offsets[lanes]
+            self.end[lanes] = start + self.lengths[lanes]
+        else:
+            draws = [self.rngs[i].integers(0, self.lengths[i] - self.window + 1) for i in lanes]
+            start = self.offsets[lanes] + np.asarray(draws, dtype=np.int64)
+            self.end[lanes] = start + self.window
+        self.pos[lanes] = start
+        self.cash[lanes] = self.initial_cash
+        self.shares[lanes] = 0
+
+    def _reset_lane(self, i, seed=None, options=None):
+        """Reinicia un solo carril, con la misma firma y retorno que TradingEnv.reset."""
+        if seed is not None:
+            self.rngs[i] = np.random.default_rng(seed)
+        self._reset_envs(np.array([i]))
+        start = (options or {}).get("start")
+        if start is not None:
+            # Con ventana el episodio dura `window` velas; sin ella, hasta el final (al menos un paso)
+            last_start = self.lengths[i] - (self.window or 2)
+            if not 0 <= start <= last_start:
+                raise ValueError(f"❌ Inicio {start} fuera de rango para el entorno {i}.")
+            self.pos[i] = self.offsets[i] + start
+            self.end[i] = self.pos[i] + (self.window or self.lengths[i] - start)
+        return self.obs_matrix[self.pos[i]], {}
+
+    def reset(self):
+        # Semillas (VecEnv.seed) y opciones (VecEnv.set_options) se aplican en este reset
+        for i in range(self.num_envs):
+            if self._seeds[i] is not None:
+                self.rngs[i] = np.random.default_rng(self._seeds[i])
+        self._reset_envs(np.arange(self.num_envs))
+        for i in range(self.num_envs):
+            if self._options[i]:
+                self._reset_lane(i, options=self._options[i])
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        self._reset_seeds()
+        self._reset_options()
+        return self.obs_matrix[self.pos]
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        price = self.prices[self.pos].astype(np.float64)
+
+        buy = (self.actions == 1) & (self.cash >= price)
+        sell = (self.actions == 2) & (self.shares > 0)
+        self.shares += buy
+        self.shares -= sell
+        self.cash -= price * buy
+        self.cash += price * sell
+
+        self.pos += 1
+        dones = self.pos >= self.end - 1
+        rewards = (self.cash + self.shares * price).astype(np.float32)
+        obs = self.obs_matrix[self.pos]
+
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = obs[i].copy()
+            self._reset_envs(np.flatnonzero(dones))
+            obs[dones] = self.obs_matrix[self.pos[dones]]
+
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        value = getattr(self, attr_name)
+        if attr_name in self.LANE_ATTRS:
+            return [value[i] for i in self._get_indices(indices)]
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        indices = list(self._get_indices(indices))
+        if attr_name in self.LANE_ATTRS:
+            getattr(self, attr_name)[indices] = value
+        elif len(set(indices)) == self.num_envs:
+            setattr(self, attr_name, value)
+        else:
+            raise ValueError(f"❌ '{attr_name}' es común a todos los entornos; no se puede cambiar en solo algunos.")
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # reset se aplica por carril; el resto de métodos son del entorno vectorizado
+        # y se llaman una vez por índice pedido, como en DummyVecEnv
+        if method_name == "reset":
+            return [self._reset_lane(i, *method_args, **method_kwargs) for i in self._get_indices(indices)]
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
 
-def train_rl_agent(symbol="AAPL"):
-    df = yf.download(symbol, period="5y", interval="1d")
-    df.dropna(inplace=True)
 
-    env = TradingEnv(df)
+def observation_frame(df):
+    """Columnas que ve el agente, en el orden del entrenamiento (también se usa en inferencia)."""
+    return df[RL_OBS_COLUMNS]
+
+
+def train_rl_agent(symbol="AAPL", provider=None):
+    use_provider(provider)
+    df = get_bars(symbol, period="5y", interval=RL_INTERVAL)
+
+    env = TradingEnv(observation_frame(df))
 
     model = PPO("MlpPolicy", env, verbose=1)
     model.learn(total_timesteps=20000)
 
-    model.save("models/reinforcement_agent.pkl")
+    model.save(RL_MODEL_PATH)
     print("🤖 Modelo RL guardado correctamente.")
 
+
+# ================================
+# ENTRENAMIENTO MULTI-PROCESO CON CHECKPOINTS
+# ================================
+
+def split_windows(df, n_windows):
+    """Divide el histórico en `n_windows` tramos consecutivos de fechas."""
+    size = len(df) // n_windows
+    return [df.iloc[i * size:(i + 1) * size if i < n_windows - 1 else len(df)] for i in range(n_windows)]
+
+
+def _make_env(frame):
+    # Se ejecuta dentro del proceso worker
+    return lambda: TradingEnv(frame)
+
+
+def save_checkpoint(model, checkpoint_dir=RL_CHECKPOINT_DIR):
+    """Guarda el modelo (pesos, optimizador y contador de pasos) de forma atómica."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    tmp = os.path.join(checkpoint_dir, "latest.tmp.zip")
+    model.save(tmp)
+    os.replace(tmp, os.path.join(checkpoint_dir, "latest.zip"))
+    progress = os.path.join(checkpoint_dir, "progress.json")
+    with open(progress + ".tmp", "w") as f:
+        json.dump({"num_timesteps": int(model.num_timesteps), "saved_at": datetime.now().isoformat()}, f)
+    os.replace(progress + ".tmp", progress)
+
+
+class TrainingMonitor(BaseCallback):
+    """Registra pasos/segundo y duración de cada actualización y guarda checkpoints periódicos."""
+
+    def __init__(self, checkpoint_dir=RL_CHECKPOINT_DIR, checkpoint_every=RL_CHECKPOINT_EVERY):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+
+    def _on_training_start(self):
+        self._started = self._last = time.perf_counter()
+        self._last_steps = self._last_checkpoint = self.num_timesteps
+        self._updates = 0
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        # Entre dos rollouts: recolección (en paralelo) + actualización del anterior
+        now = time.perf_counter()
+        steps = self.num_timesteps - self._last_steps
+        elapsed = now - self._last
+        self._updates += 1
+        print(f"🔁 Actualización {self._updates}: {steps / elapsed:,.0f} pasos/s, "
+              f"{elapsed:.2f}s | total {self.num_timesteps} pasos en {now - self._started:.0f}s")
+        self._last, self._last_steps = now, self.num_timesteps
+
+        if self.num_timesteps - self._last_checkpoint >= self.checkpoint_every:
+            save_checkpoint(self.model, self.checkpoint_dir)
+            self._last_checkpoint = self.num_timesteps
+            print(f"💾 Checkpoint en {self.num_timesteps} pasos")
+
+    def _on_training_end(self):
+        save_checkpoint(self.model, self.checkpoint_dir)
+
+
+def train_rl_agent_parallel(symbols=RL_SYMBOLS, n_windows=4, total_timesteps=RL_PARALLEL_TIMESTEPS,
+                            checkpoint_dir=RL_CHECKPOINT_DIR, checkpoint_every=RL_CHECKPOINT_EVERY,
+                            resume=True, provider=None):
+    """
+    PPO con un entorno por (símbolo, tramo de fechas), cada uno en su propio
+    proceso (SubprocVecEnv). Si hay un checkpoint en checkpoint_dir y resume=True,
+    se continúa desde ahí hasta completar total_timesteps.
+    """
+    use_provider(provider)
+    universe = get_many_bars(symbols, period="5y", interval=RL_INTERVAL)
+
+    frames = []
+    for symbol in symbols:
+        if universe[symbol].empty:
+            print(f"⚠️ Sin datos para {symbol}, se omite.")
+            continue
+        frames += split_windows(observation_frame(universe[symbol]), n_windows)
+
+    env = SubprocVecEnv([_make_env(frame) for frame in frames])
+    print(f"🧵 {len(frames)} entornos en procesos separados ({len(symbols)} símbolos × {n_windows} tramos)")
+
+    latest = os.path.join(checkpoint_dir, "latest.zip")
+    try:
+        if resume and os.path.exists(latest):
+            model = PPO.load(latest, env=env)
+            print(f"↩️ Reanudando desde {latest} ({model.num_timesteps} pasos)")
+        else:
+            model = PPO("MlpPolicy", env, verbose=0)
+
+        remaining = total_timesteps - model.num_timesteps
+        if remaining > 0:
+            model.learn(total_timesteps=remaining, reset_num_timesteps=False,
+                        callback=TrainingMonitor(checkpoint_dir, checkpoint_every))
+    finally:
+        env.close()
+
+    model.save(RL_MODEL_PATH)
+    print(f"🤖 Modelo RL guardado correctamente ({model.num_timesteps} pasos).")
+    return model
+
+
 if __name__ == "__main__":
-    train_rl_agent()
+    if len(sys.argv) > 1 and sys.argv[1] == "parallel":
+        train_rl_agent_parallel()
+    else:
+        train_rl_agent()
@@ -0,0 +1,115 @@
+# rl_evaluation.py
+"""
+Evaluación por lotes de la política RL.
+
+Reproduce la política sobre cientos de episodios (símbolo, ventana de fechas)
+a la vez con VecTradingEnv: en cada paso se hace UN forward pass con las
+observaciones de todos los episodios. Por episodio se guarda la curva de
+equity y se calculan retorno, Sharpe y drawdown con backtesting/metrics.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtesting.metrics import max_drawdown, sharpe_ratio
+from market_data import get_many_bars, use_provider
+from rl_agent import RL_INTERVAL, RL_MODEL_PATH, RL_SYMBOLS, VecTradingEnv, observation_frame
+from rl_inference import RLPolicyService
+
+EVAL_WINDOW = 252   # velas por episodio (~1 año)
+EVAL_STRIDE = 63    # separación entre inicios de ventana (~1 trimestre)
+EVAL_RESULTS = "models/rl_evaluation.csv"
+INITIAL_CASH = 10000
+
+
+def episode_windows(df, window=EVAL_WINDOW, stride=EVAL_STRIDE):
+    """Ventanas de `window` velas que empiezan cada `stride` velas."""
+    return [df.iloc[start:start + window] for start in range(0, len(df) - window + 1, stride)]
+
+
+def run_episodes(model, frames, deterministic=True):
+    """
+    Ejecuta un episodio por DataFrame, todos en paralelo.
+    Devuelve la matriz de equity (pasos + 1, episodios); NaN después del final de cada episodio.
+    """
+    env = VecTradingEnv(frames, initial_cash=INITIAL_CASH)
+    lengths = np.array([len(f) for f in frames])
+    n_steps = int(lengths.max()) - 1
+
+    equity = np.full((n_steps + 1, len(frames)), np.nan)
+    equity[0] = INITIAL_CASH
+    running = np.ones(len(frames), dtype=bool)
+
+    obs = env.reset()
+    for t in range(n_steps):
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        obs, values, dones, _ = env.step(actions)
+        equity[t + 1, running] = values[running]
+        # Al terminar, el entorno se reinicia solo: ese episodio deja de registrarse
+        running &= ~dones
+        if not running.any():
+            break
+
+    return equity
+
+
+def evaluate_policy(symbols=RL_SYMBOLS, period="5y", window=EVAL_WINDOW, stride=EVAL_STRIDE,
+                    model_path=RL_MODEL_PATH, provider=None, results_path=EVAL_RESULTS):
+    """
+    Evalúa la política sobre todas las ventanas de todos los símbolos.
+    Devuelve (métricas por episodio, curvas de equity).
+    """
+    use_provider(provider)
+    model = RLPolicyService(model_path).model
+    universe = get_many_bars(list(symbols), period=period, interval=RL_INTERVAL)
+
+    frames, episodes = [], []
+    for symbol in symbols:
+        df = universe[symbol]
+        if df.empty:
+            print(f"⚠️ Sin datos para {symbol}, se omite.")
+            continue
+        for frame in episode_windows(observation_frame(df), window, stride):
+            frames.append(frame)
+            episodes.append({"symbol": symbol, "start": frame.index[0], "end": frame.index[-1]})
+    if not frames:
+        raise ValueError("❌ No hay episodios para evaluar.")
+
+    start = time.perf_counter()
+    equity = run_episodes(model, frames)
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for i, episode in enumerate(episodes):
+        curve = equity[:, i][~np.isnan(equity[:, i])]
+        returns = np.diff(curve) / curve[:-1]
+        rows.append({
+            **episode,
+            "total_return": curve[-1] / curve[0] - 1,
+            "sharpe": sharpe_ratio(returns),
+            "max_drawdown": max_drawdown(curve),
+        })
+    results = pd.DataFrame(rows)
+
+    total_steps = int((~np.isnan(equity[1:])).sum())
+    print(f"\n=== Evaluación RL: {len(frames)} episodios ({len(symbols)} símbolos) ===")
+    print(results.groupby("symbol")[["total_return", "sharpe", "max_drawdown"]].mean().round(4))
+    print(f"\nRetorno medio: {results['total_return'].mean():.2%} | Sharpe medio: {results['sharpe'].mean():.2f} | "
+          f"Drawdown medio: {results['max_drawdown'].mean():.2%}")
+    print(f"⚡ {total_steps:,} pasos en {elapsed:.2f}s ({total_steps / elapsed:,.0f} pasos/s, "
+          f"{len(frames)} episodios por forward pass)")
+
+    if results_path:
+        os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+        results.to_csv(results_path, index=False)
+        np.save(os.path.splitext(results_path)[0] + "_equity.npy", equity)
+        print(f"✅ Resultados guardados en: {results_path}")
+    return results, equity
+
+
+if __name__ == "__main__":
+    evaluate_policy(sys.argv[1:] or RL_SYMBOLS)
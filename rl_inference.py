@@ -0,0 +1,72 @@
+# rl_inference.py
+"""
+Servicio de inferencia del agente RL.
+
+- La política PPO se carga una sola vez (y se recarga solo si se guarda una nueva).
+- Las observaciones se arman con rl_agent.observation_frame sobre las mismas
+  velas (intervalo RL_INTERVAL, desde el caché) que se usaron para entrenar.
+- Todo el universo se evalúa en un único forward pass: una fila por símbolo.
+"""
+
+import os
+
+import numpy as np
+from stable_baselines3 import PPO
+
+from market_data import get_many_bars
+from rl_agent import RL_INTERVAL, RL_MODEL_PATH, observation_frame
+
+ACTIONS = {0: "HOLD", 1: "BUY", 2: "SELL"}
+RL_INFERENCE_PERIOD = "1mo"  # la observación solo usa la última vela
+
+
+class RLPolicyService:
+
+    def __init__(self, model_path: str = RL_MODEL_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._version = None
+
+    @property
+    def model(self) -> PPO:
+        version = os.stat(self.model_path).st_mtime_ns
+        if self._model is None or version != self._version:
+            self._model = PPO.load(self.model_path, device="cpu")
+            self._version = version
+            print(f"🤖 Política RL cargada: {self.model_path}")
+        return self._model
+
+    def observations(self, frames: dict):
+        """(símbolos, matriz float32 símbolos x features) con la última vela de cada símbolo."""
+        symbols, rows = [], []
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+            row = observation_frame(df).iloc[-1].to_numpy(dtype=np.float32)
+            if np.isnan(row).any():
+                continue
+            symbols.append(symbol)
+            rows.append(row)
+        return symbols, np.array(rows, dtype=np.float32).reshape(len(rows), -1)
+
+    def predict(self, frames: dict, deterministic: bool = True) -> dict:
+        """Acción {símbolo: "HOLD" | "BUY" | "SELL"} para todo el universo en un solo forward pass."""
+        symbols, obs = self.observations(frames)
+        if not symbols:
+            return {}
+        actions, _ = self.model.predict(obs, deterministic=deterministic)
+        return {symbol: ACTIONS[int(a)] for symbol, a in zip(symbols, actions)}
+
+    def predict_symbols(self, symbols, period: str = RL_INFERENCE_PERIOD) -> dict:
+        """Igual que predict, leyendo las velas del caché (solo se descarga la cola nueva)."""
+        return self.predict(get_many_bars(list(symbols), period=period, interval=RL_INTERVAL))
+
+
+_default_service = None
+
+
+def get_rl_service() -> RLPolicyService:
+    global _default_service
+    if _default_service is None:
+        _default_service = RLPolicyService()
+    return _default_service
@@ -1,6 +1,7 @@
-import yfinance as yf
 import pandas as pd
 
+from market_data import get_bars, use_provider
+
 # 1. CONFIGURACIÓN BÁSICA
 SYMBOL = "AAPL"   # Puedes cambiarlo a "BTC-USD", "MSFT", etc.
 PERIOD = "6mo"    # 6 meses de datos
@@ -11,16 +12,8 @@ LONG_WINDOW = 50   # media móvil lenta
 
 
 def get_data(symbol: str, period: str, interval: str) -> pd.DataFrame:
-    """Descarga datos históricos usando yfinance y normaliza columnas."""
-    data = yf.download(symbol, period=period, interval=interval)
-
-    # Normalizar columnas si vienen en MultiIndex, como ('Close', 'AAPL')
-    if isinstance(data.columns, pd.MultiIndex):
-        data.columns = [c[0] for c in data.columns]
-    else:
-        data.columns = [str(c) for c in data.columns]
-
-    return data.dropna()
+    """Obtiene datos históricos (caché local + yfinance) con columnas normalizadas."""
+    return get_bars(symbol, period=period, interval=interval)
 
 
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
@@ -53,7 +46,8 @@ def generate_signal(row) -> str:
         return "HOLD"
 
 
-def main():
+def main(provider=None):
+    use_provider(provider)
     print(f"Descargando datos de {SYMBOL}...")
     df = get_data(SYMBOL, PERIOD, INTERVAL)
 
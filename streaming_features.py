@@ -0,0 +1,307 @@
+# streaming_features.py
+"""
+Motor de indicadores incremental para bots en vivo.
+
+Mantiene el estado de cada indicador (acumuladores EMA, ventanas deslizantes
+con suma y suma de cuadrados, OBV acumulado) y actualiza todas las features
+en tiempo constante por cada vela nueva, en lugar de recalcular el año
+completo con add_basic_features en cada iteración.
+
+Los valores coinciden (salvo redondeo de punto flotante) con los de
+feature_engineering.add_basic_features.
+"""
+
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float("nan")
+
+
+class RollingWindow:
+    """Ventana deslizante con suma y suma de cuadrados: media y desviación en O(1)."""
+
+    __slots__ = ("window", "values", "total", "total_sq", "shift")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.shift = None  # se resta el primer valor para no perder precisión en la varianza
+
+    def push(self, x: float):
+        if self.shift is None:
+            self.shift = x
+        x -= self.shift
+
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def mean(self) -> float:
+        if not self.full:
+            return NAN
+        return self.total / self.window + self.shift
+
+    def std(self) -> float:
+        """Desviación estándar muestral (ddof=1), como pandas.rolling().std()."""
+        if not self.full:
+            return NAN
+        n = self.window
+        var = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class EMA:
+    """Media móvil exponencial equivalente a ewm(span, adjust=False)."""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def push(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class StreamingFeatures:
+    """
+    Estado incremental de las features de add_basic_features para UN símbolo.
+
+    Uso típico en un bot:
+        engine = StreamingFeatures.from_history(df)   # calentamiento O(n), una vez
+        ...
+        engine.sync(df)                               # en cada vuelta: solo velas nuevas
+        X = engine.latest(feature_cols)
+    """
+
+    RSI_PERIOD = 14
+    BB_WINDOW = 20
+    ATR_PERIOD = 14
+    MOMENTUM_PERIOD = 10
+    ROC_PERIOD = 10
+    VOLATILITY_WINDOW = 5
+
+    def __init__(self):
+        self.n_bars = 0
+        self.last_index = None
+        self.features = {}
+
+        self._prev_close = None
+        self._prev_return = NAN
+        self._closes = deque(maxlen=max(self.MOMENTUM_PERIOD, self.ROC_PERIOD) + 1)
+
+        self._returns = RollingWindow(self.VOLATILITY_WINDOW)
+        self._gains = RollingWindow(self.RSI_PERIOD)
+        self._losses = RollingWindow(self.RSI_PERIOD)
+        self._bb = RollingWindow(self.BB_WINDOW)
+        self._tr = RollingWindow(self.ATR_PERIOD)
+
+        self._ema12 = EMA(12)
+        self._ema26 = EMA(26)
+        self._macd_signal = EMA(9)
+        self._ema20 = EMA(20)
+        self._ema50 = EMA(50)
+
+        self._obv = 0.0
+        self._snapshot = None
+
+    # ================================
+    # ACTUALIZACIÓN POR VELA
+    # ================================
+
+    def update(self, bar, index=None) -> dict:
+        """Incorpora una vela (dict/Series con Open, High, Low, Close, Volume) en O(1)."""
+        close = float(bar["Close"])
+        high = float(bar["High"])
+        low = float(bar["Low"])
+        volume = float(bar["Volume"])
+        prev_close = self._prev_close
+
+        f = {
+            "Open": float(bar["Open"]),
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": volume,
+        }
+
+        # Cambios de precio
+        if prev_close is None:
+            ret = NAN
+            delta = NAN
+        else:
+            ret = close / prev_close - 1.0
+            delta = close - prev_close
+            self._returns.push(ret)
+
+        f["return_1d"] = ret
+        f["volatility_5"] = self._returns.std()
+        f["lag_return_1"] = self._prev_return
+
+        # RSI (medias simples de ganancias/pérdidas, como add_rsi)
+        self._gains.push(delta if delta > 0 else 0.0)
+        self._losses.push(-delta if delta < 0 else 0.0)
+        gain = self._gains.mean()
+        loss = self._losses.mean()
+        if math.isnan(gain) or (gain == 0 and loss == 0):
+            f["RSI"] = NAN
+        elif loss == 0:
+            f["RSI"] = 100.0
+        else:
+            f["RSI"] = 100 - (100 / (1 + gain / loss))
+
+        # MACD
+        ema12 = self._ema12.push(close)
+        ema26 = self._ema26.push(close)
+        macd = ema12 - ema26
+        macd_signal = self._macd_signal.push(macd)
+        f["EMA12"] = ema12
+        f["EMA26"] = ema26
+        f["MACD"] = macd
+        f["MACD_signal"] = macd_signal
+        f["MACD_hist"] = macd - macd_signal
+
+        # EMA 20/50
+        f["EMA20"] = self._ema20.push(close)
+        f["EMA50"] = self._ema50.push(close)
+
+        # Bollinger
+        self._bb.push(close)
+        bb_middle = self._bb.mean()
+        bb_std = self._bb.std()
+        f["BB_middle"] = bb_middle
+        f["BB_std"] = bb_std
+        f["BB_upper"] = bb_middle + 2 * bb_std
+        f["BB_lower"] = bb_middle - 2 * bb_std
+
+        # ATR
+        f["H-L"] = high - low
+        if prev_close is None:
+            f["H-C"] = NAN
+            f["L-C"] = NAN
+            tr = f["H-L"]
+        else:
+            f["H-C"] = abs(high - prev_close)
+            f["L-C"] = abs(low - prev_close)
+            tr = max(f["H-L"], f["H-C"], f["L-C"])
+        f["TR"] = tr
+        self._tr.push(tr)
+        f["ATR"] = self._tr.mean()
+
+        # Momentum y ROC
+        self._closes.append(close)
+        f["Momentum"] = self._lagged_diff(self.MOMENTUM_PERIOD, close, ratio=False)
+        f["ROC"] = self._lagged_diff(self.ROC_PERIOD, close, ratio=True)
+
+        # OBV
+        if prev_close is not None:
+            self._obv += np.sign(delta) * volume
+        f["OBV"] = self._obv
+
+        self._prev_close = close
+        self._prev_return = ret
+        self.n_bars += 1
+        self.last_index = index
+        self.features = f
+        return f
+
+    def _lagged_diff(self, period: int, close: float, ratio: bool) -> float:
+        if len(self._closes) <= period:
+            return NAN
+        past = self._closes[-period - 1]
+        return close / past - 1.0 if ratio else close - past
+
+    # ================================
+    # SINCRONIZACIÓN CON UN DATAFRAME
+    # ================================
+
+    def _save_snapshot(self):
+        state = dict(self.__dict__)
+        state["_snapshot"] = None
+        self._snapshot = copy.deepcopy(state)
+
+    def _restore_snapshot(self):
+        snapshot = self._snapshot
+        self.__dict__.update(copy.deepcopy(snapshot))
+        self._snapshot = snapshot
+
+    def sync(self, df: pd.DataFrame) -> dict:
+        """
+        Aplica solo las velas de df posteriores a la última procesada.
+        Si la última vela ya vista cambió (vela del día aún abierta), se
+        deshace y se vuelve a aplicar con los valores nuevos.
+        """
+        if df.empty:
+            return self.features
+
+        start = 0
+        reopened = False
+        if self.last_index is not None:
+            pos = df.index.searchsorted(self.last_index)
+            if pos < len(df) and df.index[pos] == self.last_index:
+                if self._snapshot is not None and not _same_bar(df.iloc[pos], self.features):
+                    self._restore_snapshot()
+                    start = pos
+                    reopened = True
+                else:
+                    start = pos + 1
+            else:
+                start = pos
+
+        rows = df.iloc[start:]
+        for i, (index, bar) in enumerate(zip(rows.index, rows.to_dict("records"))):
+            # Solo se guarda el estado cuando empieza una vela nueva (la anterior ya cerró);
+            # si se está re-aplicando la misma vela abierta, el snapshot previo sigue valiendo
+            if i == len(rows) - 1 and not (reopened and i == 0):
+                self._save_snapshot()
+            self.update(bar, index)
+
+        return self.features
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> "StreamingFeatures":
+        """Crea el motor y lo calienta con la historia disponible (O(n), una sola vez)."""
+        engine = cls()
+        engine.sync(df)
+        return engine
+
+    # ================================
+    # CONSULTA
+    # ================================
+
+    @property
+    def ready(self) -> bool:
+        """True cuando todas las features están definidas (fila que add_basic_features no descartaría)."""
+        return bool(self.features) and not any(math.isnan(v) for v in self.features.values())
+
+    def ready_for(self, feature_cols) -> bool:
+        """True si las features pedidas están definidas en la última vela (calentamiento completo, sin NaN)."""
+        return bool(self.features) and all(not math.isnan(self.features.get(c, NAN)) for c in feature_cols)
+
+    def latest(self, feature_cols) -> pd.DataFrame:
+        """Fila 1 x k con las features que espera el modelo (mismo formato que last_row[feature_cols])."""
+        return pd.DataFrame([[self.features[c] for c in feature_cols]], columns=list(feature_cols),
+                            index=[self.last_index])
+
+
+def _same_bar(row: pd.Series, features: dict) -> bool:
+    return all(float(row[c]) == features.get(c) for c in ("Open", "High", "Low", "Close", "Volume"))
@@ -0,0 +1,52 @@
+# tests/conftest.py
+"""
+Fixtures comunes: velas sintéticas en disco y un caché aislado por test.
+
+Los módulos del proyecto están en la raíz del repositorio (sin paquete), así
+que se agrega al sys.path. Cada test corre en su propio directorio temporal y
+con los singletons (caché, feature store, temporalidades, modelos) vacíos, para que
+ningún archivo de data/ del proyecto ni de otro test se reutilice.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feature_store  # noqa: E402
+import market_data  # noqa: E402
+import model_registry  # noqa: E402
+import timeframes  # noqa: E402
+from market_data import LocalFileProvider, generate_synthetic_bars  # noqa: E402
+
+SYNTHETIC_END = "2024-06-28"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Directorio temporal como directorio de trabajo, con los singletons reiniciados."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(market_data, "_default_cache", None)
+    monkeypatch.setattr(feature_store, "_default_store", None)
+    monkeypatch.setattr(timeframes, "_default_timeframes", None)
+    monkeypatch.setattr(model_registry, "_default_registry", None)
+    return tmp_path
+
+
+@pytest.fixture
+def daily_bars(workdir) -> pd.DataFrame:
+    """400 velas diarias sintéticas de AAA, servidas por el caché compartido."""
+    frames = generate_synthetic_bars(["AAA"], n_bars=400, root="hist", end=SYNTHETIC_END)
+    market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+    return frames["AAA"]
+
+
+@pytest.fixture
+def hourly_bars(workdir) -> pd.DataFrame:
+    """~6 semanas de velas horarias sintéticas de AAA."""
+    frames = generate_synthetic_bars(["AAA"], n_bars=1000, interval="1h", root="hist", end=SYNTHETIC_END)
+    market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+    return frames["AAA"]
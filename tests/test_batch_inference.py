@@ -0,0 +1,54 @@
+# tests/test_batch_inference.py
+"""Inferencia por lotes: mismas probabilidades que fila a fila, sin avisos y con resultados parciales."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import market_data
+from batch_inference import predict_universe
+from feature_engineering import add_target_direction, compute_features
+from market_data import LocalFileProvider, generate_synthetic_bars
+from ml_model import MODEL_FEATURES, model_path
+from model_registry import publish_model
+
+from conftest import SYNTHETIC_END
+
+
+@pytest.fixture
+def frames(workdir) -> dict:
+    frames = generate_synthetic_bars(["AAA", "BBB", "CCC"], n_bars=300, root="hist", end=SYNTHETIC_END)
+    market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+    return frames
+
+
+def fitted_model(bars: pd.DataFrame) -> RandomForestClassifier:
+    df = add_target_direction(bars.join(compute_features(bars, MODEL_FEATURES), how="inner"))
+    return RandomForestClassifier(n_estimators=5, random_state=0).fit(df[MODEL_FEATURES], df["target_up"])
+
+
+def test_matches_row_by_row_without_feature_name_warnings(frames):
+    model = fitted_model(frames["AAA"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        probs = predict_universe(frames, model, MODEL_FEATURES)
+
+    assert set(probs) == set(frames)
+    for symbol, bars in frames.items():
+        row = compute_features(bars, MODEL_FEATURES).iloc[[-1]]
+        assert probs[symbol] == pytest.approx(model.predict_proba(row)[0, 1])
+
+
+def test_missing_model_and_bad_data_give_partial_results(frames):
+    # Solo AAA y CCC tienen modelo propio; BBB no tiene ninguno
+    for symbol in ("AAA", "CCC"):
+        publish_model(fitted_model(frames[symbol]), MODEL_FEATURES, model_path(symbol))
+    frames = dict(frames, CCC=frames["CCC"].drop(columns="Close"))
+
+    probs = predict_universe(frames)
+    assert list(probs) == ["AAA"]
+    assert 0.0 <= probs["AAA"] <= 1.0
+    assert np.isfinite(probs["AAA"])
@@ -0,0 +1,49 @@
+# tests/test_compact_forest.py
+"""Bosque compacto: mismas probabilidades que sklearn, también después de guardarlo y cargarlo."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from compact_forest import CompactForest, benchmark
+
+FEATURE_COLS = ["f0", "f1", "f2", "f3"]
+
+
+def data(n_classes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(600, len(FEATURE_COLS)))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    if n_classes == 3:
+        y += (X[:, 1] > 0.5).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("params", [
+    {"n_estimators": 25},
+    {"n_estimators": 10, "max_depth": 3},
+    {"n_estimators": 15, "min_samples_leaf": 20, "class_weight": "balanced"},
+])
+def test_matches_sklearn(n_classes, params):
+    X, y = data(n_classes)
+    model = RandomForestClassifier(random_state=0, **params).fit(X[:400], y[:400])
+    forest = CompactForest.from_sklearn(model, FEATURE_COLS)
+
+    X_new = X[400:]
+    np.testing.assert_allclose(forest.predict_proba(X_new), model.predict_proba(X_new), rtol=1e-12, atol=1e-15)
+    np.testing.assert_array_equal(forest.predict(X_new), model.predict(X_new))
+    # Una sola fila, como en los bots y la API
+    np.testing.assert_allclose(forest.predict_proba(X_new[:1]), model.predict_proba(X_new[:1]), rtol=1e-12)
+
+
+def test_save_and_load(tmp_path):
+    X, y = data(2)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    path = str(tmp_path / "forest.npz")
+    CompactForest.from_sklearn(model, FEATURE_COLS).save(path)
+
+    loaded = CompactForest.load(path)
+    assert loaded.feature_cols == FEATURE_COLS
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), rtol=1e-12, atol=1e-15)
+    assert benchmark(model, loaded, X, repeats=5)["max_abs_diff"] < 1e-12
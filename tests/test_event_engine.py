@@ -0,0 +1,48 @@
+# tests/test_event_engine.py
+"""Backtest por eventos: cada carril llena igual que SimulatedBroker orden a orden."""
+
+import numpy as np
+import pytest
+
+from backtesting.event_engine import DEFAULT_COSTS, EventBacktester, sma_targets
+from broker_client import NO_COSTS, CostModel, SimulatedBroker
+
+PCT_COSTS = CostModel(commission_pct=0.001, min_commission=2.0, slippage_bps=10)
+
+
+def replay_with_broker(close, opens, targets, costs, initial_cash, allocation):
+    """Misma regla long/flat que EventBacktester (delay=1), ejecutada con el broker simulado."""
+    broker = SimulatedBroker(cash=initial_cash, costs=costs)
+    equity, position = [], []
+    for t in range(len(close)):
+        want = t > 0 and targets[t - 1] > 0
+        held = broker.positions.get("AAA")
+        if want and held is None:
+            broker.buy("AAA", float(costs.affordable_qty(broker.cash * allocation, opens[t])), opens[t])
+        elif not want and held is not None:
+            broker.sell("AAA", held.qty, opens[t])
+
+        qty = broker.positions["AAA"].qty if "AAA" in broker.positions else 0.0
+        position.append(qty)
+        equity.append(broker.cash + qty * close[t])
+    return np.array(equity), np.array(position), broker.cash
+
+
+@pytest.mark.parametrize("costs", [DEFAULT_COSTS, NO_COSTS, PCT_COSTS])
+@pytest.mark.parametrize("allocation", [1.0, 0.5])
+def test_lanes_match_simulated_broker(daily_bars, costs, allocation):
+    close = daily_bars["Close"].to_numpy()
+    opens = daily_bars["Open"].to_numpy()
+    params = [(5, 20), (10, 50), (20, 100)]
+    targets = np.column_stack([sma_targets(close, s, l)[:, 0] for s, l in params])
+
+    engine = EventBacktester(costs=costs, initial_cash=10_000.0, allocation=allocation)
+    lanes = np.column_stack([close] * len(params))
+    result = engine.run(lanes, targets, np.column_stack([opens] * len(params)))
+
+    assert result.trades.sum() > 0
+    for lane in range(len(params)):
+        equity, position, cash = replay_with_broker(close, opens, targets[:, lane], costs, 10_000.0, allocation)
+        np.testing.assert_allclose(result.position[:, lane], position, rtol=1e-12)
+        np.testing.assert_allclose(result.equity[:, lane], equity, rtol=1e-9)
+        assert result.cash[lane] == pytest.approx(cash, rel=1e-12)
@@ -0,0 +1,77 @@
+# tests/test_feature_store.py
+"""Feature store: reutilizar filas guardadas da lo mismo que recalcular, nunca mezcla fuentes y la historia re-ajustada reemplaza a la vieja."""
+
+import pandas as pd
+
+import feature_store
+
+from feature_engineering import compute_features
+from feature_store import SOURCE_COLUMN, FeatureStore, feature_version
+
+FEATURE_COLS = ["return_1d", "volatility_5", "lag_return_1", "BB_upper", "ATR", "ROC"]
+
+
+def assert_features_equal(left, right):
+    pd.testing.assert_frame_equal(left, right, check_freq=False, rtol=1e-9)
+
+
+def stored_history(store: FeatureStore) -> pd.DataFrame:
+    return pd.read_parquet(store.path("AAA", "1d", feature_version(FEATURE_COLS)))
+
+
+def test_new_bars_reuse_stored_rows(daily_bars, tmp_path):
+    store = FeatureStore(root=str(tmp_path / "features"))
+    store.get("AAA", daily_bars.iloc[:300], FEATURE_COLS)
+
+    bars = daily_bars.iloc[:350]
+    assert_features_equal(store.get("AAA", bars, FEATURE_COLS), compute_features(bars, FEATURE_COLS))
+    assert len(stored_history(store)) == 350
+
+    # Vela abierta que cambia: solo se recalcula la cola
+    open_bar = bars.copy()
+    open_bar.iloc[-1, open_bar.columns.get_loc("Close")] *= 1.02
+    assert_features_equal(store.get("AAA", open_bar, FEATURE_COLS), compute_features(open_bar, FEATURE_COLS))
+
+
+def test_historical_window_matches_recompute(daily_bars, tmp_path):
+    store = FeatureStore(root=str(tmp_path / "features"))
+    store.get("AAA", daily_bars, FEATURE_COLS)
+
+    window = daily_bars.iloc[100:200]
+    expected = compute_features(window, FEATURE_COLS)
+    got = store.get("AAA", window, FEATURE_COLS)
+    # El store conoce la historia previa: también tiene las filas de calentamiento de la ventana
+    assert got.index[0] == window.index[0]
+    assert_features_equal(got.loc[expected.index], expected)
+
+
+def test_shorter_window_of_same_source_keeps_history(daily_bars, tmp_path):
+    store = FeatureStore(root=str(tmp_path / "features"))
+    store.get("AAA", daily_bars.iloc[100:350], FEATURE_COLS)
+
+    # Empieza antes pero termina antes: se recalcula sin encoger la historia guardada
+    bars = daily_bars.iloc[:200]
+    assert_features_equal(store.get("AAA", bars, FEATURE_COLS), compute_features(bars, FEATURE_COLS))
+    history = stored_history(store)
+    assert (history.index[0], history.index[-1]) == (daily_bars.index[100], daily_bars.index[349])
+
+
+def test_readjusted_history_with_later_start_is_persisted_and_reused(daily_bars, tmp_path, monkeypatch):
+    store = FeatureStore(root=str(tmp_path / "features"))
+    store.get("AAA", daily_bars.iloc[:350], FEATURE_COLS)
+
+    # Historia re-ajustada (p. ej. un split) pedida con period="5y": empieza más tarde
+    adjusted = daily_bars.iloc[50:].copy()
+    adjusted[["Open", "High", "Low", "Close"]] *= 0.5
+    assert_features_equal(store.get("AAA", adjusted, FEATURE_COLS), compute_features(adjusted, FEATURE_COLS))
+
+    history = stored_history(store)
+    assert history.index.equals(adjusted.index)
+    assert (history[SOURCE_COLUMN].to_numpy() == adjusted["Close"].to_numpy()).all()
+
+    # Las filas re-ajustadas se reutilizan desde disco sin recalcular
+    monkeypatch.setattr(feature_store, "compute_features", None)
+    fresh = FeatureStore(root=store.root)
+    window = adjusted.iloc[100:200]
+    got = fresh.get("AAA", window, FEATURE_COLS)
+    assert_features_equal(got, history.drop(columns=SOURCE_COLUMN).loc[window.index].dropna())
@@ -0,0 +1,114 @@
+# tests/test_grid_search.py
+"""Grid search del universo: mismas tablas que sweep_sma, reanudación por huella de cierres y sin fugas de memoria compartida."""
+
+import os
+import subprocess
+import sys
+import textwrap
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import grid_search as grid_search_module
+import market_data
+from grid_search import _attach_shared_memory, _result_path, grid_search
+from market_data import ReplayProvider, generate_synthetic_bars
+from optimizer import sweep_sma
+
+from conftest import SYNTHETIC_END
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+GRID = {"short_windows": range(2, 20, 3), "long_windows": range(20, 60, 7)}
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def replay(workdir):
+    generate_synthetic_bars(SYMBOLS, n_bars=300, root="hist", end=SYNTHETIC_END)
+    provider = ReplayProvider("hist", warmup=250)
+    market_data.configure(provider, cache_dir="cache")
+    return provider
+
+
+def run(**kwargs) -> pd.DataFrame:
+    return grid_search(SYMBOLS, **GRID, max_workers=2, results_dir="grid", **kwargs)
+
+
+def test_tables_match_sweep_sma(replay):
+    summary = run()
+    assert sorted(summary.index) == SYMBOLS
+
+    for symbol in SYMBOLS:
+        # El panel guarda los precios en float32
+        close = market_data.get_bars(symbol)["Close"].to_numpy(dtype=np.float32).astype(np.float64)
+        expected = sweep_sma(close, **GRID)
+        got = pd.read_parquet(_result_path("grid", symbol))
+        pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False, rtol=1e-9)
+        assert summary.loc[symbol, "total_return"] == pytest.approx(expected["total_return"].iloc[0])
+
+
+def test_resume_skips_only_unchanged_closes(replay, capsys):
+    run()
+    mtimes = {s: os.stat(_result_path("grid", s)).st_mtime_ns for s in SYMBOLS}
+
+    # Mismos cierres: no se recalcula nada
+    capsys.readouterr()
+    run()
+    assert "se reanuda con 0" in capsys.readouterr().out
+    assert {s: os.stat(_result_path("grid", s)).st_mtime_ns for s in SYMBOLS} == mtimes
+
+    # Se perdió un resultado (corrida cortada): solo ese símbolo se recalcula
+    os.remove(_result_path("grid", "BBB"))
+    run()
+    assert "se reanuda con 1" in capsys.readouterr().out
+    assert os.stat(_result_path("grid", "AAA")).st_mtime_ns == mtimes["AAA"]
+
+    # Velas nuevas: cambian los cierres de todos y se recalcula todo
+    replay.advance(5)
+    run()
+    assert "ya evaluados" not in capsys.readouterr().out
+    assert all(os.stat(_result_path("grid", s)).st_mtime_ns != mtimes[s] for s in SYMBOLS)
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_no_shared_memory_warnings(tmp_path, start_method):
+    script = textwrap.dedent(f"""
+        import multiprocessing
+
+        import market_data
+        from grid_search import grid_search
+        from market_data import LocalFileProvider, generate_synthetic_bars
+
+        if __name__ == "__main__":
+            multiprocessing.set_start_method("{start_method}")
+            generate_synthetic_bars({SYMBOLS!r}, n_bars=300, root="hist", end="{SYNTHETIC_END}")
+            market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+            grid_search({SYMBOLS!r}, range(2, 20, 3), range(20, 60, 7), max_workers=2, results_dir="grid")
+    """)
+    env = dict(os.environ, PYTHONPATH=REPO)
+    done = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert done.returncode == 0, done.stderr
+    assert "resource_tracker" not in done.stderr and "leaked" not in done.stderr
+
+
+def test_workers_attach_without_registering(monkeypatch):
+    shm = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        registered = []
+        register = lambda name, rtype: registered.append(name)  # noqa: E731
+        monkeypatch.setattr(resource_tracker, "register", register)
+        monkeypatch.setattr(grid_search_module.sys, "version_info", (3, 12))
+        attached = _attach_shared_memory(shm.name)
+        attached.buf[0] = 7
+        assert shm.buf[0] == 7
+        attached.close()
+        # Solo el proceso que creó el bloque lo registra (y lo libera)
+        assert registered == []
+        assert resource_tracker.register is register  # se restaura al terminar
+    finally:
+        shm.close()
+        shm.unlink()
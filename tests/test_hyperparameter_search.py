@@ -0,0 +1,25 @@
+# tests/test_hyperparameter_search.py
+"""Búsqueda de hiperparámetros: el resultado se publica de forma atómica y lo leen los entrenamientos."""
+
+import json
+
+import pytest
+
+from hyperparameter_search import SEARCH_SPACE, save_best_params, successive_halving
+from ml_model import BEST_PARAMS_PATH, load_best_params
+
+
+def test_failed_write_keeps_previous_params(workdir):
+    save_best_params({"n_estimators": 50, "max_depth": 5})
+    with pytest.raises(TypeError):
+        save_best_params({"n_estimators": 80, "max_depth": object()})
+    assert load_best_params() == {"n_estimators": 50, "max_depth": 5}
+
+
+def test_search_publishes_best_params(daily_bars):
+    best, results = successive_halving(["AAA"], n_configs=4, min_trees=2, max_trees=4, eta=2,
+                                       n_folds=2, max_workers=1, results_path=None)
+    with open(BEST_PARAMS_PATH) as f:
+        assert json.load(f) == best
+    assert set(best) == set(SEARCH_SPACE) | {"n_estimators"}
+    assert best["n_estimators"] == results["n_estimators"].max()
@@ -0,0 +1,72 @@
+# tests/test_market_data.py
+"""Caché OHLCV (refresco de la cola, historia re-ajustada) y reloj del ReplayProvider."""
+
+import pandas as pd
+
+from market_data import (MarketDataProvider, OHLCVCache, ReplayProvider, generate_synthetic_bars, normalize_ohlcv,
+                         slice_bars)
+
+
+class GrowingProvider(MarketDataProvider):
+    """Proveedor en memoria cuyas velas se reemplazan entre llamadas; registra cada `start` pedido."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.starts = []
+
+    def fetch(self, symbol, interval="1d", start=None, end=None):
+        self.starts.append(start)
+        return slice_bars(normalize_ohlcv(self.frame), start, end)
+
+    def now(self):
+        return self.frame.index[-1]
+
+
+def assert_bars_equal(left, right):
+    pd.testing.assert_frame_equal(left, normalize_ohlcv(right), check_freq=False)
+
+
+def test_tail_refresh_replaces_open_bar(daily_bars, tmp_path):
+    # La última vela de la primera descarga estaba abierta (cierre provisional)
+    partial = daily_bars.iloc[:300].copy()
+    partial.iloc[-1, partial.columns.get_loc("Close")] *= 1.01
+    provider = GrowingProvider(partial)
+    cache = OHLCVCache(provider, cache_dir=str(tmp_path / "c"))
+    assert_bars_equal(cache.get("AAA"), partial)
+
+    provider.frame = daily_bars.iloc[:320]
+    assert_bars_equal(cache.get("AAA"), daily_bars.iloc[:320])
+    # Solo se pidió la cola, desde la penúltima vela guardada
+    assert provider.starts[-1] == daily_bars.index[298]
+    assert_bars_equal(cache.load("AAA"), daily_bars.iloc[:320])
+
+
+def test_readjusted_history_is_downloaded_again(daily_bars, tmp_path):
+    provider = GrowingProvider(daily_bars.iloc[:300])
+    cache = OHLCVCache(provider, cache_dir=str(tmp_path / "c"))
+    cache.get("AAA")
+
+    # Split 2:1: el proveedor devuelve toda la historia con otros precios
+    adjusted = daily_bars.iloc[:320].copy()
+    adjusted[["Open", "High", "Low", "Close"]] /= 2
+    provider.frame = adjusted
+    assert_bars_equal(cache.get("AAA"), adjusted)
+    assert provider.starts[-1] is None
+
+
+def test_replay_clock_never_leaks_future(workdir):
+    daily = generate_synthetic_bars(["AAA"], n_bars=50, root="hist", end="2024-06-28")["AAA"]
+    # Otro intervalo en la misma carpeta, que termina más tarde: no cuenta para el reloj diario
+    generate_synthetic_bars(["AAA"], n_bars=50, interval="1h", root="hist", end="2024-07-31")
+
+    replay = ReplayProvider("hist", warmup=0)
+    assert replay.now() < daily.index[0]
+    assert replay.fetch("AAA").empty
+
+    replay.advance(10)
+    assert replay.now() == daily.index[9]
+    replay.fetch("AAA", "1h")  # cargar velas horarias no mueve el reloj diario
+    assert replay.now() == daily.index[9]
+
+    hourly = ReplayProvider("hist", warmup=5, interval="1h")
+    assert hourly.now().month == 7
@@ -0,0 +1,76 @@
+# tests/test_model_profiler.py
+"""Holdout del perfil de modelos: nunca filas de entrenamiento, con la fecha de corte de cada entrenador."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+import model_profiler
+import retraining
+from market_data import LocalFileProvider, ReplayProvider, generate_synthetic_bars
+from ml_model import load_data, save_training_cutoff, training_window
+from model_profiler import _holdout_split, profile_model
+from pooled_dataset import PooledDataset
+
+from conftest import SYNTHETIC_END
+
+
+def test_profile_right_after_retraining(workdir, monkeypatch):
+    generate_synthetic_bars(["AAA"], n_bars=400, root="hist", end=SYNTHETIC_END)
+    market_data.configure(ReplayProvider("hist", warmup=400), cache_dir="cache")
+    monkeypatch.setattr(retraining, "RETRAIN_WINDOW", 250)
+    monkeypatch.setattr(retraining, "FULL_REFIT_TREES", 5)
+    retraining.IncrementalRetrainer("AAA", model_path="models/aaa.pkl").retrain()
+
+    # El re-entrenamiento usó hasta la última vela: el holdout es la historia previa a su ventana
+    train, holdout = _holdout_split(load_data("AAA"), training_window("models/aaa.pkl", "AAA"), 0.2)
+    assert len(train) == 250
+    assert holdout.index[-1] < train.index[0]
+
+    # Misma medición sin lanzar un proceso por variante
+    monkeypatch.setattr(model_profiler, "profile_artifact", model_profiler._profile_in_process)
+    monkeypatch.setattr(model_profiler, "LATENCY_REPEATS", 10)
+    report = profile_model("models/aaa.pkl", "AAA", tree_counts=[2], max_depths=[3], results_path=None)
+    assert list(report.index) == ["original", "trees=2", "max_depth=3"]
+    assert report["accuracy"].between(0, 1).all()
+
+
+def test_pooled_holdout_per_symbol(workdir):
+    frames = generate_synthetic_bars(["AAA", "BBB"], n_bars=300, root="hist", end=SYNTHETIC_END)
+    # BBB deja de cotizar antes: el corte del universo no le deja velas posteriores
+    frames["BBB"].iloc[:-40].to_parquet("hist/BBB_1d.parquet")
+    market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+
+    dataset = PooledDataset.build("pooled", symbols=["AAA", "BBB"], chunk_rows=100)
+    save_training_cutoff("models/pooled.pkl", max(dataset.train_end.values()),
+                         train_end_by_symbol=dataset.train_end)
+
+    for symbol in ("AAA", "BBB"):
+        df = load_data(symbol)
+        train, holdout = _holdout_split(df, training_window("models/pooled.pkl", symbol), 0.2)
+        n = len(df) - 1  # filas con target real
+        assert len(holdout) == int(n * 0.2)
+        assert train.index[-1] == dataset.train_end[symbol]
+
+    # El modelo conjunto solo ve filas de entrenamiento
+    X, _ = dataset.sample(len(dataset), np.random.default_rng(0))
+    train_X = np.concatenate([x[t] for x, t in dataset.iter_chunks(("X", "train"))])
+    assert len(X) == len(train_X) == sum(dataset.train_sizes)
+    np.testing.assert_array_equal(np.sort(X, axis=0), np.sort(train_X, axis=0))
+
+
+def test_new_cutoff_clears_previous_window(workdir):
+    save_training_cutoff("models/m.pkl", "2024-01-31", train_start="2023-01-02",
+                         train_end_by_symbol={"AAA": "2024-01-15"})
+    assert training_window("models/m.pkl", "AAA") == (pd.Timestamp("2023-01-02"), pd.Timestamp("2024-01-15"))
+
+    # Un entrenamiento posterior (p. ej. ml_model.train_model) no hereda la ventana anterior
+    save_training_cutoff("models/m.pkl", "2024-03-28")
+    assert training_window("models/m.pkl", "AAA") == (None, pd.Timestamp("2024-03-28"))
+
+
+def test_no_bars_outside_training_raises(daily_bars):
+    df = load_data("AAA")
+    with pytest.raises(ValueError):
+        _holdout_split(df, (df.index[0], df.index[-1]), 0.2)
@@ -0,0 +1,92 @@
+# tests/test_model_registry.py
+"""Registro de modelos: una carga por versión, hot-swap y LRU por memoria."""
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from model_registry import ModelRegistry, _model_nbytes
+
+FEATURE_COLS = ["return_1d", "volatility_5", "lag_return_1"]
+
+
+def forest(n_estimators: int = 5, seed: int = 0) -> RandomForestClassifier:
+    rng = np.random.default_rng(seed)
+    X, y = rng.normal(size=(300, 3)), rng.integers(0, 2, 300)
+    return RandomForestClassifier(n_estimators=n_estimators, random_state=seed).fit(X, y)
+
+
+def test_model_is_loaded_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "model.pkl")
+    joblib.dump((forest(), FEATURE_COLS), path)
+    registry = ModelRegistry(check_interval=0)
+
+    loads = []
+    real_load = joblib.load
+    monkeypatch.setattr(joblib, "load", lambda *a, **kw: loads.append(a[0]) or real_load(*a, **kw))
+
+    first, cols = registry.get(path)
+    second, _ = registry.get(path)
+    assert first is second and cols == FEATURE_COLS
+    assert loads == [path]
+
+
+def test_new_version_on_disk_is_swapped_in(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    registry = ModelRegistry(check_interval=0)
+    registry.publish(forest(3), FEATURE_COLS, path)
+    old, _ = registry.get(path)
+
+    # Otro proceso (p. ej. retraining) publica una versión nueva
+    other = ModelRegistry()
+    other.publish(forest(7, seed=1), FEATURE_COLS, path)
+    new, _ = registry.get(path)
+    assert new is not old and len(new.estimators_) == 7
+
+
+def test_least_recently_used_is_evicted_by_memory(tmp_path):
+    paths = {}
+    for name in ("a", "b", "c"):
+        paths[name] = str(tmp_path / f"{name}.pkl")
+        joblib.dump((forest(), FEATURE_COLS), paths[name])
+
+    size = _model_nbytes(forest(), 0)
+    registry = ModelRegistry(max_bytes=int(size * 2.5))
+    registry.get(paths["a"])
+    registry.get(paths["b"])
+    registry.get(paths["a"])  # "a" pasa a ser el más reciente
+    registry.get(paths["c"])
+    assert list(registry._models) == [paths["a"], paths["c"]]
+
+
+def test_size_counts_tree_arrays(tmp_path):
+    model = forest()
+    expected = sum(est.tree_.__getstate__()["nodes"].nbytes + est.tree_.__getstate__()["values"].nbytes
+                   for est in model.estimators_)
+    assert _model_nbytes(model, 123) == expected
+
+    # Un modelo sin árboles cuenta el tamaño de su archivo
+    linear = LogisticRegression().fit(np.eye(3), [0, 1, 0])
+    assert _model_nbytes(linear, 123) == 123
+
+
+def test_single_model_over_budget_stays_loaded(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    joblib.dump((forest(), FEATURE_COLS), path)
+    registry = ModelRegistry(max_bytes=1)
+    model, _ = registry.get(path)
+    assert registry.get(path)[0] is model
+
+
+@pytest.mark.parametrize("check_interval, swapped", [(0, True), (3600, False)])
+def test_disk_is_checked_every_check_interval(tmp_path, check_interval, swapped):
+    path = str(tmp_path / "model.pkl")
+    joblib.dump((forest(3), FEATURE_COLS), path)
+    registry = ModelRegistry(check_interval=check_interval)
+    old, _ = registry.get(path)
+
+    joblib.dump((forest(7, seed=1), FEATURE_COLS), path)
+    new, _ = registry.get(path)
+    assert (new is not old) == swapped
@@ -0,0 +1,23 @@
+# tests/test_optimizer.py
+"""Barrido vectorizado: cada par (corta, larga) da el mismo retorno que run_strategy."""
+
+import numpy as np
+import pytest
+
+from optimizer import run_strategy, sweep_sma
+
+
+@pytest.mark.parametrize("short_windows, long_windows", [
+    (range(2, 30, 3), range(20, 120, 7)),
+    ([5, 20], [50, 200]),
+])
+def test_sweep_matches_run_strategy(daily_bars, short_windows, long_windows):
+    results = sweep_sma(daily_bars["Close"].to_numpy(), short_windows, long_windows)
+
+    expected_pairs = {(s, l) for s in short_windows for l in long_windows if s < l}
+    assert set(zip(results["short"], results["long"])) == expected_pairs
+    assert results["total_return"].is_monotonic_decreasing
+
+    for row in results.itertuples():
+        expected = run_strategy(daily_bars, row.short, row.long)
+        np.testing.assert_allclose(row.total_return, expected, rtol=1e-9, atol=1e-9)
@@ -0,0 +1,63 @@
+# tests/test_panel_features.py
+"""Features vectorizadas del panel: mismas que add_basic_features símbolo a símbolo."""
+
+import numpy as np
+import pandas as pd
+
+import market_data
+import pooled_dataset
+from feature_engineering import add_basic_features
+from market_data import LocalFileProvider, generate_synthetic_bars, to_panel
+from panel_features import PANEL_FEATURES, compute_panel_features
+from pooled_dataset import iter_chunks
+
+from conftest import SYNTHETIC_END
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def test_panel_matches_per_symbol_features(workdir):
+    frames = generate_synthetic_bars(["AAA", "BBB", "CCC"], n_bars=300, root="hist", end=SYNTHETIC_END)
+    # Símbolos que empiezan más tarde (huecos iniciales en el panel)
+    frames["BBB"] = frames["BBB"].iloc[40:]
+    frames["CCC"] = frames["CCC"].iloc[120:]
+
+    panel = [to_panel(frames, field) for field in FIELDS]
+    features, names = compute_panel_features(*[p.to_numpy() for p in panel], dtype=np.float64)
+    assert names == PANEL_FEATURES
+
+    for j, symbol in enumerate(panel[0].columns):
+        expected = add_basic_features(frames[symbol])[PANEL_FEATURES]
+        got = pd.DataFrame(features[:, j], index=panel[0].index, columns=names)
+        # Mismas filas completas que las que add_basic_features no descarta
+        pd.testing.assert_index_equal(got.dropna().index, expected.index, check_names=False)
+        pd.testing.assert_frame_equal(got.loc[expected.index], expected, check_freq=False,
+                                      check_names=False, rtol=1e-7, atol=1e-9)
+
+
+def chunk_rows(chunks) -> pd.DataFrame:
+    chunk = {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+    df = pd.DataFrame(chunk["X"], columns=["return_1d", "volatility_5", "lag_return_1"])
+    return df.assign(y=chunk["y"], symbol=chunk["symbol"], time=chunk["time"]).sort_values(["symbol", "time"])
+
+
+def test_pooled_chunks_from_panel_match_feature_store(workdir, monkeypatch):
+    generate_synthetic_bars(["AAA", "BBB"], n_bars=300, root="hist", end=SYNTHETIC_END)
+    # Símbolo con huecos intermedios: va por el feature store
+    gappy = generate_synthetic_bars(["CCC"], n_bars=300, root="tmp", end=SYNTHETIC_END)["CCC"]
+    gappy.drop(gappy.index[100:103]).to_parquet("hist/CCC_1d.parquet")
+    market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+
+    symbols = ["AAA", "BBB", "CCC"]
+    per_symbol = chunk_rows(list(iter_chunks(symbols, chunk_rows=250)))
+
+    per_symbol_reads = []
+    monkeypatch.setattr(pooled_dataset, "get_bars", lambda symbol, **kw: per_symbol_reads.append(symbol)
+                        or market_data.get_bars(symbol, **kw))
+    from_panel = chunk_rows(list(iter_chunks(symbols, chunk_rows=250, use_panel=True)))
+    assert per_symbol_reads == ["CCC"]
+
+    for column in ("y", "symbol", "time"):
+        np.testing.assert_array_equal(from_panel[column].to_numpy(), per_symbol[column].to_numpy())
+    # El panel es float32: las features coinciden salvo el redondeo de los precios
+    np.testing.assert_allclose(from_panel.iloc[:, :3].to_numpy(), per_symbol.iloc[:, :3].to_numpy(), atol=1e-5)
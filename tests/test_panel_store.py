@@ -0,0 +1,91 @@
+# tests/test_panel_store.py
+"""Panel memory-mapped: mismas velas que el caché, reutilización, reconstrucción y publicación atómica."""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+from market_data import ReplayProvider, generate_synthetic_bars
+from panel_store import PanelStore, open_panel, panel_dir
+
+from conftest import SYNTHETIC_END
+
+
+class CountingReplay(ReplayProvider):
+    """Replay que cuenta las descargas por lotes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def fetch_many(self, symbols, interval="1d", start=None, end=None):
+        self.batches.append(list(symbols))
+        return super().fetch_many(symbols, interval, start=start, end=end)
+
+
+@pytest.fixture
+def replay(workdir):
+    generate_synthetic_bars(["AAA", "BBB", "CCC"], n_bars=400, root="hist", end=SYNTHETIC_END)
+    provider = CountingReplay("hist", warmup=300)
+    market_data.configure(provider, cache_dir="cache")
+    return provider
+
+
+def test_panel_matches_cache(replay):
+    store = open_panel(["AAA", "BBB"])
+    # Cold build: una sola descarga para todo el universo
+    assert replay.batches == [["AAA", "BBB"]]
+
+    for symbol in ("AAA", "BBB"):
+        bars = market_data.get_bars(symbol)
+        frame = store.frame(symbol)
+        pd.testing.assert_index_equal(frame.index, bars.index, check_names=False)
+        np.testing.assert_allclose(frame.to_numpy(), bars[store.fields].to_numpy(), rtol=1e-6)
+
+
+def test_open_panel_reuses_and_rebuilds(replay):
+    open_panel(["AAA", "BBB"])
+    downloads = len(replay.batches)
+    open_panel(["AAA"])  # subconjunto del almacén al día: se abre sin tocar el caché
+    assert len(replay.batches) == downloads
+    assert len(os.listdir(panel_dir("1d"))) == 3  # index.json + una generación
+
+    # Símbolo nuevo: se reconstruye con la unión de símbolos
+    merged = open_panel(["CCC"])
+    assert merged.symbols == ["AAA", "BBB", "CCC"]
+
+    # Avanza el reloj del proveedor: el almacén sin `end` queda viejo
+    replay.advance(5)
+    fresh = open_panel(["AAA"])
+    assert len(fresh.dates) == len(merged.dates) + 5
+
+
+def test_rebuild_publishes_new_generation(replay):
+    first = open_panel(["AAA"])
+    old = json.load(open(os.path.join(first.root, "index.json")))["files"]
+
+    replay.advance(1)
+    second = open_panel(["AAA"])
+    new = json.load(open(os.path.join(second.root, "index.json")))["files"]
+    assert new != old
+
+    # El lector que abrió la generación anterior sigue leyendo sus propios arreglos
+    assert first.data.shape[1] == second.data.shape[1] - 1
+    assert np.isfinite(first.field("Close")).all()
+
+    replay.advance(1)
+    open_panel(["AAA"])
+    # Se conservan solo la generación vigente y la anterior
+    arrays = [name for name in os.listdir(first.root) if name.endswith(".npy")]
+    assert len(arrays) == 4 and set(old.values()).isdisjoint(arrays)
+
+
+def test_build_from_frames(workdir, daily_bars):
+    store = PanelStore.build("panel", {"AAA": daily_bars, "EMPTY": pd.DataFrame()})
+    assert store.symbols == ["AAA", "EMPTY"]
+    assert np.isnan(store.symbol("EMPTY")).all()
+    np.testing.assert_allclose(store.frame("AAA")["Close"].to_numpy(), daily_bars["Close"].to_numpy(), rtol=1e-6)
@@ -0,0 +1,52 @@
+# tests/test_pooled_dataset.py
+"""Dataset conjunto: solo filas con target real y modelo con los hiperparámetros de la búsqueda."""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+from market_data import LocalFileProvider, generate_synthetic_bars
+from ml_model import BEST_PARAMS_PATH
+from pooled_dataset import PooledDataset, train_pooled_model
+
+from conftest import SYNTHETIC_END
+
+
+@pytest.fixture
+def dataset(workdir) -> PooledDataset:
+    generate_synthetic_bars(["AAA", "BBB"], n_bars=300, root="hist", end=SYNTHETIC_END)
+    market_data.configure(LocalFileProvider("hist"), cache_dir="cache")
+    return PooledDataset.build("pooled", symbols=["AAA", "BBB"], chunk_rows=250)
+
+
+def test_every_row_has_a_real_target(dataset):
+    symbol = np.concatenate([dataset.chunk(i, "symbol") for i in range(len(dataset.chunk_sizes))])
+    time = np.concatenate([dataset.chunk(i, "time") for i in range(len(dataset.chunk_sizes))])
+    y = np.concatenate([dataset.chunk(i, "y") for i in range(len(dataset.chunk_sizes))])
+
+    for symbol_id, name in enumerate(dataset.symbols):
+        close = market_data.get_bars(name)["Close"]
+        close.index = close.index.tz_localize(None) if close.index.tz is not None else close.index
+        rows = pd.DatetimeIndex(time[symbol == symbol_id])
+        # La última vela queda fuera: no se conoce su cierre siguiente
+        assert rows[-1] == close.index[-2]
+        expected = (close.shift(-1) > close).astype(int).loc[rows]
+        np.testing.assert_array_equal(y[symbol == symbol_id], expected.to_numpy())
+
+
+def test_pooled_model_uses_tuned_params(dataset):
+    os.makedirs(os.path.dirname(BEST_PARAMS_PATH), exist_ok=True)
+    with open(BEST_PARAMS_PATH, "w") as f:
+        json.dump({"n_estimators": 500, "max_depth": 3, "min_samples_leaf": 5}, f)
+
+    model = train_pooled_model(dataset, n_rounds=2, trees_per_round=3, sample_rows=200)
+    # La cantidad de árboles la fijan las rondas, no la búsqueda
+    assert len(model.estimators_) == 6
+    assert (model.max_depth, model.min_samples_leaf) == (3, 5)
+
+    model = train_pooled_model(dataset, n_rounds=1, trees_per_round=3, sample_rows=200, min_samples_leaf=20)
+    assert model.min_samples_leaf == 20
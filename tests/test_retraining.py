@@ -0,0 +1,84 @@
+# tests/test_retraining.py
+"""Re-entrenamiento: solo filas con target real, hiperparámetros de la búsqueda y ventana de árboles."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import market_data
+import retraining
+from market_data import ReplayProvider, generate_synthetic_bars
+from ml_model import BEST_PARAMS_PATH
+from model_registry import get_registry
+from retraining import TREES_PER_UPDATE, IncrementalRetrainer
+
+from conftest import SYNTHETIC_END
+
+
+@pytest.fixture
+def replay(workdir):
+    generate_synthetic_bars(["AAA"], n_bars=400, root="hist", end=SYNTHETIC_END)
+    provider = ReplayProvider("hist", warmup=350)
+    market_data.configure(provider, cache_dir="cache")
+    os.makedirs(os.path.dirname(BEST_PARAMS_PATH), exist_ok=True)
+    with open(BEST_PARAMS_PATH, "w") as f:
+        json.dump({"n_estimators": 12, "max_depth": 4, "min_samples_leaf": 5}, f)
+    return provider
+
+
+@pytest.fixture
+def fitted_on(monkeypatch):
+    """Índice de las filas con las que se ajustó cada bosque."""
+    fits = []
+    real_fit = RandomForestClassifier.fit
+    monkeypatch.setattr(RandomForestClassifier, "fit",
+                        lambda self, X, y, **kw: fits.append(X.index) or real_fit(self, X, y, **kw))
+    return fits
+
+
+def test_full_refit_uses_labeled_rows_and_tuned_params(replay, fitted_on):
+    retrainer = IncrementalRetrainer("AAA", model_path="models/aaa.pkl")
+    assert retrainer.retrain() == "full"
+
+    model, _ = get_registry().get("models/aaa.pkl")
+    assert (len(model.estimators_), model.max_depth, model.min_samples_leaf) == (12, 4, 5)
+
+    bars = market_data.get_bars("AAA")
+    # La última vela (sin cierre siguiente) no entra al entrenamiento
+    assert fitted_on[-1][-1] == bars.index[-2]
+    assert retrainer._load_meta()["last_bar"] == bars.index[-1].isoformat()
+
+
+def test_incremental_update_adds_trees(replay, fitted_on):
+    retrainer = IncrementalRetrainer("AAA", model_path="models/aaa.pkl")
+    retrainer.retrain()
+    published, _ = get_registry().get("models/aaa.pkl")
+    assert retrainer.retrain() == "skipped"  # sin velas nuevas
+
+    replay.advance(3)
+    assert retrainer.retrain() == "incremental"
+    model, _ = get_registry().get("models/aaa.pkl")
+    assert len(model.estimators_) == 12 + TREES_PER_UPDATE
+    # Los árboles publicados se conservan y los nuevos usan los mismos hiperparámetros
+    for old, kept in zip(published.estimators_, model.estimators_[:12]):
+        np.testing.assert_array_equal(old.tree_.threshold, kept.tree_.threshold)
+    assert all(tree.max_depth == 4 and tree.min_samples_leaf == 5 for tree in model.estimators_[12:])
+    assert fitted_on[-1][-1] == market_data.get_bars("AAA").index[-2]
+    assert len(published.estimators_) == 12  # el modelo publicado antes no se modifica
+
+
+def test_oldest_trees_are_dropped(replay, monkeypatch):
+    monkeypatch.setattr(retraining, "MAX_TREES", 25)
+    retrainer = IncrementalRetrainer("AAA", model_path="models/aaa.pkl")
+    retrainer.retrain()
+    first, _ = get_registry().get("models/aaa.pkl")
+
+    replay.advance(1)
+    retrainer.retrain()
+    model, _ = get_registry().get("models/aaa.pkl")
+    assert len(model.estimators_) == model.n_estimators == 25
+    # 12 + 20 árboles: se descartan los 7 más viejos del bosque original
+    np.testing.assert_array_equal(model.estimators_[0].tree_.threshold, first.estimators_[7].tree_.threshold)
@@ -0,0 +1,46 @@
+# tests/test_streaming_features.py
+"""Motor incremental: mismas features que feature_engineering.add_basic_features."""
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import add_basic_features
+from streaming_features import StreamingFeatures
+
+
+def batch_row(bars: pd.DataFrame, columns) -> np.ndarray:
+    return add_basic_features(bars)[columns].iloc[-1].to_numpy(dtype=float)
+
+
+def test_streaming_matches_batch(daily_bars):
+    engine = StreamingFeatures.from_history(daily_bars.iloc[:200])
+    for stop in range(201, 260):
+        engine.sync(daily_bars.iloc[:stop])
+        columns = list(engine.features)
+        np.testing.assert_allclose([engine.features[c] for c in columns],
+                                   batch_row(daily_bars.iloc[:stop], columns), rtol=1e-8)
+
+
+def test_open_bar_updates_match_closed_bar(daily_bars):
+    engine = StreamingFeatures.from_history(daily_bars.iloc[:250])
+    bars = daily_bars.iloc[:251]
+
+    # La vela 251 llega varias veces mientras sigue abierta
+    for scale in (0.99, 1.01, 1.005):
+        partial = bars.copy()
+        partial.iloc[-1, partial.columns.get_loc("Close")] *= scale
+        engine.sync(partial)
+    engine.sync(bars)
+
+    fresh = StreamingFeatures.from_history(bars)
+    assert engine.n_bars == fresh.n_bars
+    columns = list(fresh.features)
+    np.testing.assert_allclose([engine.features[c] for c in columns],
+                               [fresh.features[c] for c in columns], rtol=1e-12)
+
+
+def test_warmup_guard(daily_bars):
+    engine = StreamingFeatures.from_history(daily_bars.iloc[:10])
+    assert engine.ready_for(["return_1d", "lag_return_1"])
+    assert not engine.ready_for(["ATR"])
+    assert not engine.ready
@@ -0,0 +1,70 @@
+# tests/test_timeframes.py
+"""Remuestreo incremental igual al completo, memoria acotada y features multi-temporalidad sin lookahead."""
+
+import pandas as pd
+import pytest
+
+from feature_engineering import resample_ohlcv
+from ml_model import load_data, timeframe_feature_cols
+from timeframes import TimeframeCache, multi_timeframe_features
+
+FEATURE_COLS = ["return_1d", "volatility_5", "lag_return_1"]
+
+
+def full_resample(base: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """Referencia: remuestreo completo sin la primera vela gruesa (puede estar cortada)."""
+    out = resample_ohlcv(base, timeframe)
+    return out.iloc[1:]
+
+
+def assert_bars_equal(left, right):
+    pd.testing.assert_frame_equal(left, right, check_freq=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize("timeframe", ["4h", "1d"])
+def test_incremental_resample_matches_full(hourly_bars, tmp_path, timeframe):
+    cache = TimeframeCache(root=str(tmp_path / "derived"))
+    # Velas base que llegan de a poco, cortando velas gruesas a la mitad
+    for stop in range(300, len(hourly_bars) + 1, 37):
+        base = hourly_bars.iloc[:stop]
+        assert_bars_equal(cache.resample("AAA", base, "1h", timeframe), full_resample(base, timeframe))
+
+
+def test_historical_window_and_other_source(hourly_bars, tmp_path):
+    cache = TimeframeCache(root=str(tmp_path / "derived"))
+    cache.resample("AAA", hourly_bars, "1h", "4h")
+
+    # Ventana histórica: solo velas dentro de la ventana pedida
+    window = hourly_bars.iloc[200:500]
+    assert_bars_equal(cache.resample("AAA", window, "1h", "4h"), full_resample(window, "4h"))
+
+    # Otra fuente con las mismas fechas: no se pegan velas guardadas de la anterior
+    other = hourly_bars.copy()
+    other[["Open", "High", "Low", "Close"]] *= 0.5
+    assert_bars_equal(cache.resample("AAA", other, "1h", "4h"), full_resample(other, "4h"))
+
+
+def test_memory_is_bounded(hourly_bars, tmp_path):
+    cache = TimeframeCache(root=str(tmp_path / "derived"), max_items=2)
+    for symbol in ("AAA", "BBB", "CCC"):
+        cache.resample(symbol, hourly_bars, "1h", "4h")
+    assert len(cache._memory) == 2
+    # La serie expulsada de memoria se vuelve a leer de disco
+    assert_bars_equal(cache.resample("AAA", hourly_bars, "1h", "4h"), full_resample(hourly_bars, "4h"))
+
+
+def test_multi_timeframe_features_without_lookahead(workdir, hourly_bars):
+    full = multi_timeframe_features("AAA", FEATURE_COLS, "1h", timeframes=("4h", "1d"), bars=hourly_bars)
+    assert list(full.columns) == [f"{c}{s}" for s in ("", "_4h", "_1d") for c in FEATURE_COLS]
+
+    # Quitar las velas futuras no cambia ninguna fila ya vista
+    for stop in (500, 731):
+        part = multi_timeframe_features("AAA", FEATURE_COLS, "1h", timeframes=("4h", "1d"),
+                                        bars=hourly_bars.iloc[:stop])
+        pd.testing.assert_frame_equal(part, full.loc[part.index], check_freq=False, rtol=1e-12)
+
+
+def test_load_data_with_weekly_features(daily_bars):
+    df = load_data("AAA", timeframes=("1wk",))
+    assert set(timeframe_feature_cols(("1wk",))) <= set(df.columns)
+    assert df[timeframe_feature_cols(("1wk",))].notna().all().all()
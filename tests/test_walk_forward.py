@@ -0,0 +1,75 @@
+# tests/test_walk_forward.py
+"""Límites de los folds walk-forward: el test va justo después de su train, nunca se solapan ni evalúa velas sin target."""
+
+import pytest
+
+from backtesting.backtest_engine import BacktestEngine
+from market_data import LocalFileProvider
+from ml_model import load_data, walk_forward, walk_forward_splits
+
+
+def assert_chronological(splits, n_rows, window=None):
+    tests = [test for _, test in splits]
+    assert tests[-1].stop == n_rows
+    for (train, test), next_test in zip(splits, tests[1:] + [None]):
+        assert train.stop == test.start  # sin hueco ni solapamiento entre train y test
+        assert train.start < train.stop
+        if window is not None:
+            assert train.stop - train.start <= window
+        if next_test is not None:
+            assert test.stop == next_test.start  # los tests cubren el rango sin repetir filas
+
+
+@pytest.mark.parametrize("window", [None, 100])
+def test_walk_forward_splits(window):
+    splits = walk_forward_splits(1000, n_folds=5, min_train=252, window=window)
+    assert len(splits) == 5
+    assert splits[0][1].start == 252
+    assert_chronological(splits, 1000, window)
+    if window is None:
+        assert all(train.start == 0 for train, _ in splits)
+
+
+def test_walk_forward_splits_without_enough_rows():
+    assert walk_forward_splits(100, n_folds=5, min_train=252) == []
+
+
+def make_engine(daily_bars, start_row: int, train_window: int = 200, test_size: int = 30) -> BacktestEngine:
+    engine = BacktestEngine("AAA", daily_bars.index[start_row].date().isoformat(),
+                            daily_bars.index[-1].date().isoformat(), provider=LocalFileProvider("hist"),
+                            walk_forward=True, train_window=train_window, test_size=test_size)
+    engine.feature_cols = ["return_1d", "volatility_5", "lag_return_1"]
+    engine.load_data()
+    return engine
+
+
+def test_engine_windows_start_at_start_with_full_training(daily_bars):
+    engine = make_engine(daily_bars, start_row=300)
+    windows = engine.walk_forward_windows()
+
+    first_train, first_test = windows[0]
+    assert engine.df.index[first_test.start] == daily_bars.index[300]
+    # load_data trae train_window velas con features antes de start
+    assert first_train.stop - first_train.start == engine.train_window
+    assert all(test.stop - test.start <= engine.test_size for _, test in windows)
+    assert_chronological(windows, len(engine.df), engine.train_window)
+
+
+def test_engine_warns_on_short_first_training(daily_bars, capsys):
+    engine = make_engine(daily_bars, start_row=50)
+    train, _ = engine.walk_forward_windows()[0]
+    assert train.stop - train.start < engine.train_window
+    assert "primer bloque" in capsys.readouterr().out
+
+
+def test_engine_without_history_before_start(daily_bars):
+    engine = make_engine(daily_bars, start_row=0)
+    with pytest.raises(ValueError):
+        engine.walk_forward_windows()
+
+
+def test_walk_forward_never_scores_the_unlabeled_last_bar(daily_bars):
+    df = load_data("AAA")
+    results = walk_forward(["AAA"], n_folds=2, n_estimators=5, max_workers=1, results_path=None)
+    # El último fold termina en la penúltima vela: la última no tiene cierre siguiente
+    assert results["test_rows"].sum() == len(df) - 1 - 252
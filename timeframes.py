@@ -0,0 +1,142 @@
+# timeframes.py
+"""
+Pipeline de features multi-temporalidad.
+
+Las velas gruesas (1h → 4h → 1d → 1wk) se derivan de la serie más fina del
+caché en lugar de descargarse por separado. Cada serie derivada se guarda junto
+al caché del que sale (<cache_dir>/derived, así cada fuente de datos tiene las
+suyas) y se actualiza de forma incremental: solo se re-agrega desde la última
+vela gruesa (que puede estar aún abierta). Las features de cada temporalidad se unen a la
+serie fina sin lookahead (ver feature_engineering.join_timeframe).
+"""
+
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import compute_features, join_timeframe, resample_ohlcv
+from feature_store import get_feature_store
+from market_data import get_cache
+
+DERIVED_SUBDIR = "derived"
+
+
+class TimeframeCache:
+    """
+    Velas remuestreadas por (símbolo, temporalidad base, temporalidad destino), en memoria y en disco.
+    Sin `root` se usa <cache_dir>/derived del caché compartido. En memoria se
+    guardan como mucho `max_items` series (LRU).
+    """
+
+    def __init__(self, root: str = None, max_items: int = 64):
+        self._root = root
+        self.max_items = max_items
+        self._memory = OrderedDict()
+
+    @property
+    def root(self) -> str:
+        # Se resuelve en cada uso: si se configura otro proveedor, cambia el directorio
+        return self._root or os.path.join(get_cache().cache_dir, DERIVED_SUBDIR)
+
+    def path(self, symbol: str, base_interval: str, timeframe: str) -> str:
+        return os.path.join(self.root, f"{base_interval}_to_{timeframe}", f"{symbol}.parquet")
+
+    def _load(self, symbol: str, base_interval: str, timeframe: str):
+        path = self.path(symbol, base_interval, timeframe)
+        if path in self._memory:
+            self._memory.move_to_end(path)
+            return self._memory[path]
+        df = pd.read_parquet(path) if os.path.exists(path) else None
+        self._remember(path, df)
+        return df
+
+    def _save(self, symbol: str, base_interval: str, timeframe: str, df: pd.DataFrame, persist: bool):
+        path = self.path(symbol, base_interval, timeframe)
+        self._remember(path, df)
+        if persist:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            df.to_parquet(tmp)
+            os.replace(tmp, path)
+
+    def _remember(self, path: str, df):
+        self._memory[path] = df
+        self._memory.move_to_end(path)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    def resample(self, symbol: str, base: pd.DataFrame, base_interval: str, timeframe: str) -> pd.DataFrame:
+        """Velas de `timeframe` para las velas base dadas, re-agregando solo la cola."""
+        if base.empty:
+            return resample_ohlcv(base, timeframe)
+
+        stored = self._load(symbol, base_interval, timeframe)
+
+        if stored is not None and len(stored) > 1 and stored.index[0] <= base.index[0] <= stored.index[-1] \
+                and base.index[-1] >= stored.index[-1] and _same_source(stored, base, timeframe):
+            # La última vela gruesa guardada puede estar incompleta: se re-agrega desde su inicio
+            last_open = stored.index[-1]
+            tail = resample_ohlcv(base[base.index >= last_open], timeframe)
+            out = pd.concat([stored.iloc[:-1], tail])
+            self._save(symbol, base_interval, timeframe, out, persist=len(out) > len(stored))
+        else:
+            out = resample_ohlcv(base, timeframe)
+            # Una ventana que no cubre lo guardado no lo reemplaza
+            if stored is None or (out.index[0] <= stored.index[0] and out.index[-1] >= stored.index[-1]):
+                self._save(symbol, base_interval, timeframe, out, persist=True)
+
+        # Solo velas dentro de `base`; la primera puede quedar cortada por el inicio de `base` y se descarta
+        first_open = resample_ohlcv(base.iloc[:1], timeframe).index[0]
+        return out[(out.index > first_open) & (out.index <= base.index[-1])]
+
+
+def _same_source(stored: pd.DataFrame, base: pd.DataFrame, timeframe: str) -> bool:
+    """
+    Comprueba que las velas guardadas salieron de estas velas base: la última
+    vela gruesa completa se re-agrega y se compara (detecta otra fuente o una
+    historia re-ajustada sin remuestrear todo).
+    """
+    prev_open, last_open = stored.index[-2], stored.index[-1]
+    if base.index[0] > prev_open:
+        return True  # base no cubre esa vela entera: no hay con qué comparar
+    check = resample_ohlcv(base[(base.index >= prev_open) & (base.index < last_open)], timeframe)
+    if len(check) != 1 or check.index[0] != prev_open:
+        return False
+    return bool(np.allclose(check.iloc[0].to_numpy(dtype=float), stored.iloc[-2].to_numpy(dtype=float), rtol=1e-9))
+
+
+_default_timeframes = None
+
+
+def get_timeframe_cache() -> TimeframeCache:
+    global _default_timeframes
+    if _default_timeframes is None:
+        _default_timeframes = TimeframeCache()
+    return _default_timeframes
+
+
+def multi_timeframe_features(symbol: str, feature_cols, base_interval: str = "1h",
+                             timeframes=("4h", "1d", "1wk"), period: str = None,
+                             start=None, end=None, dropna: bool = True, bars: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Features de `symbol` en la temporalidad base más las mismas features
+    calculadas en cada temporalidad mayor (columnas con sufijo, p. ej. RSI_1d),
+    todas derivadas de UNA sola serie del caché (o de `bars`, si ya se tienen).
+    Las de la temporalidad base salen del feature store.
+    """
+    base = bars if bars is not None else \
+        get_cache().get(symbol, period=period, interval=base_interval, start=start, end=end)
+    out = get_feature_store().get(symbol, base, feature_cols, interval=base_interval, dropna=False)
+
+    tf_cache = get_timeframe_cache()
+    for timeframe in timeframes:
+        coarse = tf_cache.resample(symbol, base, base_interval, timeframe)
+        coarse_features = compute_features(coarse, feature_cols, dropna=False)
+        out = join_timeframe(out, coarse_features, base_interval, timeframe)
+
+    return out.dropna() if dropna else out